@@ -0,0 +1,120 @@
+import os
+
+
+def _env_bool(name: str, default: bool = False) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _service_env(service: str, key: str) -> str:
+    # e.g. ("user-management", "MAX_CONNECTIONS") -> "GATEWAY_USER_MANAGEMENT_MAX_CONNECTIONS"
+    return f"GATEWAY_{service.upper().replace('-', '_')}_{key}"
+
+
+# Upstream microservices the gateway proxies to (docker-compose service names)
+UPSTREAM_SERVICES = [
+    "user-management",
+    "academic",
+    "non-academic",
+    "attendance",
+    "behavioural",
+    "calendar",
+    "dashboard",
+]
+
+# Connection pool defaults, shared by every upstream unless overridden per service
+# with GATEWAY_<SERVICE>_<SETTING>, e.g. GATEWAY_DASHBOARD_MAX_CONNECTIONS=200
+HTTP_MAX_CONNECTIONS = int(os.getenv("GATEWAY_HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("GATEWAY_HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("GATEWAY_HTTP_KEEPALIVE_EXPIRY", "30.0"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("GATEWAY_HTTP_CONNECT_TIMEOUT", "10.0"))
+HTTP_READ_TIMEOUT = float(os.getenv("GATEWAY_HTTP_READ_TIMEOUT", "20.0"))
+HTTP_POOL_TIMEOUT = float(os.getenv("GATEWAY_HTTP_POOL_TIMEOUT", "10.0"))
+HTTP2_ENABLED = _env_bool("GATEWAY_HTTP2", False)
+
+# Share one upstream call between identical concurrent GETs (see utils/coalesce.py)
+COALESCE_GETS = _env_bool("GATEWAY_COALESCE_GETS", True)
+
+# Per-section time budget for aggregated endpoints such as the student dashboard overview
+OVERVIEW_SECTION_TIMEOUT = float(os.getenv("GATEWAY_OVERVIEW_SECTION_TIMEOUT", "10.0"))
+
+
+def upstream_pool_settings(service: str) -> dict:
+    """
+    Pool, timeout and protocol settings for one upstream service.
+    """
+    return {
+        "max_connections": int(os.getenv(_service_env(service, "MAX_CONNECTIONS"), HTTP_MAX_CONNECTIONS)),
+        "max_keepalive_connections": int(os.getenv(_service_env(service, "MAX_KEEPALIVE_CONNECTIONS"), HTTP_MAX_KEEPALIVE_CONNECTIONS)),
+        "keepalive_expiry": float(os.getenv(_service_env(service, "KEEPALIVE_EXPIRY"), HTTP_KEEPALIVE_EXPIRY)),
+        "connect_timeout": float(os.getenv(_service_env(service, "CONNECT_TIMEOUT"), HTTP_CONNECT_TIMEOUT)),
+        "read_timeout": float(os.getenv(_service_env(service, "READ_TIMEOUT"), HTTP_READ_TIMEOUT)),
+        "pool_timeout": float(os.getenv(_service_env(service, "POOL_TIMEOUT"), HTTP_POOL_TIMEOUT)),
+        "http2": _env_bool(_service_env(service, "HTTP2"), HTTP2_ENABLED),
+    }
+
+
+# Bulkhead and circuit-breaker defaults (see utils/resilience.py), overridable per service
+# like the pool settings, e.g. GATEWAY_DASHBOARD_MAX_IN_FLIGHT=20
+UPSTREAM_MAX_IN_FLIGHT = int(os.getenv("GATEWAY_UPSTREAM_MAX_IN_FLIGHT", "50"))
+UPSTREAM_QUEUE_TIMEOUT = float(os.getenv("GATEWAY_UPSTREAM_QUEUE_TIMEOUT", "2.0"))
+BREAKER_FAILURES = int(os.getenv("GATEWAY_BREAKER_FAILURES", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("GATEWAY_BREAKER_RESET_TIMEOUT", "30.0"))
+
+
+def upstream_guard_settings(service: str) -> dict:
+    """
+    Bulkhead and circuit-breaker settings for one upstream service.
+    """
+    return {
+        "max_in_flight": int(os.getenv(_service_env(service, "MAX_IN_FLIGHT"), UPSTREAM_MAX_IN_FLIGHT)),
+        "queue_timeout": float(os.getenv(_service_env(service, "QUEUE_TIMEOUT"), UPSTREAM_QUEUE_TIMEOUT)),
+        "breaker_failures": int(os.getenv(_service_env(service, "BREAKER_FAILURES"), BREAKER_FAILURES)),
+        "breaker_reset_timeout": float(os.getenv(_service_env(service, "BREAKER_RESET_TIMEOUT"), BREAKER_RESET_TIMEOUT)),
+    }
+
+
+# Local JWT verification and principal cache (see utils/auth.py). The secret and algorithm
+# must match the ones user-management signs tokens with.
+JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "mysecretkey")
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+LOCAL_AUTH = _env_bool("GATEWAY_LOCAL_AUTH", True)
+PRINCIPAL_CACHE_TTL = float(os.getenv("GATEWAY_PRINCIPAL_CACHE_TTL", "300"))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("GATEWAY_PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+# Shared secret sent with the identity headers; downstream services only trust those headers
+# when it matches their own GATEWAY_INTERNAL_TOKEN. Identity headers are not sent when unset.
+INTERNAL_TOKEN = os.getenv("GATEWAY_INTERNAL_TOKEN", "")
+
+
+# Response cache for read-only GETs (see utils/cache.py)
+CACHE_BACKEND = os.getenv("GATEWAY_CACHE_BACKEND", "memory").strip().lower()
+CACHE_REDIS_URL = os.getenv("GATEWAY_CACHE_REDIS_URL", "redis://redis:6379/0")
+CACHE_MAX_ENTRIES = int(os.getenv("GATEWAY_CACHE_MAX_ENTRIES", "2048"))
+CACHE_MAX_BODY_BYTES = int(os.getenv("GATEWAY_CACHE_MAX_BODY_BYTES", str(1024 * 1024)))
+CACHE_DEFAULT_TTL = float(os.getenv("GATEWAY_CACHE_DEFAULT_TTL", "60"))
+
+# TTLs by route-name prefix; the longest matching prefix wins.
+# Any route can be overridden with GATEWAY_CACHE_TTL_<ROUTE>, e.g.
+# GATEWAY_CACHE_TTL_DASHBOARD_ML=600 for every route starting with "dashboard:ml"
+CACHE_ROUTE_TTLS = {
+    "dashboard": CACHE_DEFAULT_TTL,
+    "dashboard:ml": 300.0,
+    "dashboard:users": 30.0,
+}
+
+
+def cache_ttl(route: str) -> float:
+    """
+    Time-to-live in seconds for cached responses of a route.
+    """
+    parts = route.split(":")
+    for end in range(len(parts), 0, -1):
+        prefix = ":".join(parts[:end])
+        override = os.getenv("GATEWAY_CACHE_TTL_" + prefix.upper().replace(":", "_").replace("-", "_"))
+        if override is not None:
+            return float(override)
+        if prefix in CACHE_ROUTE_TTLS:
+            return CACHE_ROUTE_TTLS[prefix]
+    return CACHE_DEFAULT_TTL
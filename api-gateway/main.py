@@ -14,6 +14,7 @@ from fastapi import Query, Depends, Header
 from datetime import date
 import logging
 import traceback
+from contextlib import asynccontextmanager
 
 
 import json
@@ -26,7 +27,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'service
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import FastAPI, HTTPException, APIRouter, Body, UploadFile, File, Form
 from services.nonacademic import get_all_sports, create_sport, get_all_clubs, create_club, filter_sports
-from services.dashboard import get_student_progress, get_student_assignments,filter_assignments,sort_assignments, get_student_attendance,get_student_exam_marks,monthly_attendance, current_weekly_attendance,non_academic_attendance,engagement_score, model_features,get_model_feedback
+from services.dashboard import get_student_progress, get_student_assignments,filter_assignments,sort_assignments, get_student_attendance,get_student_exam_marks,monthly_attendance, current_weekly_attendance,non_academic_attendance,engagement_score, model_features,get_model_feedback,get_student_overview
 from services.dashboard import get_teacher_assignments, get_exam_marks_teacher, get_student_progress_teacher, get_weekly_attendance,get_all_Classes,get_low_attendance_students,get_low_attendance_students_count
 from services.dashboard import get_exam_marks_admin,  get_student_progress_admin, get_weekly_attendance_admin, get_stats, get_all_users,forward_admin_access_profile
 
@@ -44,9 +45,23 @@ from services.academic import  get_content_file_by_id,view_auto_graded_submissio
 from services.behavioural import update_collection_active_time,call_prediction_service,model_train,Visualize_data_list,time_spent_on_resources,average_active_time,resource_access_frequency,content_access_start,content_access_close
 
 from services.attendance import attendanceRouter
+from utils.http_clients import init_clients, close_clients
+from utils.cache import cache_stats, close_cache, purge_cache
+from utils.coalesce import coalescing_stats
+from utils.auth import auth_stats, require_gateway_admin
+from utils.resilience import UpstreamUnavailable, guard_stats, track_rejections
 
 
-app = FastAPI(title="Microservices API Gateway") 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Long-lived, pooled upstream clients shared by every proxy module
+    init_clients()
+    yield
+    await close_clients()
+    await close_cache()
+
+
+app = FastAPI(title="Microservices API Gateway", lifespan=lifespan) 
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -56,6 +71,30 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 
 
 
+@app.middleware("http")
+async def upstream_fast_fail(request: Request, call_next):
+    # Routes turn upstream errors into 500s in many different ways; when the cause was an
+    # open circuit or a full bulkhead, answer with a 503 the client can back off from instead
+    rejections = track_rejections()
+    response = await call_next(request)
+    if rejections and response.status_code >= 500:
+        return upstream_unavailable_response(rejections[-1])
+    return response
+
+
+@app.exception_handler(UpstreamUnavailable)
+async def upstream_unavailable_handler(request: Request, exc: UpstreamUnavailable):
+    return upstream_unavailable_response(exc)
+
+
+def upstream_unavailable_response(exc: UpstreamUnavailable) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"The {exc.service} service is temporarily unavailable ({exc.reason}). Please retry shortly."},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -240,13 +279,13 @@ async def fetch_all_clubs():
 
 # Academic
 @app.get("/api/content/file/{content_id}")
-async def get_content_file(content_id: str):
-    return await get_content_file_by_id(content_id)
+async def get_content_file(content_id: str, request: Request):
+    return await get_content_file_by_id(content_id, request_headers=request.headers)
 
 
 @app.get("/api/assignment/file/{assignment_id}")
-async def get_content_file(assignment_id: str):
-    return await get_assignment_file_by_id(assignment_id)
+async def get_content_file(assignment_id: str, request: Request):
+    return await get_assignment_file_by_id(assignment_id, request_headers=request.headers)
 
 
 @app.get("/api/subject/{student_id}", response_model=List)
@@ -308,8 +347,8 @@ async def get_student_list(class_id: str, subject_id: str):
 
 
 @app.get("/api/submission/file/{submission_id}")
-async def get_submission_file(submission_id: str):
-    return await get_submission_file_by_id(submission_id)
+async def get_submission_file(submission_id: str, request: Request):
+    return await get_submission_file_by_id(submission_id, request_headers=request.headers)
 
 
 @app.get("/api/subjectNclass/{teacher_id}")
@@ -581,6 +620,11 @@ async def dashboard_model_feedback(student_id: str, class_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/dashboard/student/{student_id}/{class_id}/overview")
+async def dashboard_overview(student_id: str, class_id: str):
+    # Single round trip for the student dashboard page; failed sections are marked, not fatal
+    return await get_student_overview(student_id, class_id)
+
 #Teacher Dashboard Routes
 # @app.get("/api/teacher/dashboard/{teacher_id}/assignments")
 # async def teacher_assignments(teacher_id: str):
@@ -689,6 +733,27 @@ async def weekly_attendance_admin(class_id: str = "CLS001", year: int = datetime
 
     
 
+#Gateway metrics (admins, or callers holding the internal token)
+@app.get("/api/gateway/metrics", dependencies=[Depends(require_gateway_admin)])
+async def gateway_metrics():
+    return {
+        "upstreams": guard_stats(),
+        "cache": cache_stats(),
+        "coalescing": coalescing_stats(),
+        "auth": auth_stats(),
+    }
+
+#Gateway response cache
+@app.get("/api/gateway/cache/stats", dependencies=[Depends(require_gateway_admin)])
+async def gateway_cache_stats():
+    return cache_stats()
+
+@app.delete("/api/gateway/cache", dependencies=[Depends(require_gateway_admin)])
+async def gateway_cache_purge(route: str = Query("", description="Route-name prefix to purge, e.g. 'dashboard:attendance'; empty purges everything")):
+    removed = await purge_cache(route)
+    return {"purged": removed, "route": route or "*"}
+
+
 #Attendance
 app.include_router(attendanceRouter, prefix="/api")
     
@@ -1,31 +1,20 @@
 import os
 import httpx
+from utils.http_clients import get_client
+from utils.cache import purge_cache
+from utils.proxy import proxy_file_download
 from fastapi import HTTPException, UploadFile
-from fastapi.responses import StreamingResponse
-import io
 
 # ACADEMIC_SERVICE_URL = "http://127.0.0.1:8002"
 ACADEMIC_SERVICE_URL = "http://academic:8000"
 
 
-async def get_content_file_by_id(content_id: str):
+async def get_content_file_by_id(content_id: str, request_headers=None):
     try:
-        async with httpx.AsyncClient() as client:
-            url = f"{ACADEMIC_SERVICE_URL}/content/file/{content_id}"
-            print(f"Calling URL: {url}")
-            response = await client.get(url)
-            print(f"Response status: {response.status_code}")
-            response.raise_for_status()
-
-            content_type = response.headers.get("content-type", "application/octet-stream")
-            content_disposition = response.headers.get("content-disposition", "attachment")
-            filename = response.headers.get("filename", f"file-{content_id}")
-            #Use io.BytesIO for proper StreamingResponse
-            return StreamingResponse(
-                io.BytesIO(response.content),
-                media_type=content_type,
-                headers={"Content-Disposition": content_disposition}
-            )
+        url = f"{ACADEMIC_SERVICE_URL}/content/file/{content_id}"
+        print(f"Calling URL: {url}")
+        # Streamed chunk by chunk; Range / ETag headers are forwarded for video seeking
+        return await proxy_file_download("academic", url, request_headers=request_headers)
 
     except httpx.HTTPStatusError as exc:
         print(f"[ERROR] HTTPStatusError: {exc.response.status_code} - {exc.response.text}")
@@ -36,11 +25,11 @@ async def get_content_file_by_id(content_id: str):
      
 async def get_student_list_by_class_and_subject(class_id, subject_id):
     try:
-        async with httpx.AsyncClient() as client:
-            url = f"{ACADEMIC_SERVICE_URL}/students/{class_id}/{subject_id}"
-            response = await client.get(url)
-            response.raise_for_status()
-            return response.json()
+        client = get_client("academic")
+        url = f"{ACADEMIC_SERVICE_URL}/students/{class_id}/{subject_id}"
+        response = await client.get(url)
+        response.raise_for_status()
+        return response.json()
     except httpx.HTTPStatusError as exc:
         raise HTTPException(status_code=exc.response.status_code, detail=f"HTTP error: {exc.response.text}")
     except Exception as exc:
@@ -48,26 +37,12 @@ async def get_student_list_by_class_and_subject(class_id, subject_id):
 
 
 
-async def get_submission_file_by_id(submission_id):
+async def get_submission_file_by_id(submission_id, request_headers=None):
     try:
-        async with httpx.AsyncClient() as client:
-            url = f"{ACADEMIC_SERVICE_URL}/submission/file/{submission_id}"
-            print(f"Calling URL: {url}")
-            response = await client.get(url)
-            print(f"Response Status: {response.status_code}, Headers: {response.headers}")
-            response.raise_for_status()
-            
-            # Extract the headers we need to forward
-            content_type = response.headers.get("content-type", "application/octet-stream")
-            content_disposition = response.headers.get("content-disposition", "attachment")
-            filename = response.headers.get("filename", f"file-{submission_id}")
-            
-            # Return a StreamingResponse instead of raw content
-            return StreamingResponse(
-                iter([response.content]), 
-                media_type=content_type,
-                headers={"Content-Disposition": content_disposition}
-            )
+        url = f"{ACADEMIC_SERVICE_URL}/submission/file/{submission_id}"
+        print(f"Calling URL: {url}")
+        # Stream the file through instead of buffering it in gateway memory
+        return await proxy_file_download("academic", url, request_headers=request_headers)
     except httpx.HTTPStatusError as exc:
         print(f"HTTPStatusError: {exc.response.status_code}, {exc.response.text}")
         raise HTTPException(status_code=exc.response.status_code, detail=f"HTTP error: {exc.response.text}")
@@ -76,26 +51,12 @@ async def get_submission_file_by_id(submission_id):
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(exc)}")
     
 
-async def get_assignment_file_by_id(assignment_id: str):
+async def get_assignment_file_by_id(assignment_id: str, request_headers=None):
     try:
-        async with httpx.AsyncClient() as client:
-            url = f"{ACADEMIC_SERVICE_URL}/assignment/file/{assignment_id}"
-            print(f"Calling URL: {url}")
-            response = await client.get(url)
-            print(f"Response Status: {response.status_code}, Headers: {response.headers}")
-            response.raise_for_status()
-            
-            # Extract the headers we need to forward
-            content_type = response.headers.get("content-type", "application/octet-stream")
-            content_disposition = response.headers.get("content-disposition", "attachment")
-            filename = response.headers.get("filename", f"file-{assignment_id}")
-            
-            # Return a StreamingResponse instead of raw content
-            return StreamingResponse(
-                iter([response.content]), 
-                media_type=content_type,
-                headers={"Content-Disposition": content_disposition}
-            )
+        url = f"{ACADEMIC_SERVICE_URL}/assignment/file/{assignment_id}"
+        print(f"Calling URL: {url}")
+        # Stream the file through instead of buffering it in gateway memory
+        return await proxy_file_download("academic", url, request_headers=request_headers)
     except httpx.HTTPStatusError as exc:
         print(f"HTTPStatusError: {exc.response.status_code}, {exc.response.text}")
         raise HTTPException(status_code=exc.response.status_code, detail=f"HTTP error: {exc.response.text}")
@@ -109,11 +70,11 @@ async def get_subject_names(student_id: str):
     Fetch the list of subjects for a given student by calling the academic service.
     """
     try:
-        async with httpx.AsyncClient() as client:
-            url = f"{ACADEMIC_SERVICE_URL}/students/{student_id}/subjects"
-            response = await client.get(url)
-            response.raise_for_status()  # Raise an exception for HTTP errors
-            return response.json()  # Return the JSON response
+        client = get_client("academic")
+        url = f"{ACADEMIC_SERVICE_URL}/students/{student_id}/subjects"
+        response = await client.get(url)
+        response.raise_for_status()  # Raise an exception for HTTP errors
+        return response.json()  # Return the JSON response
     except httpx.HTTPStatusError as exc:
         # Handle HTTP errors (e.g., 404, 500)
         raise HTTPException(status_code=exc.response.status_code, detail=f"HTTP error: {exc.response.text}")
@@ -124,11 +85,11 @@ async def get_subject_names(student_id: str):
     
 async def get_student_content(student_id: str, subject_id: str):
     try:
-        async with httpx.AsyncClient() as client:
-            url = f"{ACADEMIC_SERVICE_URL}/content/{student_id}/{subject_id}"
-            response = await client.get(url)
-            response.raise_for_status()
-            return response.json()
+        client = get_client("academic")
+        url = f"{ACADEMIC_SERVICE_URL}/content/{student_id}/{subject_id}"
+        response = await client.get(url)
+        response.raise_for_status()
+        return response.json()
     except httpx.HTTPStatusError as exc:
         raise HTTPException(status_code=exc.response.status_code, detail=f"HTTP error: {exc.response.text}")
     except Exception as exc:
@@ -136,11 +97,11 @@ async def get_student_content(student_id: str, subject_id: str):
 
 async def get_all_assignments(student_id: str, subject_id: str):
     try:
-        async with httpx.AsyncClient() as client:
-            url = f"{ACADEMIC_SERVICE_URL}/show_assignments/{student_id}/{subject_id}"
-            response = await client.get(url)
-            response.raise_for_status()
-            return response.json()
+        client = get_client("academic")
+        url = f"{ACADEMIC_SERVICE_URL}/show_assignments/{student_id}/{subject_id}"
+        response = await client.get(url)
+        response.raise_for_status()
+        return response.json()
     except httpx.HTTPStatusError as exc:
         raise HTTPException(status_code=exc.response.status_code, detail=f"HTTP error: {exc.response.text}")
     except Exception as exc:
@@ -148,11 +109,11 @@ async def get_all_assignments(student_id: str, subject_id: str):
     
 async def get_assignment_by_id(assignment_id: str):
     try:
-        async with httpx.AsyncClient() as client:
-            url = f"{ACADEMIC_SERVICE_URL}/assignment/{assignment_id}"
-            response = await client.get(url)
-            response.raise_for_status()
-            return response.json()
+        client = get_client("academic")
+        url = f"{ACADEMIC_SERVICE_URL}/assignment/{assignment_id}"
+        response = await client.get(url)
+        response.raise_for_status()
+        return response.json()
     except httpx.HTTPStatusError as exc:
         raise HTTPException(status_code=exc.response.status_code, detail=f"HTTP error: {exc.response.text}")
     except Exception as exc:
@@ -161,11 +122,11 @@ async def get_assignment_by_id(assignment_id: str):
 
 async def get_assignment_marks(student_id: str):
     try:
-        async with httpx.AsyncClient() as client:
-            url = f"{ACADEMIC_SERVICE_URL}/submissionmarks/{student_id}"
-            response = await client.get(url)
-            response.raise_for_status()
-            return response.json()
+        client = get_client("academic")
+        url = f"{ACADEMIC_SERVICE_URL}/submissionmarks/{student_id}"
+        response = await client.get(url)
+        response.raise_for_status()
+        return response.json()
     except httpx.HTTPStatusError as exc:
         raise HTTPException(status_code=exc.response.status_code, detail=f"HTTP error: {exc.response.text}")
     except Exception as exc:
@@ -177,18 +138,18 @@ async def get_exam_marks(student_id: str):
         print(f"Fetching exam marks for student: {student_id}")
         print(f"ACADEMIC_SERVICE_URL: {ACADEMIC_SERVICE_URL}")
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            url = f"{ACADEMIC_SERVICE_URL}/exammarks/{student_id}"
-            print(f"Full request URL: {url}")
+        client = get_client("academic")
+        url = f"{ACADEMIC_SERVICE_URL}/exammarks/{student_id}"
+        print(f"Full request URL: {url}")
             
-            response = await client.get(url)
-            print(f"Response status: {response.status_code}")
-            print(f"Response headers: {dict(response.headers)}")
+        response = await client.get(url, timeout=30.0)
+        print(f"Response status: {response.status_code}")
+        print(f"Response headers: {dict(response.headers)}")
             
-            response.raise_for_status()
-            data = response.json()
-            print(f"Successfully retrieved {len(data)} exam records")
-            return data
+        response.raise_for_status()
+        data = response.json()
+        print(f"Successfully retrieved {len(data)} exam records")
+        return data
             
     except httpx.HTTPStatusError as exc:
         print(f"HTTP Status Error: {exc.response.status_code}")
@@ -208,21 +169,23 @@ async def get_exam_marks(student_id: str):
 async def upload_assignment_file(student_id: str, assignment_id: str, file: UploadFile):
     try:
         print(f"Starting upload for {student_id}/{assignment_id}")
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            files = {"file": (file.filename, await file.read(), file.content_type)}
-            url = f"{ACADEMIC_SERVICE_URL}/submission/{student_id}/{assignment_id}"
+        client = get_client("academic")
+        files = {"file": (file.filename, await file.read(), file.content_type)}
+        url = f"{ACADEMIC_SERVICE_URL}/submission/{student_id}/{assignment_id}"
             
-            print(f"Sending request to: {url}")
-            response = await client.post(url, files=files)
+        print(f"Sending request to: {url}")
+        response = await client.post(url, files=files, timeout=30.0)
             
-            print(f"Response status: {response.status_code}")
-            print(f"Response headers: {response.headers}")
+        print(f"Response status: {response.status_code}")
+        print(f"Response headers: {response.headers}")
             
-            response.raise_for_status()
+        response.raise_for_status()
+        await purge_cache("dashboard:assignments")
+        await purge_cache("dashboard:progress")
             
-            response_data = response.json()
-            print(f"Response data received successfully")
-            return response_data
+        response_data = response.json()
+        print(f"Response data received successfully")
+        return response_data
             
     except httpx.HTTPStatusError as exc:
         print(f"HTTP Status Error: {exc.response.status_code}")
@@ -237,19 +200,20 @@ async def upload_assignment_file(student_id: str, assignment_id: str, file: Uplo
 
 async def mark_content_done(content_id: str, student_id: str): # Now accepts student_id
     try:
-        async with httpx.AsyncClient() as client:
-            # The URL for the academic service endpoint
-            url = f"{ACADEMIC_SERVICE_URL}/content/{content_id}"
+        client = get_client("academic")
+        # The URL for the academic service endpoint
+        url = f"{ACADEMIC_SERVICE_URL}/content/{content_id}"
             
-            # The JSON payload to send
-            json_payload = {"student_id": student_id}
+        # The JSON payload to send
+        json_payload = {"student_id": student_id}
             
-            # --- THIS IS THE KEY CHANGE ---
-            # Add the `json` parameter to your post request
-            response = await client.post(url, json=json_payload)
+        # --- THIS IS THE KEY CHANGE ---
+        # Add the `json` parameter to your post request
+        response = await client.post(url, json=json_payload)
             
-            response.raise_for_status() # This will raise an error for 4xx or 5xx responses
-            return response.json()
+        response.raise_for_status() # This will raise an error for 4xx or 5xx responses
+        await purge_cache("dashboard:progress")
+        return response.json()
             
     except httpx.HTTPStatusError as exc:
         # Re-raise the error from the downstream service with its details
@@ -265,11 +229,11 @@ async def mark_content_done(content_id: str, student_id: str): # Now accepts stu
 ###teacher 
 async def get_subject_and_class_for_teacher(teacher_id: str):
     try:
-        async with httpx.AsyncClient() as client:
-            url = f"{ACADEMIC_SERVICE_URL}/subjectNclass/{teacher_id}"
-            response = await client.get(url)
-            response.raise_for_status()
-            return response.json()
+        client = get_client("academic")
+        url = f"{ACADEMIC_SERVICE_URL}/subjectNclass/{teacher_id}"
+        response = await client.get(url)
+        response.raise_for_status()
+        return response.json()
     except httpx.HTTPStatusError as exc:
         raise HTTPException(status_code=exc.response.status_code, detail=f"HTTP error: {exc.response.text}")
     except Exception as exc:
@@ -277,22 +241,23 @@ async def get_subject_and_class_for_teacher(teacher_id: str):
 
 async def create_assignment_request(class_id: str, subject_id: str, teacher_id: str, form_data: dict, file: UploadFile):
     try:
-        async with httpx.AsyncClient() as client:
-            url = f"{ACADEMIC_SERVICE_URL}/assignmentcreate/{class_id}/{subject_id}/{teacher_id}"
-            data = {
-                "assignment_name": form_data["assignment_name"],
-                "description": form_data["description"],
-                "deadline": form_data["deadline"],
-                "grading_type": form_data["grading_type"],
-            }
-            if form_data["grading_type"] == "auto":
-                data["sample_answer"] = form_data.get("sample_answer", "")
-
-            files = {"file": (file.filename, await file.read(), file.content_type)}
-
-            response = await client.post(url, data=data, files=files)
-            response.raise_for_status()
-            return response.json()
+        client = get_client("academic")
+        url = f"{ACADEMIC_SERVICE_URL}/assignmentcreate/{class_id}/{subject_id}/{teacher_id}"
+        data = {
+            "assignment_name": form_data["assignment_name"],
+            "description": form_data["description"],
+            "deadline": form_data["deadline"],
+            "grading_type": form_data["grading_type"],
+        }
+        if form_data["grading_type"] == "auto":
+            data["sample_answer"] = form_data.get("sample_answer", "")
+
+        files = {"file": (file.filename, await file.read(), file.content_type)}
+
+        response = await client.post(url, data=data, files=files)
+        response.raise_for_status()
+        await purge_cache("dashboard:assignments")
+        return response.json()
     except httpx.HTTPStatusError as exc:
         # Show the backend error for debugging
         print("Backend error:", exc.response.text)
@@ -303,16 +268,16 @@ async def create_assignment_request(class_id: str, subject_id: str, teacher_id:
 
 async def upload_content_request(class_id: str, subject_id: str, content_name: str, description: str, file: UploadFile):
     try:
-        async with httpx.AsyncClient() as client:
-            url = f"{ACADEMIC_SERVICE_URL}/contentupload/{class_id}/{subject_id}"
-            data = {
-                "content_name": content_name,
-                "description": description,
-            }
-            files = {"file": (file.filename, await file.read(), file.content_type)}
-            response = await client.post(url, data=data, files=files)
-            response.raise_for_status()
-            return response.json()
+        client = get_client("academic")
+        url = f"{ACADEMIC_SERVICE_URL}/contentupload/{class_id}/{subject_id}"
+        data = {
+            "content_name": content_name,
+            "description": description,
+        }
+        files = {"file": (file.filename, await file.read(), file.content_type)}
+        response = await client.post(url, data=data, files=files)
+        response.raise_for_status()
+        return response.json()
     except httpx.HTTPStatusError as exc:
         raise HTTPException(status_code=exc.response.status_code, detail=f"HTTP error: {exc.response.text}")
     except Exception as exc:
@@ -320,11 +285,11 @@ async def upload_content_request(class_id: str, subject_id: str, content_name: s
 
 async def view_ungraded_manual_submissions(teacher_id: str):
     try:
-        async with httpx.AsyncClient() as client:
-            url = f"{ACADEMIC_SERVICE_URL}/submission_view/{teacher_id}"
-            response = await client.get(url)
-            response.raise_for_status()
-            return response.json()  # Already returns dict with two keys
+        client = get_client("academic")
+        url = f"{ACADEMIC_SERVICE_URL}/submission_view/{teacher_id}"
+        response = await client.get(url)
+        response.raise_for_status()
+        return response.json()  # Already returns dict with two keys
     except httpx.HTTPStatusError as exc:
         raise HTTPException(status_code=exc.response.status_code, detail=f"HTTP error: {exc.response.text}")
     except Exception as exc:
@@ -333,12 +298,13 @@ async def view_ungraded_manual_submissions(teacher_id: str):
 
 async def update_manual_marks(teacher_id: str, submission_id: str, marks: float):
     try:
-        async with httpx.AsyncClient() as client:
-            url = f"{ACADEMIC_SERVICE_URL}/update_submission_marks/{teacher_id}"
-            data = {"submission_id": submission_id, "marks": marks}
-            response = await client.post(url, data=data)
-            response.raise_for_status()
-            return response.json()
+        client = get_client("academic")
+        url = f"{ACADEMIC_SERVICE_URL}/update_submission_marks/{teacher_id}"
+        data = {"submission_id": submission_id, "marks": marks}
+        response = await client.post(url, data=data)
+        response.raise_for_status()
+        await purge_cache("dashboard:assignments")
+        return response.json()
     except httpx.HTTPStatusError as exc:
         raise HTTPException(status_code=exc.response.status_code, detail=f"HTTP error: {exc.response.text}")
     except Exception as exc:
@@ -347,11 +313,12 @@ async def update_manual_marks(teacher_id: str, submission_id: str, marks: float)
 
 async def add_exam_marks_request(form_data: dict):
     try:
-        async with httpx.AsyncClient() as client:
-            url = f"{ACADEMIC_SERVICE_URL}/update_exam_marks"
-            response = await client.post(url, data=form_data)
-            response.raise_for_status()
-            return response.json()
+        client = get_client("academic")
+        url = f"{ACADEMIC_SERVICE_URL}/update_exam_marks"
+        response = await client.post(url, data=form_data)
+        response.raise_for_status()
+        await purge_cache("dashboard:marks")
+        return response.json()
     except httpx.HTTPStatusError as exc:
         raise HTTPException(status_code=exc.response.status_code, detail=f"HTTP error: {exc.response.text}")
     except Exception as exc:
@@ -360,11 +327,11 @@ async def add_exam_marks_request(form_data: dict):
 
 async def view_auto_graded_submissions_request(teacher_id: str):
     try:
-        async with httpx.AsyncClient() as client:
-            url = f"{ACADEMIC_SERVICE_URL}/auto_graded_submissions/{teacher_id}"
-            response = await client.get(url)
-            response.raise_for_status()
-            return response.json()
+        client = get_client("academic")
+        url = f"{ACADEMIC_SERVICE_URL}/auto_graded_submissions/{teacher_id}"
+        response = await client.get(url)
+        response.raise_for_status()
+        return response.json()
     except httpx.HTTPStatusError as exc:
         raise HTTPException(status_code=exc.response.status_code, detail=f"HTTP error: {exc.response.text}")
     except Exception as exc:
@@ -373,16 +340,17 @@ async def view_auto_graded_submissions_request(teacher_id: str):
 
 async def review_auto_graded_marks_request(teacher_id: str, submission_id: str, marks: float, action: str):
     try:
-        async with httpx.AsyncClient() as client:
-            url = f"{ACADEMIC_SERVICE_URL}/review_auto_graded_marks/{teacher_id}"
-            data = {
-                "submission_id": submission_id,
-                "marks": marks,
-                "action": action
-            }
-            response = await client.post(url, data=data)
-            response.raise_for_status()
-            return response.json()
+        client = get_client("academic")
+        url = f"{ACADEMIC_SERVICE_URL}/review_auto_graded_marks/{teacher_id}"
+        data = {
+            "submission_id": submission_id,
+            "marks": marks,
+            "action": action
+        }
+        response = await client.post(url, data=data)
+        response.raise_for_status()
+        await purge_cache("dashboard:assignments")
+        return response.json()
     except httpx.HTTPStatusError as exc:
         raise HTTPException(status_code=exc.response.status_code, detail=f"HTTP error: {exc.response.text}")
     except Exception as exc:
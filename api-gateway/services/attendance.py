@@ -1,9 +1,12 @@
 import httpx
-from fastapi import APIRouter, Form, File, UploadFile, Query, Request
+from utils.http_clients import get_client
+from utils.cache import purge_cache
+from utils.proxy import proxy_passthrough, proxy_file_download
+from fastapi import APIRouter, Form, File, UploadFile, Query, Request, HTTPException
 from datetime import datetime
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from typing import Dict
+from typing import Dict, List
 
 # ATTENDANCE_SERVICE_URL = "http://127.0.0.1:8004"
 ATTENDANCE_SERVICE_URL = "http://attendance:8000"
@@ -25,6 +28,9 @@ class AttendanceEntry(BaseModel):
     date: str
     status: Dict[str, str]  # e.g., {"std001": "present", "std002": "absent"}
 
+class BulkAttendanceRequest(BaseModel):
+    entries: List[AttendanceEntry]
+
 class CalendarEventFeatures(BaseModel):
     is_exam_week: int
     is_event_day: int
@@ -36,16 +42,22 @@ class CalendarEventRequest(BaseModel):
     date: str
     features: CalendarEventFeatures
 
+class PresignedUploadRequest(BaseModel):
+    student_id: str
+    class_id: str
+    subject_id: str = "academic"
+    date: str = None
+    file_name: str
+    content_type: str
+
 # get class students
 @attendanceRouter.post("/attendance/students/by-class")
 async def forward_get_class_students(request_data: StudentsOfClassRequest):
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{ATTENDANCE_SERVICE_URL}/attendance/students/by-class",
-                json=request_data.dict()
-            )
-        return JSONResponse(content=response.json(), status_code=response.status_code)
+        return await proxy_passthrough(
+            "attendance", "POST", f"{ATTENDANCE_SERVICE_URL}/attendance/students/by-class",
+            json=request_data.dict()
+        )
 
     except Exception as e:
         return JSONResponse(
@@ -57,28 +69,84 @@ async def forward_get_class_students(request_data: StudentsOfClassRequest):
 @attendanceRouter.post("/attendance/attendance_marking", status_code=201)
 async def forward_mark_attendance(request_data: AttendanceEntry):
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{ATTENDANCE_SERVICE_URL}/attendance/attendance_marking",
-                json=request_data.dict()
-            )
-        return JSONResponse(content=response.json(), status_code=response.status_code)
+        response = await proxy_passthrough(
+            "attendance", "POST", f"{ATTENDANCE_SERVICE_URL}/attendance/attendance_marking",
+            json=request_data.dict()
+        )
+        if response.status_code < 400:
+            # Attendance figures shown on the dashboards are now stale
+            await purge_cache("dashboard:attendance")
+        return response
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={"detail": f"Gateway error: {str(e)}"}
+        )
+
+# mark or update many attendance records at once
+@attendanceRouter.post("/attendance/attendance_marking/bulk", status_code=200)
+async def forward_bulk_mark_attendance(request_data: BulkAttendanceRequest):
+    try:
+        response = await proxy_passthrough(
+            "attendance", "POST", f"{ATTENDANCE_SERVICE_URL}/attendance/attendance_marking/bulk",
+            json=request_data.dict()
+        )
+        if response.status_code < 400:
+            # Attendance figures shown on the dashboards are now stale
+            await purge_cache("dashboard:attendance")
+        return response
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={"detail": f"Gateway error: {str(e)}"}
+        )
+
+# bulk historical attendance import (large imports are better run with the service's CLI)
+@attendanceRouter.post("/attendance/import", status_code=202)
+async def forward_import_attendance(
+    file: UploadFile = File(...),
+    format: str = Form(None),
+    restart: bool = Form(False)
+):
+    try:
+        files = {"file": (file.filename, file.file, file.content_type)}
+        data = {"restart": str(restart).lower()}
+        if format:
+            data["format"] = format
+        # The file object is streamed to the service rather than read into memory
+        return await proxy_passthrough(
+            "attendance", "POST", f"{ATTENDANCE_SERVICE_URL}/attendance/import",
+            files=files,
+            data=data
+        )
     except Exception as e:
         return JSONResponse(
             status_code=500,
             content={"detail": f"Gateway error: {str(e)}"}
         )
 
+# bulk import progress
+@attendanceRouter.get("/attendance/import/{import_id}", status_code=200)
+async def forward_import_status(import_id: str):
+    try:
+        return await proxy_passthrough(
+            "attendance", "GET", f"{ATTENDANCE_SERVICE_URL}/attendance/import/{import_id}"
+        )
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"detail": f"Gateway error: {str(e)}"})
+
 # update attendance
 @attendanceRouter.put("/attendance/update_attendance_of_class/{attendance_id}", status_code=202)
 async def forward_update_attendance(attendance_id: str, updated_attendance: AttendanceEntry):
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.put(
-                f"{ATTENDANCE_SERVICE_URL}/attendance/update_attendance_of_class/{attendance_id}",
-                json=updated_attendance.dict()
-            )
-        return JSONResponse(content=response.json(), status_code=response.status_code)
+        response = await proxy_passthrough(
+            "attendance", "PUT", f"{ATTENDANCE_SERVICE_URL}/attendance/update_attendance_of_class/{attendance_id}",
+            json=updated_attendance.dict()
+        )
+        if response.status_code < 400:
+            # Attendance figures shown on the dashboards are now stale
+            await purge_cache("dashboard:attendance")
+        return response
 
     except Exception as e:
         return JSONResponse(
@@ -90,11 +158,13 @@ async def forward_update_attendance(attendance_id: str, updated_attendance: Atte
 @attendanceRouter.delete("/attendance/delete-attendance-of-class/{attendance_id}", status_code=200)
 async def forward_delete_attendance(attendance_id: str):
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.delete(
-                f"{ATTENDANCE_SERVICE_URL}/attendance/delete-attendance-of-class/{attendance_id}"
-            )
-        return JSONResponse(content=response.json(), status_code=response.status_code)
+        response = await proxy_passthrough(
+            "attendance", "DELETE", f"{ATTENDANCE_SERVICE_URL}/attendance/delete-attendance-of-class/{attendance_id}"
+        )
+        if response.status_code < 400:
+            # Attendance figures shown on the dashboards are now stale
+            await purge_cache("dashboard:attendance")
+        return response
 
     except Exception as e:
         return JSONResponse(
@@ -106,12 +176,10 @@ async def forward_delete_attendance(attendance_id: str):
 @attendanceRouter.get("/attendance/class/academic/ratio", status_code=200)
 async def forward_class_academic_ratio(class_id: str, subject_id: str = "academic", summary_type: str = "monthly"):
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{ATTENDANCE_SERVICE_URL}/attendance/class/academic/ratio",
-                params={"class_id": class_id, "subject_id": subject_id, "summary_type": summary_type}
-            )
-        return JSONResponse(content=response.json(), status_code=response.status_code)
+        return await proxy_passthrough(
+            "attendance", "GET", f"{ATTENDANCE_SERVICE_URL}/attendance/class/academic/ratio",
+            params={"class_id": class_id, "subject_id": subject_id, "summary_type": summary_type}
+        )
     except Exception as e:
         return JSONResponse(
             status_code=500, 
@@ -122,12 +190,10 @@ async def forward_class_academic_ratio(class_id: str, subject_id: str = "academi
 @attendanceRouter.get("/attendance/class/nonacademic/ratio", status_code=200)
 async def forward_class_nonacademic_ratio(class_id: str, subject_id: str, summary_type: str = "monthly"):
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{ATTENDANCE_SERVICE_URL}/attendance/class/nonacademic/ratio",
-                params={"class_id": class_id, "subject_id": subject_id, "summary_type": summary_type}
-            )
-        return JSONResponse(content=response.json(), status_code=response.status_code)
+        return await proxy_passthrough(
+            "attendance", "GET", f"{ATTENDANCE_SERVICE_URL}/attendance/class/nonacademic/ratio",
+            params={"class_id": class_id, "subject_id": subject_id, "summary_type": summary_type}
+        )
     except Exception as e:
         return JSONResponse(
             status_code=500, 
@@ -138,12 +204,10 @@ async def forward_class_nonacademic_ratio(class_id: str, subject_id: str, summar
 @attendanceRouter.get("/attendance/student/academic/ratio", status_code=200)
 async def forward_student_academic_ratio(student_id: str, subject_id: str = "academic", summary_type: str = "monthly"):
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{ATTENDANCE_SERVICE_URL}/attendance/student/academic/ratio",
-                params={"student_id": student_id, "subject_id": subject_id, "summary_type": summary_type}
-            )
-        return JSONResponse(content=response.json(), status_code=response.status_code)
+        return await proxy_passthrough(
+            "attendance", "GET", f"{ATTENDANCE_SERVICE_URL}/attendance/student/academic/ratio",
+            params={"student_id": student_id, "subject_id": subject_id, "summary_type": summary_type}
+        )
     except Exception as e:
         return JSONResponse(
             status_code=500, 
@@ -154,12 +218,10 @@ async def forward_student_academic_ratio(student_id: str, subject_id: str = "aca
 @attendanceRouter.get("/attendance/student/nonacademic/ratio", status_code=200)
 async def forward_student_nonacademic_ratio(student_id: str, subject_id: str, summary_type: str = "monthly"):
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{ATTENDANCE_SERVICE_URL}/attendance/student/nonacademic/ratio",
-                params={"student_id": student_id, "subject_id": subject_id, "summary_type": summary_type}
-            )
-        return JSONResponse(content=response.json(), status_code=response.status_code)
+        return await proxy_passthrough(
+            "attendance", "GET", f"{ATTENDANCE_SERVICE_URL}/attendance/student/nonacademic/ratio",
+            params={"student_id": student_id, "subject_id": subject_id, "summary_type": summary_type}
+        )
     except Exception as e:
         return JSONResponse(
             status_code=500, 
@@ -175,12 +237,10 @@ async def forward_class_academic_summary(
     month: str = None
 ):
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{ATTENDANCE_SERVICE_URL}/attendance/class/academic/summary",
-                params={"class_id": class_id, "subject_id": subject_id, "summary_type": summary_type, "month": month}
-            )
-        return JSONResponse(content=response.json(), status_code=response.status_code)
+        return await proxy_passthrough(
+            "attendance", "GET", f"{ATTENDANCE_SERVICE_URL}/attendance/class/academic/summary",
+            params={"class_id": class_id, "subject_id": subject_id, "summary_type": summary_type, "month": month}
+        )
     except Exception as e:
         return JSONResponse(
             status_code=500, 
@@ -196,12 +256,10 @@ async def forward_class_nonacademic_summary(
     month: str = None
 ):
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{ATTENDANCE_SERVICE_URL}/attendance/class/nonacademic/summary",
-                params={"class_id": class_id, "subject_id": subject_id, "summary_type": summary_type, "month": month}
-            )
-        return JSONResponse(content=response.json(), status_code=response.status_code)
+        return await proxy_passthrough(
+            "attendance", "GET", f"{ATTENDANCE_SERVICE_URL}/attendance/class/nonacademic/summary",
+            params={"class_id": class_id, "subject_id": subject_id, "summary_type": summary_type, "month": month}
+        )
     except Exception as e:
         return JSONResponse(
             status_code=500, 
@@ -217,12 +275,10 @@ async def forward_student_academic_summary(
     month: str = None
 ):
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{ATTENDANCE_SERVICE_URL}/attendance/student/academic/summary",
-                params={"student_id": student_id, "subject_id": subject_id, "summary_type": summary_type, "month": month}
-            )
-        return JSONResponse(content=response.json(), status_code=response.status_code)
+        return await proxy_passthrough(
+            "attendance", "GET", f"{ATTENDANCE_SERVICE_URL}/attendance/student/academic/summary",
+            params={"student_id": student_id, "subject_id": subject_id, "summary_type": summary_type, "month": month}
+        )
     except Exception as e:
         return JSONResponse(
             status_code=500, 
@@ -238,12 +294,10 @@ async def forward_student_nonacademic_summary(
     month: str = None
 ):
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{ATTENDANCE_SERVICE_URL}/attendance/student/nonacademic/summary",
-                params={"student_id": student_id, "subject_id": subject_id, "summary_type": summary_type, "month": month}
-            )
-        return JSONResponse(content=response.json(), status_code=response.status_code)
+        return await proxy_passthrough(
+            "attendance", "GET", f"{ATTENDANCE_SERVICE_URL}/attendance/student/nonacademic/summary",
+            params={"student_id": student_id, "subject_id": subject_id, "summary_type": summary_type, "month": month}
+        )
     except Exception as e:
         return JSONResponse(
             status_code=500, 
@@ -258,12 +312,30 @@ async def forward_class_history(
     date: str
 ):
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{ATTENDANCE_SERVICE_URL}/attendance/history",
-                params={"class_id": class_id, "subject_id": subject_id, "date": date}
-            )
-        return JSONResponse(content=response.json(), status_code=response.status_code)
+        return await proxy_passthrough(
+            "attendance", "GET", f"{ATTENDANCE_SERVICE_URL}/attendance/history",
+            params={"class_id": class_id, "subject_id": subject_id, "date": date}
+        )
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"detail": f"Gateway error: {str(e)}"})
+
+# attendance export, streamed chunk by chunk
+@attendanceRouter.get("/attendance/export", status_code=200)
+async def forward_export_attendance(
+    class_id: str,
+    subject_id: str,
+    start_date: str,
+    end_date: str,
+    format: str = "csv"
+):
+    try:
+        query = httpx.QueryParams({
+            "class_id": class_id, "subject_id": subject_id,
+            "start_date": start_date, "end_date": end_date, "format": format
+        })
+        return await proxy_file_download("attendance", f"{ATTENDANCE_SERVICE_URL}/attendance/export?{query}")
+    except httpx.HTTPStatusError as exc:
+        raise HTTPException(status_code=exc.response.status_code, detail=exc.response.text)
     except Exception as e:
         return JSONResponse(status_code=500, content={"detail": f"Gateway error: {str(e)}"})
 
@@ -277,10 +349,8 @@ async def forward_medical_upload(
     date: str = Form(datetime.now().strftime("%Y-%m-%d"))
 ):
     try:
-        file_bytes = await file.read()
-
         files = {
-            "file": (file.filename, file_bytes, file.content_type),
+            "file": (file.filename, file.file, file.content_type),
         }
         data = {
             "student_id": student_id,
@@ -288,13 +358,12 @@ async def forward_medical_upload(
             "subject_id": subject_id,
             "date": date
         }
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{ATTENDANCE_SERVICE_URL}/attendance/document-upload",
-                files=files,
-                data=data
-            )
-        return JSONResponse(content=response.json(), status_code=response.status_code)
+        # The file object is streamed to the service rather than read into memory
+        return await proxy_passthrough(
+            "attendance", "POST", f"{ATTENDANCE_SERVICE_URL}/attendance/document-upload",
+            files=files,
+            data=data
+        )
 
     except Exception as e:
         return JSONResponse(
@@ -302,6 +371,33 @@ async def forward_medical_upload(
             content={"detail": f"Gateway error: {str(e)}"}
         )
 
+# presigned document upload: the file is sent straight to storage, not through the gateway
+@attendanceRouter.post("/attendance/document-upload/presign", status_code=201)
+async def forward_presigned_upload(request_data: PresignedUploadRequest):
+    try:
+        return await proxy_passthrough(
+            "attendance", "POST", f"{ATTENDANCE_SERVICE_URL}/attendance/document-upload/presign",
+            json=request_data.dict(exclude_none=True)
+        )
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={"detail": f"Gateway error: {str(e)}"}
+        )
+
+# presigned document upload completion
+@attendanceRouter.post("/attendance/document-upload/{upload_id}/complete", status_code=201)
+async def forward_complete_presigned_upload(upload_id: str):
+    try:
+        return await proxy_passthrough(
+            "attendance", "POST", f"{ATTENDANCE_SERVICE_URL}/attendance/document-upload/{upload_id}/complete"
+        )
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={"detail": f"Gateway error: {str(e)}"}
+        )
+
 # document fetch
 @attendanceRouter.get("/attendance/documents", status_code=200)
 async def forward_get_medicals(
@@ -310,16 +406,14 @@ async def forward_get_medicals(
     student_id: str = Query("all")
 ):
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{ATTENDANCE_SERVICE_URL}/attendance/documents",
-                params={
-                    "class_id": class_id,
-                    "subject_id": subject_id,
-                    "student_id": student_id
-                }
-            )
-        return JSONResponse(content=response.json(), status_code=response.status_code)
+        return await proxy_passthrough(
+            "attendance", "GET", f"{ATTENDANCE_SERVICE_URL}/attendance/documents",
+            params={
+                "class_id": class_id,
+                "subject_id": subject_id,
+                "student_id": student_id
+            }
+        )
     except Exception as e:
         return JSONResponse(
             status_code=500,
@@ -333,11 +427,9 @@ async def forward_delete_medical_document(document_id: str):
     API Gateway: Forwards DELETE request to attendance service's document deletion route.
     """
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.delete(
-                f"{ATTENDANCE_SERVICE_URL}/attendance/delete/document/{document_id}"
-            )
-        return JSONResponse(content=response.json(), status_code=response.status_code)
+        return await proxy_passthrough(
+            "attendance", "DELETE", f"{ATTENDANCE_SERVICE_URL}/attendance/delete/document/{document_id}"
+        )
     except Exception as e:
         return JSONResponse(
             status_code=500,
@@ -348,11 +440,9 @@ async def forward_delete_medical_document(document_id: str):
 @attendanceRouter.get("/attendance/non-acadamic/subjects/{student_id}", summary="Forward student-specific non-academic subjects")
 async def forward_get_student_nonacadamic_subjects(student_id: str):
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{ATTENDANCE_SERVICE_URL}/attendance/non-acadamic/subjects/{student_id}"
-            )
-        return JSONResponse(content=response.json(), status_code=response.status_code)
+        return await proxy_passthrough(
+            "attendance", "GET", f"{ATTENDANCE_SERVICE_URL}/attendance/non-acadamic/subjects/{student_id}"
+        )
     except Exception as e:
         return JSONResponse(
             status_code=500,
@@ -363,11 +453,9 @@ async def forward_get_student_nonacadamic_subjects(student_id: str):
 @attendanceRouter.get("/attendance/non-acadamic/subjects", summary="Forward all non-academic subjects")
 async def forward_get_all_nonacadamic_subjects():
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{ATTENDANCE_SERVICE_URL}/attendance/non-acadamic/subjects"
-            )
-        return JSONResponse(content=response.json(), status_code=response.status_code)
+        return await proxy_passthrough(
+            "attendance", "GET", f"{ATTENDANCE_SERVICE_URL}/attendance/non-acadamic/subjects"
+        )
     except Exception as e:
         return JSONResponse(
             status_code=500,
@@ -385,18 +473,16 @@ async def forward_get_attendance_prediction(
      today_date: str = Query(datetime.now().strftime("%Y-%m-%d"))
 ):
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{ATTENDANCE_SERVICE_URL}/attendance/summary",
-                params={
-                    "class_id": class_id,
-                    "subject_id": subject_id,
-                    "start_date": start_date,
-                    "end_date": end_date,
-                    # "current_date": current_date,
-                    "today_date": today_date,                }
-            )
-        return JSONResponse(content=response.json(), status_code=response.status_code)
+        return await proxy_passthrough(
+            "attendance", "GET", f"{ATTENDANCE_SERVICE_URL}/attendance/summary",
+            params={
+                "class_id": class_id,
+                "subject_id": subject_id,
+                "start_date": start_date,
+                "end_date": end_date,
+                # "current_date": current_date,
+                "today_date": today_date,                }
+        )
     except Exception as e:
         return JSONResponse(
             status_code=500,
@@ -414,12 +500,10 @@ async def forward_store_calendar_event(request: Request):
         event_data = await request.json()
         
         # Forward the request to the calendar service
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{ATTENDANCE_SERVICE_URL}/calendar/store-event",
-                json=event_data
-            )
-        return JSONResponse(content=response.json(), status_code=response.status_code)
+        return await proxy_passthrough(
+            "attendance", "POST", f"{ATTENDANCE_SERVICE_URL}/calendar/store-event",
+            json=event_data
+        )
         
     except httpx.HTTPError as e:
         return JSONResponse(
@@ -436,11 +520,11 @@ async def forward_store_calendar_event(request: Request):
 @attendanceRouter.post("/attendance/store-calendar-events", status_code=201)
 async def proxy_calendar_event(event_data: CalendarEventRequest):
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{ATTENDANCE_SERVICE_URL}/attendance/store-calendar-event",
-                json=event_data.dict(),
-            )
+        client = get_client("attendance")
+        response = await client.post(
+            f"{ATTENDANCE_SERVICE_URL}/attendance/store-calendar-event",
+            json=event_data.dict(),
+        )
         return response.json()
 
     except httpx.RequestError as e:
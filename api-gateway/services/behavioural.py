@@ -1,4 +1,5 @@
 import httpx
+from utils.http_clients import get_client
 from fastapi import HTTPException
 import logging
 
@@ -15,10 +16,10 @@ class PredictionInput(BaseModel):
 
 async def time_spent_on_resources(subject_id, class_id):
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{BEHAVIOURAL_SERVICE_URL}/TimeSpendOnResources/{subject_id}/{class_id}")
-            response.raise_for_status()
-            return response.json()
+        client = get_client("behavioural")
+        response = await client.get(f"{BEHAVIOURAL_SERVICE_URL}/TimeSpendOnResources/{subject_id}/{class_id}")
+        response.raise_for_status()
+        return response.json()
     except httpx.HTTPStatusError as exc:
         raise HTTPException(status_code=exc.response.status_code, detail=str(exc))
     except Exception as exc:
@@ -27,10 +28,10 @@ async def time_spent_on_resources(subject_id, class_id):
 
 async def average_active_time(class_id):
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{BEHAVIOURAL_SERVICE_URL}/SiteAverageActiveTime/{class_id}")
-            response.raise_for_status()
-            return response.json()
+        client = get_client("behavioural")
+        response = await client.get(f"{BEHAVIOURAL_SERVICE_URL}/SiteAverageActiveTime/{class_id}")
+        response.raise_for_status()
+        return response.json()
     except httpx.HTTPStatusError as exc:
         raise HTTPException(status_code=exc.response.status_code, detail=str(exc))
     except Exception as exc:
@@ -38,10 +39,10 @@ async def average_active_time(class_id):
 
 async def resource_access_frequency(subject_id, class_id):
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{BEHAVIOURAL_SERVICE_URL}/ResourceAccessFrequency/{subject_id}/{class_id}")
-            response.raise_for_status()
-            return response.json()
+        client = get_client("behavioural")
+        response = await client.get(f"{BEHAVIOURAL_SERVICE_URL}/ResourceAccessFrequency/{subject_id}/{class_id}")
+        response.raise_for_status()
+        return response.json()
     except httpx.HTTPStatusError as exc:
         raise HTTPException(status_code=exc.response.status_code, detail=str(exc))
     except Exception as exc:
@@ -55,13 +56,13 @@ async def content_access_start(student_id, content_id):
             "content_id": content_id
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{BEHAVIOURAL_SERVICE_URL}/startContentAccess",
-                json=payload
-            )
-            response.raise_for_status()
-            return response.json()
+        client = get_client("behavioural")
+        response = await client.post(
+            f"{BEHAVIOURAL_SERVICE_URL}/startContentAccess",
+            json=payload
+        )
+        response.raise_for_status()
+        return response.json()
     except httpx.HTTPStatusError as exc:
         # Pass through the status code and error message from the backend
         error_detail = exc.response.json().get("detail", str(exc)) if exc.response.headers.get("content-type") == "application/json" else str(exc)
@@ -78,13 +79,13 @@ async def content_access_close(student_id, content_id):
             "content_id": content_id
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{BEHAVIOURAL_SERVICE_URL}/closeContentAccess",
-                json=payload
-            )
-            response.raise_for_status()
-            return response.json()
+        client = get_client("behavioural")
+        response = await client.post(
+            f"{BEHAVIOURAL_SERVICE_URL}/closeContentAccess",
+            json=payload
+        )
+        response.raise_for_status()
+        return response.json()
     except httpx.HTTPStatusError as exc:
         # Pass through the status code and error message from the backend
         error_detail = exc.response.json().get("detail", str(exc)) if exc.response.headers.get("content-type") == "application/json" else str(exc)
@@ -95,10 +96,10 @@ async def content_access_close(student_id, content_id):
     
 async def Visualize_data_list(subject_id: str, class_id: str):
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{BEHAVIOURAL_SERVICE_URL}/visualize_data/{subject_id}/{class_id}")
-            response.raise_for_status()
-            return response.json()
+        client = get_client("behavioural")
+        response = await client.get(f"{BEHAVIOURAL_SERVICE_URL}/visualize_data/{subject_id}/{class_id}")
+        response.raise_for_status()
+        return response.json()
     except httpx.HTTPStatusError as exc:
         raise HTTPException(status_code=exc.response.status_code, detail=str(exc))
     except Exception as exc:
@@ -107,10 +108,10 @@ async def Visualize_data_list(subject_id: str, class_id: str):
 
 async def update_collection_active_time(subject_id: str, class_id: str):
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(f"{BEHAVIOURAL_SERVICE_URL}/update_weekly_data/{subject_id}/{class_id}")
-            response.raise_for_status()
-            return response.json()
+        client = get_client("behavioural")
+        response = await client.post(f"{BEHAVIOURAL_SERVICE_URL}/update_weekly_data/{subject_id}/{class_id}")
+        response.raise_for_status()
+        return response.json()
     except httpx.HTTPStatusError as exc:
         raise HTTPException(status_code=exc.response.status_code, detail=str(exc))
     except Exception as exc:
@@ -128,15 +129,15 @@ async def call_prediction_service(
     service_url = f"{BEHAVIOURAL_SERVICE_URL}/predict_active_time/{subject_id}/{class_id}"
 
     try:
-        async with httpx.AsyncClient() as client:
-            # Send the request with the input data as a JSON body
-            response = await client.post(service_url, json=input_data.dict())
+        client = get_client("behavioural")
+        # Send the request with the input data as a JSON body
+        response = await client.post(service_url, json=input_data.dict())
             
-            # Raise an exception for bad status codes (4xx or 5xx)
-            response.raise_for_status()
+        # Raise an exception for bad status codes (4xx or 5xx)
+        response.raise_for_status()
             
-            # Return the JSON response from the ML service
-            return response.json()
+        # Return the JSON response from the ML service
+        return response.json()
             
     except httpx.HTTPStatusError as exc:
         # Forward the error from the downstream service to the client
@@ -166,10 +167,10 @@ async def call_prediction_service(
 
 async def model_train(subject_id, class_id):
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(f"{BEHAVIOURAL_SERVICE_URL}/train/{subject_id}/{class_id}")
-            response.raise_for_status()
-            return response.json()
+        client = get_client("behavioural")
+        response = await client.post(f"{BEHAVIOURAL_SERVICE_URL}/train/{subject_id}/{class_id}")
+        response.raise_for_status()
+        return response.json()
     except httpx.HTTPStatusError as exc:
         raise HTTPException(status_code=exc.response.status_code, detail=str(exc))
     except Exception as exc:
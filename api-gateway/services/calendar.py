@@ -1,4 +1,5 @@
 import httpx
+from utils.http_clients import get_client
 from fastapi import HTTPException, Request
 from typing import List, Dict, Any, Optional
 from datetime import date
@@ -34,14 +35,14 @@ async def get_assignment_deadlines(
         headers["Authorization"] = authorization
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{CALENDAR_SERVICE_URL}/assignments/deadlines",
-                params=params,
-                headers=headers
-            )
-            response.raise_for_status() # Raise an exception for 4xx or 5xx responses
-            return response.json()
+        client = get_client("calendar")
+        response = await client.get(
+            f"{CALENDAR_SERVICE_URL}/assignments/deadlines",
+            params=params,
+            headers=headers
+        )
+        response.raise_for_status() # Raise an exception for 4xx or 5xx responses
+        return response.json()
     except httpx.HTTPStatusError as e:
         print(f"Error from Calendar Service: {e.response.status_code} - {e.response.text}")
         raise HTTPException(
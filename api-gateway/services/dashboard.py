@@ -1,4 +1,7 @@
+import asyncio
 import httpx
+from config import OVERVIEW_SECTION_TIMEOUT
+from utils.proxy import forward_request
 from fastapi import HTTPException
 from fastapi.responses import JSONResponse
 from fastapi import Query
@@ -10,166 +13,209 @@ DASHBOARD_SERVICE_URL = "http://dashboard:8000"
 
 
 #---------------Student Dashboard Routes------------------
-async def get_student_progress(student_id: str, class_id: str):
-    timeout = httpx.Timeout(20.0, connect=10.0)
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        response = await client.get(f"{DASHBOARD_SERVICE_URL}/student/{student_id}/{class_id}/progress")
-        response.raise_for_status()
-        return response.json()
-
-async def get_student_assignments(student_id: str, class_id: str):
-    timeout = httpx.Timeout(20.0, connect=10.0)
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        response = await client.get(f"{DASHBOARD_SERVICE_URL}/student/{student_id}/{class_id}/assignments")
-        response.raise_for_status()
-        return response.json()
+async def get_student_progress(student_id: str, class_id: str, passthrough: bool = True):
+    return await forward_request(
+        "dashboard", "GET", f"{DASHBOARD_SERVICE_URL}/student/{student_id}/{class_id}/progress",
+        cache_route="dashboard:progress:student",
+        passthrough=passthrough
+    )
+
+async def get_student_assignments(student_id: str, class_id: str, passthrough: bool = True):
+    return await forward_request(
+        "dashboard", "GET", f"{DASHBOARD_SERVICE_URL}/student/{student_id}/{class_id}/assignments",
+        cache_route="dashboard:assignments:student",
+        passthrough=passthrough
+    )
     
-async def filter_assignments(student_id: str, class_id: str, status: str = None):
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{DASHBOARD_SERVICE_URL}/student/{student_id}/{class_id}/assignments/filterByStatus",
-            params={"status": status}
-        )
-        response.raise_for_status()
-        return response.json()
+async def filter_assignments(student_id: str, class_id: str, status: str = None, passthrough: bool = True):
+    return await forward_request(
+        "dashboard", "GET", f"{DASHBOARD_SERVICE_URL}/student/{student_id}/{class_id}/assignments/filterByStatus",
+        params={"status": status},
+        cache_route="dashboard:assignments:student_by_status",
+        passthrough=passthrough
+    )
 
-async def sort_assignments(student_id: str, class_id: str, status: str = None):
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{DASHBOARD_SERVICE_URL}/student/{student_id}/{class_id}/assignments/filterByDate",
-            params={"status": status}
-        )
-        response.raise_for_status()
-        return response.json()
+async def sort_assignments(student_id: str, class_id: str, status: str = None, passthrough: bool = True):
+    return await forward_request(
+        "dashboard", "GET", f"{DASHBOARD_SERVICE_URL}/student/{student_id}/{class_id}/assignments/filterByDate",
+        params={"status": status},
+        cache_route="dashboard:assignments:student_by_date",
+        passthrough=passthrough
+    )
 
-async def get_student_attendance(student_id: str, class_id: str):
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{DASHBOARD_SERVICE_URL}/student/{student_id}/{class_id}/academicAttendanceRate")
-        response.raise_for_status()
-        return response.json()
+async def get_student_attendance(student_id: str, class_id: str, passthrough: bool = True):
+    return await forward_request(
+        "dashboard", "GET", f"{DASHBOARD_SERVICE_URL}/student/{student_id}/{class_id}/academicAttendanceRate",
+        cache_route="dashboard:attendance:student_academic",
+        passthrough=passthrough
+    )
 
-async def get_student_exam_marks(student_id: str, class_id: str, exam_year: int = None):
+async def get_student_exam_marks(student_id: str, class_id: str, exam_year: int = None, passthrough: bool = True):
     params = {"exam_year": exam_year} if exam_year else {}
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{DASHBOARD_SERVICE_URL}/student/{student_id}/{class_id}/exam-marks",
-            params=params
-        )
-        response.raise_for_status()
-        return response.json()
+    return await forward_request(
+        "dashboard", "GET", f"{DASHBOARD_SERVICE_URL}/student/{student_id}/{class_id}/exam-marks",
+        params=params,
+        cache_route="dashboard:marks:student",
+        passthrough=passthrough
+    )
     
-async def monthly_attendance(student_id: str, class_id: str):
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{DASHBOARD_SERVICE_URL}/student/{student_id}/{class_id}/mothlyAttendanceRate")
-        response.raise_for_status()
-        return response.json()
-
-async def current_weekly_attendance(student_id: str, class_id: str):
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{DASHBOARD_SERVICE_URL}/student/{student_id}/{class_id}/weeklyAttendanceRate")
-        response.raise_for_status()
-        return response.json()
+async def monthly_attendance(student_id: str, class_id: str, passthrough: bool = True):
+    return await forward_request(
+        "dashboard", "GET", f"{DASHBOARD_SERVICE_URL}/student/{student_id}/{class_id}/mothlyAttendanceRate",
+        cache_route="dashboard:attendance:student_monthly",
+        passthrough=passthrough
+    )
+
+async def current_weekly_attendance(student_id: str, class_id: str, passthrough: bool = True):
+    return await forward_request(
+        "dashboard", "GET", f"{DASHBOARD_SERVICE_URL}/student/{student_id}/{class_id}/weeklyAttendanceRate",
+        cache_route="dashboard:attendance:student_weekly",
+        passthrough=passthrough
+    )
     
-async def non_academic_attendance(student_id: str, class_id: str):
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{DASHBOARD_SERVICE_URL}/student/{student_id}/{class_id}/nonacademic-attendance")
-        response.raise_for_status()
-        return response.json()
-
-
-async def engagement_score(student_id: str, class_id: str):
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{DASHBOARD_SERVICE_URL}/student/{student_id}/{class_id}/engagement-score")
-        response.raise_for_status()
-        return response.json()
+async def non_academic_attendance(student_id: str, class_id: str, passthrough: bool = True):
+    return await forward_request(
+        "dashboard", "GET", f"{DASHBOARD_SERVICE_URL}/student/{student_id}/{class_id}/nonacademic-attendance",
+        cache_route="dashboard:attendance:student_nonacademic",
+        passthrough=passthrough
+    )
+
+
+async def engagement_score(student_id: str, class_id: str, passthrough: bool = True):
+    return await forward_request(
+        "dashboard", "GET", f"{DASHBOARD_SERVICE_URL}/student/{student_id}/{class_id}/engagement-score",
+        cache_route="dashboard:engagement:student",
+        passthrough=passthrough
+    )
     
 
-async def model_features(student_id: str, class_id: str):
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.get(f"{DASHBOARD_SERVICE_URL}/ml/{student_id}/{class_id}/model-features")
-        response.raise_for_status()
-        return response.json()
+async def model_features(student_id: str, class_id: str, passthrough: bool = True):
+    return await forward_request(
+        "dashboard", "GET", f"{DASHBOARD_SERVICE_URL}/ml/{student_id}/{class_id}/model-features", timeout=30.0,
+        cache_route="dashboard:ml:features",
+        passthrough=passthrough
+    )
     
 
-async def get_model_feedback(student_id: str, class_id: str):
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.get(f"{DASHBOARD_SERVICE_URL}/ml/{student_id}/{class_id}/ai-feedback")
-        response.raise_for_status()
-        return response.json()
+async def get_model_feedback(student_id: str, class_id: str, passthrough: bool = True):
+    return await forward_request(
+        "dashboard", "GET", f"{DASHBOARD_SERVICE_URL}/ml/{student_id}/{class_id}/ai-feedback", timeout=30.0,
+        cache_route="dashboard:ml:feedback",
+        passthrough=passthrough
+    )
+
+
+async def _overview_section(fetch, timeout: float):
+    try:
+        return {"ok": True, "data": await asyncio.wait_for(fetch, timeout)}
+    except asyncio.TimeoutError:
+        return {"ok": False, "error": "timeout", "detail": f"No response within {timeout}s"}
+    except httpx.HTTPStatusError as e:
+        return {"ok": False, "error": "upstream_error", "status_code": e.response.status_code, "detail": e.response.text}
+    except HTTPException as e:
+        return {"ok": False, "error": "upstream_error", "status_code": e.status_code, "detail": e.detail}
+    except Exception as e:
+        return {"ok": False, "error": "unavailable", "detail": str(e)}
+
+
+async def get_student_overview(student_id: str, class_id: str, section_timeout: float = OVERVIEW_SECTION_TIMEOUT):
+    """
+    Everything the student dashboard page needs in one call. Sections are fetched
+    concurrently, each under its own timeout; a failed section is reported in place
+    instead of failing the whole response.
+    """
+    sections = {
+        "progress": get_student_progress(student_id, class_id, passthrough=False),
+        "assignments": get_student_assignments(student_id, class_id, passthrough=False),
+        "academic_attendance": get_student_attendance(student_id, class_id, passthrough=False),
+        "monthly_attendance": monthly_attendance(student_id, class_id, passthrough=False),
+        "weekly_attendance": current_weekly_attendance(student_id, class_id, passthrough=False),
+        "exam_marks": get_student_exam_marks(student_id, class_id, passthrough=False),
+        "nonacademic_attendance": non_academic_attendance(student_id, class_id, passthrough=False),
+        "engagement_score": engagement_score(student_id, class_id, passthrough=False),
+    }
+    results = await asyncio.gather(*(_overview_section(fetch, section_timeout) for fetch in sections.values()))
+    overview = dict(zip(sections, results))
+    return {
+        "student_id": student_id,
+        "class_id": class_id,
+        "complete": all(section["ok"] for section in results),
+        "sections": overview,
+    }
 
 
 #-----------------End of Student Dashboard Routes------------------
 
 
 #-----------------Teacher Dashboard Routes------------------
-async def get_teacher_assignments(teacher_id: str):
+async def get_teacher_assignments(teacher_id: str, passthrough: bool = True):
     try:
         timeout = httpx.Timeout(30.0, connect=10.0)
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await client.get(f"{DASHBOARD_SERVICE_URL}/teacher/{teacher_id}/assignments")
-            response.raise_for_status()
-            return response.json()
+        return await forward_request(
+            "dashboard", "GET", f"{DASHBOARD_SERVICE_URL}/teacher/{teacher_id}/assignments", timeout=timeout,
+            cache_route="dashboard:assignments:teacher",
+            passthrough=passthrough
+        )
     except httpx.ReadTimeout:
         raise HTTPException(status_code=504, detail="Dashboard service timeout")
     
-async def get_all_Classes():
-    timeout = httpx.Timeout(20.0, connect=10.0)
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        response = await client.get(f"{DASHBOARD_SERVICE_URL}/teacher/classes")
-        response.raise_for_status()
-        return response.json()
-
-async def get_exam_marks_teacher(class_id: str, exam_year: str):
-    timeout = httpx.Timeout(20.0, connect=10.0)
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        response = await client.get(f"{DASHBOARD_SERVICE_URL}/teacher/{class_id}/{exam_year}/exam-marks")
-        response.raise_for_status()
-        return response.json()
-
-
-async def get_student_progress_teacher(class_id: str, year:int =None):
-    timeout = httpx.Timeout(20.0, connect=10.0)
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        response = await client.get(f"{DASHBOARD_SERVICE_URL}/teacher/{class_id}/student_progress",
-        params={"year": year}
-        )
-        response.raise_for_status()
-        return response.json()
-
-async def get_weekly_attendance(class_id: str, year: int, week_num: int):
-    timeout = httpx.Timeout(20.0, connect=10.0)
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        # Pass query parameters in the URL
-        response = await client.get(
-            f"{DASHBOARD_SERVICE_URL}/teacher/weekly_attendance",
-            params={"class_id": class_id, "year": year, "week_num": week_num}
-        )
-        response.raise_for_status()
-        return response.json()
+async def get_all_Classes(passthrough: bool = True):
+    return await forward_request(
+        "dashboard", "GET", f"{DASHBOARD_SERVICE_URL}/teacher/classes",
+        cache_route="dashboard:classes",
+        passthrough=passthrough
+    )
+
+async def get_exam_marks_teacher(class_id: str, exam_year: str, passthrough: bool = True):
+    return await forward_request(
+        "dashboard", "GET", f"{DASHBOARD_SERVICE_URL}/teacher/{class_id}/{exam_year}/exam-marks",
+        cache_route="dashboard:marks:teacher",
+        passthrough=passthrough
+    )
+
+
+async def get_student_progress_teacher(class_id: str, year:int =None, passthrough: bool = True):
+    return await forward_request(
+        "dashboard", "GET", f"{DASHBOARD_SERVICE_URL}/teacher/{class_id}/student_progress",
+        params={"year": year},
+        cache_route="dashboard:progress:teacher",
+        passthrough=passthrough
+    )
+
+async def get_weekly_attendance(class_id: str, year: int, week_num: int, passthrough: bool = True):
+    # Pass query parameters in the URL
+    return await forward_request(
+        "dashboard", "GET", f"{DASHBOARD_SERVICE_URL}/teacher/weekly_attendance",
+        params={"class_id": class_id, "year": year, "week_num": week_num},
+        cache_route="dashboard:attendance:teacher_weekly",
+        passthrough=passthrough
+    )
     
-async def get_low_attendance_students(threshold: float = 90.0):
+async def get_low_attendance_students(threshold: float = 90.0, passthrough: bool = True):
     try:
-        timeout = httpx.Timeout(20.0, connect=10.0)
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await client.get(f"{DASHBOARD_SERVICE_URL}/teacher/low-academic-attendance",
-                                        params={"threshold": threshold})
-            response.raise_for_status()
-            return response.json()
+        return await forward_request(
+            "dashboard", "GET", f"{DASHBOARD_SERVICE_URL}/teacher/low-academic-attendance",
+            params={"threshold": threshold},
+            cache_route="dashboard:attendance:low_students",
+            passthrough=passthrough
+        )
     except httpx.HTTPStatusError as e:
         raise HTTPException(status_code=e.response.status_code, detail=str(e))
     
-async def get_low_attendance_students_count():
+async def get_low_attendance_students_count(passthrough: bool = True):
     try:
-        timeout = httpx.Timeout(20.0, connect=10.0)
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await client.get(f"{DASHBOARD_SERVICE_URL}/teacher/low-attendance-count")
-            response.raise_for_status()
-            return response.json()
+        return await forward_request(
+            "dashboard", "GET", f"{DASHBOARD_SERVICE_URL}/teacher/low-attendance-count",
+            cache_route="dashboard:attendance:low_count",
+            passthrough=passthrough
+        )
     except httpx.HTTPStatusError as e:
         raise HTTPException(status_code=e.response.status_code, detail=str(e))
     
 #-----------------End of Teacher Dashboard Routes------------------
 
 #-----------------Admin Dashboard Routes------------------
-async def get_all_users(search_with_id: str = None, role: str = None, class_id: str = None):
+async def get_all_users(search_with_id: str = None, role: str = None, class_id: str = None, passthrough: bool = True):
     params = {}
     if search_with_id:
         params["search_with_id"] = search_with_id
@@ -177,52 +223,48 @@ async def get_all_users(search_with_id: str = None, role: str = None, class_id:
         params["role"] = role
     if class_id:
         params["class_id"] = class_id
-    timeout = httpx.Timeout(20.0, connect=10.0)
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        response = await client.get(f"{DASHBOARD_SERVICE_URL}/admin/user_data", params=params)
-        response.raise_for_status()
-        return response.json()
+    return await forward_request(
+        "dashboard", "GET", f"{DASHBOARD_SERVICE_URL}/admin/user_data", params=params,
+        cache_route="dashboard:users:list",
+        passthrough=passthrough
+    )
     
-async def forward_admin_access_profile(user_id: str = Query(...)):
-    timeout = httpx.Timeout(20.0, connect=10.0)
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        response = await client.get(
-            f"{DASHBOARD_SERVICE_URL}/admin/admin-access-profile",
-            params={"user_id": user_id}
-        )
-        response.raise_for_status()
-        return response.json()
-
-async def get_stats():
-    timeout = httpx.Timeout(20.0, connect=10.0)
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        response = await client.get(f"{DASHBOARD_SERVICE_URL}/admin/stats")
-        response.raise_for_status()
-        return response.json()
+async def forward_admin_access_profile(user_id: str = Query(...), passthrough: bool = True):
+    return await forward_request(
+        "dashboard", "GET", f"{DASHBOARD_SERVICE_URL}/admin/admin-access-profile",
+        params={"user_id": user_id},
+        cache_route="dashboard:users:access_profile",
+        passthrough=passthrough
+    )
+
+async def get_stats(passthrough: bool = True):
+    return await forward_request(
+        "dashboard", "GET", f"{DASHBOARD_SERVICE_URL}/admin/stats",
+        cache_route="dashboard:users:stats",
+        passthrough=passthrough
+    )
     
-async def get_exam_marks_admin(class_id: str, exam_year: str):
-    timeout = httpx.Timeout(20.0, connect=10.0)
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        response = await client.get(f"{DASHBOARD_SERVICE_URL}/admin/{class_id}/{exam_year}/exam-marks")
-        response.raise_for_status()
-        return response.json()
-
-
-async def get_student_progress_admin(class_id: str):
-    timeout = httpx.Timeout(20.0, connect=10.0)
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        response = await client.get(f"{DASHBOARD_SERVICE_URL}/admin/{class_id}/student_progress")
-        response.raise_for_status()
-        return response.json()
-
-async def get_weekly_attendance_admin(class_id: str, year: int, week_num: int):
-    timeout = httpx.Timeout(20.0, connect=10.0)
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        # Pass query parameters in the URL
-        response = await client.get(
-            f"{DASHBOARD_SERVICE_URL}/admin/weekly_attendance",
-            params={"class_id": class_id, "year": year, "week_num": week_num}
-        )
-        response.raise_for_status()
-        return response.json()
+async def get_exam_marks_admin(class_id: str, exam_year: str, passthrough: bool = True):
+    return await forward_request(
+        "dashboard", "GET", f"{DASHBOARD_SERVICE_URL}/admin/{class_id}/{exam_year}/exam-marks",
+        cache_route="dashboard:marks:admin",
+        passthrough=passthrough
+    )
+
+
+async def get_student_progress_admin(class_id: str, passthrough: bool = True):
+    return await forward_request(
+        "dashboard", "GET", f"{DASHBOARD_SERVICE_URL}/admin/{class_id}/student_progress",
+        cache_route="dashboard:progress:admin",
+        passthrough=passthrough
+    )
+
+async def get_weekly_attendance_admin(class_id: str, year: int, week_num: int, passthrough: bool = True):
+    # Pass query parameters in the URL
+    return await forward_request(
+        "dashboard", "GET", f"{DASHBOARD_SERVICE_URL}/admin/weekly_attendance",
+        params={"class_id": class_id, "year": year, "week_num": week_num},
+        cache_route="dashboard:attendance:admin_weekly",
+        passthrough=passthrough
+    )
 #-----------------End of Admin Dashboard Routes------------------
\ No newline at end of file
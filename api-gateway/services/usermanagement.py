@@ -1,4 +1,7 @@
 import httpx
+from utils.http_clients import get_client
+from utils.cache import purge_cache
+from utils.auth import invalidate_principal
 from fastapi import HTTPException, Request, APIRouter, Depends, UploadFile
 from typing import Optional,Dict, Any
 from pathlib import Path 
@@ -48,14 +51,14 @@ async def login_user(req: Request, credentials: dict):
             "User-Agent": req.headers.get("user-agent", "Unknown")  # ✅ Forward this!
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{USER_MANAGEMENT_SERVICE_URL}/login",
-                data=credentials,
-                headers=headers
-            )
-            response.raise_for_status()
-            return response.json()
+        client = get_client("user-management")
+        response = await client.post(
+            f"{USER_MANAGEMENT_SERVICE_URL}/login",
+            data=credentials,
+            headers=headers
+        )
+        response.raise_for_status()
+        return response.json()
     except httpx.HTTPStatusError as exc:
         raise HTTPException(status_code=exc.response.status_code, detail="Login failed")
     except Exception as e:
@@ -68,14 +71,15 @@ async def logout_user(user_id: str, role: str, authorization: str = None):
         headers["Authorization"] = authorization
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{USER_MANAGEMENT_SERVICE_URL}/logout",
-                data={"user_id": user_id, "role": role},
-                headers=headers
-            )
-            response.raise_for_status()
-            return response.json()
+        client = get_client("user-management")
+        response = await client.post(
+            f"{USER_MANAGEMENT_SERVICE_URL}/logout",
+            data={"user_id": user_id, "role": role},
+            headers=headers
+        )
+        response.raise_for_status()
+        invalidate_principal(role, user_id, revoke=True)
+        return response.json()
     except httpx.HTTPStatusError as exc:
         detail = exc.response.json().get("detail", "User service error")
         raise HTTPException(status_code=exc.response.status_code, detail=detail)
@@ -89,14 +93,15 @@ async def add_admin(admin_data: dict, authorization: str = None):
         headers["Authorization"] = authorization
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{USER_MANAGEMENT_SERVICE_URL}/add-admin",
-                json=admin_data,
-                headers=headers  # only include if authorization is not None
-            )
-            response.raise_for_status()
-            return response.json()
+        client = get_client("user-management")
+        response = await client.post(
+            f"{USER_MANAGEMENT_SERVICE_URL}/add-admin",
+            json=admin_data,
+            headers=headers  # only include if authorization is not None
+        )
+        response.raise_for_status()
+        await purge_cache("dashboard:users")
+        return response.json()
     except httpx.HTTPStatusError as exc:
         detail = exc.response.json().get("detail", "User service error")
         raise HTTPException(status_code=exc.response.status_code, detail=detail)
@@ -122,14 +127,15 @@ async def add_student(student_data: dict, authorization: str = None):
     student_data = serialize_dates(student_data)
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{USER_MANAGEMENT_SERVICE_URL}/add-student",
-                json=student_data,
-                headers=headers
-            )
-            response.raise_for_status()
-            return response.json()
+        client = get_client("user-management")
+        response = await client.post(
+            f"{USER_MANAGEMENT_SERVICE_URL}/add-student",
+            json=student_data,
+            headers=headers
+        )
+        response.raise_for_status()
+        await purge_cache("dashboard:users")
+        return response.json()
     except httpx.HTTPStatusError as exc:
         detail = exc.response.json().get("detail", "User service error")
         raise HTTPException(status_code=exc.response.status_code, detail=detail)
@@ -145,14 +151,15 @@ async def add_teacher(teacher_data: dict, authorization: str = None):
     teacher_data = serialize_dates(teacher_data)
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{USER_MANAGEMENT_SERVICE_URL}/add-teacher",
-                json=teacher_data,
-                headers=headers
-            )
-            response.raise_for_status()
-            return response.json()
+        client = get_client("user-management")
+        response = await client.post(
+            f"{USER_MANAGEMENT_SERVICE_URL}/add-teacher",
+            json=teacher_data,
+            headers=headers
+        )
+        response.raise_for_status()
+        await purge_cache("dashboard:users")
+        return response.json()
     except httpx.HTTPStatusError as exc:
         detail = exc.response.json().get("detail", "User service error")
         raise HTTPException(status_code=exc.response.status_code, detail=detail)
@@ -168,10 +175,12 @@ async def delete_user(role: str, user_custom_id: str, authorization: str = None)
     url = f"{USER_MANAGEMENT_SERVICE_URL}/delete_user/{role}/{user_custom_id}"
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.delete(url, headers=headers)
-            response.raise_for_status()
-            return response.json()
+        client = get_client("user-management")
+        response = await client.delete(url, headers=headers)
+        response.raise_for_status()
+        invalidate_principal(role, user_custom_id, revoke=True)
+        await purge_cache("dashboard:users")
+        return response.json()
     except httpx.HTTPStatusError as exc:
         detail = exc.response.json().get("detail", "User service error")
         raise HTTPException(status_code=exc.response.status_code, detail=detail)
@@ -187,10 +196,10 @@ async def get_recent_users_from_user_management(role: str, authorization: str =
     url = f"{USER_MANAGEMENT_SERVICE_URL}/recent-users/{role}" # New internal path
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=headers)
-            response.raise_for_status()
-            return response.json()
+        client = get_client("user-management")
+        response = await client.get(url, headers=headers)
+        response.raise_for_status()
+        return response.json()
     except httpx.HTTPStatusError as exc:
         detail = exc.response.json().get("detail", "User service error")
         raise HTTPException(status_code=exc.response.status_code, detail=detail)
@@ -207,10 +216,12 @@ async def edit_profile(role: str, user_id: str, profile_data: dict, authorizatio
     url = f"{USER_MANAGEMENT_SERVICE_URL}/edit_profile/{role}/{user_id}"
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.put(url, json=profile_data, headers=headers)
-            response.raise_for_status()
-            return response.json()
+        client = get_client("user-management")
+        response = await client.put(url, json=profile_data, headers=headers)
+        response.raise_for_status()
+        invalidate_principal(role, user_id)
+        await purge_cache("dashboard:users")
+        return response.json()
     except httpx.HTTPStatusError as exc:
         detail = exc.response.json().get("detail", "User service error")
         raise HTTPException(status_code=exc.response.status_code, detail=detail)
@@ -225,14 +236,14 @@ async def update_password(password_data: dict, authorization: str = None):
         headers["Authorization"] = authorization
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.put(
-                f"{USER_MANAGEMENT_SERVICE_URL}/update_password",
-                json=password_data,
-                headers=headers
-            )
-            response.raise_for_status()
-            return response.json()
+        client = get_client("user-management")
+        response = await client.put(
+            f"{USER_MANAGEMENT_SERVICE_URL}/update_password",
+            json=password_data,
+            headers=headers
+        )
+        response.raise_for_status()
+        return response.json()
     except httpx.HTTPStatusError as exc:
         detail = exc.response.json().get("detail", "User service error")
         raise HTTPException(status_code=exc.response.status_code, detail=detail)
@@ -269,13 +280,13 @@ async def get_profile(authorization: Optional[str] = None):
         headers["Authorization"] = authorization
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{USER_MANAGEMENT_SERVICE_URL}/profile",
-                headers=headers
-            )
-            response.raise_for_status()
-            return response.json()
+        client = get_client("user-management")
+        response = await client.get(
+            f"{USER_MANAGEMENT_SERVICE_URL}/profile",
+            headers=headers
+        )
+        response.raise_for_status()
+        return response.json()
 
     except httpx.HTTPStatusError as exc:
         try:
@@ -308,14 +319,14 @@ async def fetch_anomaly_results(
     headers = {"Authorization": f"Bearer {token}"}
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{USER_MANAGEMENT_SERVICE_URL}/anomaly-detection/results",
-                params={"username": username, "role": role},
-                headers=headers
-            )
-            response.raise_for_status()
-            return response.json()
+        client = get_client("user-management")
+        response = await client.get(
+            f"{USER_MANAGEMENT_SERVICE_URL}/anomaly-detection/results",
+            params={"username": username, "role": role},
+            headers=headers
+        )
+        response.raise_for_status()
+        return response.json()
     except httpx.HTTPStatusError as exc:
         # Return the actual response content from the service
         detail = exc.response.text
@@ -365,14 +376,16 @@ async def update_student(student_data: UpdateStudentModel, authorization: Option
         headers["Authorization"] = authorization
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{USER_MANAGEMENT_SERVICE_URL}/update-student",
-                json=student_data.dict(),
-                headers=headers
-            )
-            response.raise_for_status()
-            return response.json()
+        client = get_client("user-management")
+        response = await client.post(
+            f"{USER_MANAGEMENT_SERVICE_URL}/update-student",
+            json=student_data.dict(),
+            headers=headers
+        )
+        response.raise_for_status()
+        invalidate_principal("student", student_data.student_id)
+        await purge_cache("dashboard:users")
+        return response.json()
     except httpx.HTTPStatusError as exc:
         detail = exc.response.json().get("detail", "User service error")
         raise HTTPException(status_code=exc.response.status_code, detail=detail)
@@ -382,12 +395,12 @@ async def update_student(student_data: UpdateStudentModel, authorization: Option
 # --- Get Student Data ---
 async def proxy_get_student_data(student_id: str, request: Request):
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{USER_MANAGEMENT_SERVICE_URL}/get-student-data",
-                params={"student_id": student_id},
-                headers={"Authorization": request.headers.get("Authorization", "")}
-            )
+        client = get_client("user-management")
+        response = await client.get(
+            f"{USER_MANAGEMENT_SERVICE_URL}/get-student-data",
+            params={"student_id": student_id},
+            headers={"Authorization": request.headers.get("Authorization", "")}
+        )
         return response.json()
     except httpx.HTTPError as e:
         raise HTTPException(status_code=500, detail=f"Error contacting user service: {str(e)}")
@@ -396,11 +409,11 @@ async def proxy_get_student_data(student_id: str, request: Request):
 # --- Get profile page ---
 async def proxy_get_full_profile(request: Request, authorization: Optional[str] = None):
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{USER_MANAGEMENT_SERVICE_URL}/get-full-profile",
-                headers={"Authorization": authorization}  # use passed auth header
-            )
+        client = get_client("user-management")
+        response = await client.get(
+            f"{USER_MANAGEMENT_SERVICE_URL}/get-full-profile",
+            headers={"Authorization": authorization}  # use passed auth header
+        )
         response.raise_for_status()
         return response.json()
     except httpx.HTTPStatusError as e:
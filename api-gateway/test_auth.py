@@ -0,0 +1,102 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+import pytest
+
+from config import JWT_SECRET_KEY
+from utils import auth
+from utils.auth import decode_token, invalidate_principal, resolve_principal
+
+
+def _segment(data: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).rstrip(b"=").decode()
+
+
+def make_token(claims: dict, secret: str = JWT_SECRET_KEY, alg: str = "HS256") -> str:
+    signing_input = f"{_segment({'alg': alg, 'typ': 'JWT'})}.{_segment(claims)}"
+    signature = hmac.new(secret.encode(), signing_input.encode(), hashlib.sha256).digest()
+    return f"{signing_input}.{base64.urlsafe_b64encode(signature).rstrip(b'=').decode()}"
+
+
+def claims(**overrides) -> dict:
+    now = int(time.time())
+    return {"sub": "STU001", "role": "student", "iat": now, "exp": now + 3600, **overrides}
+
+
+@pytest.fixture(autouse=True)
+def reset_auth():
+    auth._principals.clear()
+    auth._tokens_by_user.clear()
+    auth._revoked_before.clear()
+    yield
+    auth._principals.clear()
+    auth._tokens_by_user.clear()
+    auth._revoked_before.clear()
+
+
+def test_valid_token_is_decoded():
+    assert decode_token(make_token(claims()))["sub"] == "STU001"
+
+
+def test_bad_signature_is_rejected():
+    assert decode_token(make_token(claims(), secret="not-the-secret")) is None
+
+
+def test_tampered_payload_is_rejected():
+    header, _, signature = make_token(claims()).split(".")
+    forged = f"{header}.{_segment(claims(role='admin'))}.{signature}"
+
+    assert decode_token(forged) is None
+
+
+def test_wrong_algorithm_is_rejected():
+    # Signed correctly, but the header claims another algorithm
+    assert decode_token(make_token(claims(), alg="HS512")) is None
+    assert decode_token(make_token(claims(), alg="none")) is None
+
+
+def test_expired_token_is_rejected():
+    assert decode_token(make_token(claims(exp=int(time.time()) - 1))) is None
+    assert decode_token(make_token(claims(exp="never"))) is None
+
+
+def test_malformed_token_is_rejected():
+    assert decode_token("not-a-jwt") is None
+    assert decode_token("a.b.c") is None
+
+
+def test_principal_is_cached_per_token():
+    token = make_token(claims(class_id="CLS001"))
+
+    first = resolve_principal(f"Bearer {token}")
+    second = resolve_principal(f"Bearer {token}")
+
+    assert first == second
+    assert first.class_id == "CLS001"
+    assert resolve_principal(f"Basic {token}") is None
+
+
+def test_logout_revokes_older_tokens(monkeypatch):
+    now = [1_700_000_000.0]
+    monkeypatch.setattr(auth.time, "time", lambda: now[0])
+    token = make_token(claims(iat=1_699_999_000, exp=1_700_003_600))
+    assert resolve_principal(f"Bearer {token}") is not None
+
+    invalidate_principal("student", "STU001", revoke=True)
+
+    assert resolve_principal(f"Bearer {token}") is None
+
+
+def test_login_in_the_same_second_as_logout_is_trusted(monkeypatch):
+    now = [1_700_000_000.2]
+    monkeypatch.setattr(auth.time, "time", lambda: now[0])
+    invalidate_principal("student", "STU001", revoke=True)
+
+    # iat is whole seconds, so the new token is stamped with the second of the logout
+    now[0] = 1_700_000_000.7
+    token = make_token(claims(iat=1_700_000_000, exp=1_700_003_600))
+
+    assert resolve_principal(f"Bearer {token}") is not None
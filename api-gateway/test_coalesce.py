@@ -0,0 +1,124 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi.responses import StreamingResponse
+
+from utils import coalesce, proxy
+
+
+@pytest.fixture(autouse=True)
+def reset_counters():
+    coalesce._inflight.clear()
+    coalesce._leaders.clear()
+    coalesce._collapsed.clear()
+
+
+def test_concurrent_identical_calls_share_one_fetch():
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, content=b"shared")
+
+    async def main():
+        return await asyncio.gather(*[coalesce.single_flight("dashboard", "k", fetch) for _ in range(5)])
+
+    responses = asyncio.run(main())
+
+    assert calls == 1
+    assert {id(response) for response in responses} == {id(responses[0])}
+    stats = coalesce.coalescing_stats()
+    assert stats["upstream_calls"] == 1
+    assert stats["collapsed"] == 4
+    assert stats["services"]["dashboard"] == {"upstream_calls": 1, "collapsed": 4}
+    assert stats["in_flight"] == 0
+
+
+def test_different_keys_are_not_collapsed():
+    async def fetch():
+        await asyncio.sleep(0.01)
+        return httpx.Response(200)
+
+    async def main():
+        await asyncio.gather(
+            coalesce.single_flight("dashboard", "a", fetch),
+            coalesce.single_flight("dashboard", "b", fetch),
+        )
+
+    asyncio.run(main())
+
+    assert coalesce.coalescing_stats()["upstream_calls"] == 2
+    assert coalesce.coalescing_stats()["collapsed"] == 0
+
+
+def test_errors_reach_every_waiter_and_the_next_call_fetches_again():
+    calls = 0
+
+    async def failing():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise httpx.ConnectError("down")
+
+    async def main():
+        return await asyncio.gather(
+            *[coalesce.single_flight("attendance", "k", failing) for _ in range(3)],
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, httpx.ConnectError) for result in results)
+
+    asyncio.run(main())
+    assert calls == 2
+
+
+def test_flight_key_separates_auth_scopes():
+    alice = coalesce.flight_key("dashboard", "http://d/x", {"b": 1, "a": 2}, {"Authorization": "Bearer alice"})
+    bob = coalesce.flight_key("dashboard", "http://d/x", {"a": 2, "b": 1}, {"Authorization": "Bearer bob"})
+    alice_again = coalesce.flight_key("dashboard", "http://d/x", {"a": 2, "b": 1}, {"authorization": "Bearer alice"})
+
+    assert alice != bob
+    assert alice == alice_again
+
+
+def _mock_client(monkeypatch, handler):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(proxy, "get_client", lambda service: client)
+    return client
+
+
+def test_plain_passthrough_get_is_streamed(monkeypatch):
+    _mock_client(monkeypatch, lambda request: httpx.Response(200, content=b"x" * 1000))
+
+    response = asyncio.run(proxy.proxy_passthrough("academic", "GET", "http://academic/big"))
+
+    assert isinstance(response, StreamingResponse)
+    assert coalesce.coalescing_stats()["upstream_calls"] == 0
+
+
+def test_coalesced_passthrough_get_is_shared(monkeypatch):
+    calls = 0
+
+    async def handler(request):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"ok": True})
+
+    _mock_client(monkeypatch, handler)
+
+    async def main():
+        return await asyncio.gather(*[
+            proxy.proxy_passthrough("dashboard", "GET", "http://dashboard/weekly", coalesce=True)
+            for _ in range(3)
+        ])
+
+    responses = asyncio.run(main())
+
+    assert calls == 1
+    assert all(response.body == b'{"ok":true}' for response in responses)
+    assert coalesce.coalescing_stats()["collapsed"] == 2
@@ -0,0 +1,152 @@
+import asyncio
+
+import httpx
+import pytest
+
+from utils import resilience
+from utils.resilience import CLOSED, HALF_OPEN, OPEN, Bulkhead, CircuitBreaker, GuardedTransport, UpstreamUnavailable
+
+
+@pytest.fixture(autouse=True)
+def reset_guards():
+    resilience._guards.clear()
+    yield
+    resilience._guards.clear()
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("academic", failure_threshold=3, reset_timeout=30)
+
+    for _ in range(2):
+        breaker.before_call()
+        breaker.on_failure()
+    assert breaker.state == CLOSED
+
+    breaker.before_call()
+    breaker.on_failure()
+    assert breaker.state == OPEN
+    assert breaker.times_opened == 1
+
+    with pytest.raises(UpstreamUnavailable) as error:
+        breaker.before_call()
+    assert error.value.reason == "circuit open"
+    assert error.value.retry_after >= 1
+    assert breaker.rejected == 1
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker("academic", failure_threshold=2, reset_timeout=30)
+
+    breaker.on_failure()
+    breaker.on_success()
+    breaker.on_failure()
+
+    assert breaker.state == CLOSED
+    assert breaker.consecutive_failures == 1
+
+
+def test_breaker_half_opens_for_one_probe_then_closes(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker("academic", failure_threshold=1, reset_timeout=10)
+    breaker.on_failure()
+    assert breaker.state == OPEN
+
+    now[0] += 11
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+
+    # Only one probe at a time
+    with pytest.raises(UpstreamUnavailable) as error:
+        breaker.before_call()
+    assert error.value.reason == "circuit half-open"
+
+    breaker.on_success()
+    assert breaker.state == CLOSED
+    breaker.before_call()
+
+
+def test_failed_probe_reopens_the_breaker(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker("academic", failure_threshold=3, reset_timeout=10)
+    for _ in range(3):
+        breaker.on_failure()
+
+    now[0] += 11
+    breaker.before_call()
+    breaker.on_failure()
+
+    assert breaker.state == OPEN
+    assert breaker.times_opened == 2
+    with pytest.raises(UpstreamUnavailable):
+        breaker.before_call()
+
+
+def test_bulkhead_queue_timeout_raises_upstream_unavailable():
+    bulkhead = Bulkhead("academic", max_in_flight=1, queue_timeout=0.01)
+
+    async def main():
+        await bulkhead.acquire()
+        with pytest.raises(UpstreamUnavailable) as error:
+            await bulkhead.acquire()
+        assert error.value.reason == "too many concurrent requests"
+        bulkhead.release()
+        # The slot is free again
+        await bulkhead.acquire()
+        bulkhead.release()
+
+    asyncio.run(main())
+
+    assert bulkhead.rejected == 1
+    assert bulkhead.in_flight == 0
+    assert bulkhead.queued == 0
+
+
+def _client(handler, service="academic"):
+    return httpx.AsyncClient(transport=GuardedTransport(service, httpx.MockTransport(handler)))
+
+
+def test_guarded_transport_counts_5xx_and_transport_errors():
+    def handler(request):
+        if request.url.path == "/down":
+            raise httpx.ConnectError("refused")
+        return httpx.Response(503 if request.url.path == "/error" else 200)
+
+    async def main():
+        async with _client(handler) as client:
+            await client.get("http://academic/ok")
+            await client.get("http://academic/error")
+            with pytest.raises(httpx.ConnectError):
+                await client.get("http://academic/down")
+
+    asyncio.run(main())
+
+    stats = resilience.guard_stats()["academic"]
+    assert stats["successes"] == 1
+    assert stats["failures"] == 2
+    assert stats["in_flight"] == 0
+
+
+def test_body_that_breaks_off_counts_as_a_failure():
+    class BrokenStream(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            yield b"partial"
+            raise httpx.ReadError("connection reset")
+
+    def handler(request):
+        return httpx.Response(200, stream=BrokenStream())
+
+    async def main():
+        async with _client(handler) as client:
+            async with client.stream("GET", "http://academic/big") as response:
+                with pytest.raises(httpx.ReadError):
+                    async for _ in response.aiter_bytes():
+                        pass
+
+    asyncio.run(main())
+
+    stats = resilience.guard_stats()["academic"]
+    assert stats["failures"] == 1
+    assert stats["consecutive_failures"] == 1
+    assert stats["in_flight"] == 0
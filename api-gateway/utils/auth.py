@@ -0,0 +1,238 @@
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import time
+from collections import OrderedDict, defaultdict
+from typing import Dict, NamedTuple, Optional, Set, Tuple
+
+import httpx
+from fastapi import Header, HTTPException
+
+from config import (
+    INTERNAL_TOKEN,
+    JWT_ALGORITHM,
+    JWT_SECRET_KEY,
+    LOCAL_AUTH,
+    PRINCIPAL_CACHE_MAX_ENTRIES,
+    PRINCIPAL_CACHE_TTL,
+)
+
+logger = logging.getLogger(__name__)
+
+# Headers the gateway sets on upstream requests for a verified caller. They are always
+# stripped first, so a client can never smuggle its own identity through the gateway.
+IDENTITY_HEADERS = ("x-user-id", "x-user-role", "x-user-class", "x-gateway-token")
+
+_HMAC_DIGESTS = {"HS256": hashlib.sha256, "HS384": hashlib.sha384, "HS512": hashlib.sha512}
+
+# How long a logout/delete keeps older tokens of that user from being trusted. Tokens are
+# issued for an hour by user-management, so a day leaves plenty of margin.
+REVOCATION_RETENTION = 24 * 3600
+
+
+class Principal(NamedTuple):
+    user_id: str
+    role: str
+    class_id: Optional[str]
+    issued_at: Optional[float]
+    expires_at: Optional[float]
+
+
+# token hash -> (cache expiry, principal), in LRU order
+_principals: "OrderedDict[str, Tuple[float, Principal]]" = OrderedDict()
+# (role, user_id) -> token hashes cached for that user, so they can be dropped together
+_tokens_by_user: Dict[Tuple[str, str], Set[str]] = defaultdict(set)
+# (role, user_id) -> wall-clock second before which that user's tokens are no longer trusted.
+# Whole seconds, like the iat claim it is compared with: a token issued later in the same
+# second as a logout (logging straight back in) must not count as revoked.
+_revoked_before: Dict[Tuple[str, str], int] = {}
+_stats = {"hits": 0, "misses": 0, "invalid": 0, "revoked": 0, "invalidations": 0}
+
+
+def _b64decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+def decode_token(token: str) -> Optional[dict]:
+    """
+    Verify a JWT signed by user-management and return its claims, or None when the token is
+    malformed, signed with another key or algorithm, or expired. Only HMAC algorithms are
+    supported, matching how user-management signs its tokens.
+    """
+    digest = _HMAC_DIGESTS.get(JWT_ALGORITHM)
+    if digest is None:
+        return None
+    try:
+        header_b64, payload_b64, signature_b64 = token.split(".")
+        header = json.loads(_b64decode(header_b64))
+        if not isinstance(header, dict) or header.get("alg") != JWT_ALGORITHM:
+            return None
+        expected = hmac.new(JWT_SECRET_KEY.encode(), f"{header_b64}.{payload_b64}".encode(), digest).digest()
+        if not hmac.compare_digest(expected, _b64decode(signature_b64)):
+            return None
+        payload = json.loads(_b64decode(payload_b64))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(payload, dict):
+        return None
+    exp = payload.get("exp")
+    if exp is not None and (not isinstance(exp, (int, float)) or exp <= time.time()):
+        return None
+    return payload
+
+
+def _token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _bearer_token(authorization: Optional[str]) -> Optional[str]:
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        return None
+    return token.strip()
+
+
+def _is_revoked(principal: Principal) -> bool:
+    revoked_at = _revoked_before.get((principal.role, principal.user_id))
+    if revoked_at is None:
+        return False
+    if revoked_at + REVOCATION_RETENTION <= time.time():
+        del _revoked_before[(principal.role, principal.user_id)]
+        return False
+    # Tokens without an issue time predate the revocation as far as we can tell
+    return principal.issued_at is None or principal.issued_at < revoked_at
+
+
+def _forget(token_key: str):
+    item = _principals.pop(token_key, None)
+    if item is not None:
+        principal = item[1]
+        user = (principal.role, principal.user_id)
+        keys = _tokens_by_user.get(user)
+        if keys is not None:
+            keys.discard(token_key)
+            if not keys:
+                del _tokens_by_user[user]
+
+
+def resolve_principal(authorization: Optional[str]) -> Optional[Principal]:
+    """
+    The verified caller behind an Authorization header, or None when there is no bearer
+    token, it fails verification, or its user logged out or was deleted since it was issued.
+
+    Verified principals are cached by token for GATEWAY_PRINCIPAL_CACHE_TTL seconds (never
+    beyond the token's own expiry).
+    """
+    token = _bearer_token(authorization)
+    if token is None:
+        return None
+
+    token_key = _token_hash(token)
+    now = time.time()
+    item = _principals.get(token_key)
+    if item is not None:
+        expires_at, principal = item
+        if expires_at > now:
+            _principals.move_to_end(token_key)
+            _stats["hits"] += 1
+            return principal
+        _forget(token_key)
+
+    _stats["misses"] += 1
+    claims = decode_token(token)
+    if claims is None or not claims.get("sub") or not claims.get("role"):
+        _stats["invalid"] += 1
+        return None
+
+    principal = Principal(
+        user_id=str(claims["sub"]),
+        role=str(claims["role"]).lower(),
+        class_id=claims.get("class_id"),
+        issued_at=claims.get("iat"),
+        expires_at=claims.get("exp"),
+    )
+    if _is_revoked(principal):
+        _stats["revoked"] += 1
+        return None
+
+    expires_at = now + PRINCIPAL_CACHE_TTL
+    if principal.expires_at is not None:
+        expires_at = min(expires_at, principal.expires_at)
+    _principals[token_key] = (expires_at, principal)
+    _principals.move_to_end(token_key)
+    _tokens_by_user[(principal.role, principal.user_id)].add(token_key)
+    while len(_principals) > PRINCIPAL_CACHE_MAX_ENTRIES:
+        _forget(next(iter(_principals)))
+    return principal
+
+
+def invalidate_principal(role: str, user_id: str, revoke: bool = False) -> int:
+    """
+    Drop the cached principals of one user. Called after profile edits, so the next request
+    re-resolves them. With revoke=True (logout, delete) tokens issued before now also stop
+    being trusted, and requests carrying them fall back to full verification downstream.
+    """
+    user = (role.lower(), user_id)
+    keys = list(_tokens_by_user.get(user, ()))
+    for token_key in keys:
+        _forget(token_key)
+    if revoke:
+        _revoked_before[user] = int(time.time())
+    _stats["invalidations"] += 1
+    return len(keys)
+
+
+async def attach_identity(request: httpx.Request):
+    """
+    httpx request hook for the pooled upstream clients: replaces any identity headers with
+    X-User-Id / X-User-Role / X-User-Class for the verified caller, plus the shared
+    X-Gateway-Token that lets downstream services trust them without another lookup.
+    """
+    for name in IDENTITY_HEADERS:
+        if name in request.headers:
+            del request.headers[name]
+    if not LOCAL_AUTH or not INTERNAL_TOKEN:
+        return
+
+    principal = resolve_principal(request.headers.get("authorization"))
+    if principal is None:
+        return
+    request.headers["X-User-Id"] = principal.user_id
+    request.headers["X-User-Role"] = principal.role
+    if principal.class_id:
+        request.headers["X-User-Class"] = str(principal.class_id)
+    request.headers["X-Gateway-Token"] = INTERNAL_TOKEN
+
+
+def require_gateway_admin(
+    authorization: Optional[str] = Header(None),
+    x_gateway_token: Optional[str] = Header(None),
+) -> str:
+    """
+    FastAPI dependency for the gateway's own operational endpoints (metrics, cache purge):
+    the caller must be a verified admin, or present the internal token (other services,
+    operators' scripts). Returns who was let in.
+    """
+    if INTERNAL_TOKEN and x_gateway_token and hmac.compare_digest(x_gateway_token, INTERNAL_TOKEN):
+        return "internal"
+    if authorization is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    principal = resolve_principal(authorization)
+    if principal is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired token", headers={"WWW-Authenticate": "Bearer"})
+    if principal.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return f"admin:{principal.user_id}"
+
+
+def auth_stats() -> dict:
+    return {
+        "enabled": LOCAL_AUTH and bool(INTERNAL_TOKEN),
+        "entries": len(_principals),
+        "revoked_users": len(_revoked_before),
+        **_stats,
+    }
@@ -0,0 +1,210 @@
+import json
+import logging
+import time
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, NamedTuple, Optional
+
+from config import (
+    CACHE_BACKEND,
+    CACHE_MAX_BODY_BYTES,
+    CACHE_MAX_ENTRIES,
+    CACHE_REDIS_URL,
+    cache_ttl,
+)
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # optional dependency, only needed for GATEWAY_CACHE_BACKEND=redis
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+
+class CachedResponse(NamedTuple):
+    status_code: int
+    headers: Dict[str, str]
+    body: bytes
+
+
+class MemoryCache:
+    """
+    In-process LRU cache, bounded by entry count, with a per-entry expiry time.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.evictions = 0
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: CachedResponse, ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def purge(self, prefix: str = "") -> int:
+        keys = [key for key in self._entries if key.startswith(prefix)]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class RedisCache:
+    """
+    Redis-compatible backend, shared by every gateway replica. Eviction is left to
+    the server's maxmemory policy; entries expire through their TTL.
+    """
+
+    name = "redis"
+    namespace = "gateway-cache:"
+
+    def __init__(self, url: str):
+        self._redis = aioredis.from_url(url)
+
+    @staticmethod
+    def _encode(value: CachedResponse) -> bytes:
+        meta = json.dumps({"status_code": value.status_code, "headers": value.headers}).encode()
+        return meta + b"\n" + value.body
+
+    @staticmethod
+    def _decode(raw: bytes) -> CachedResponse:
+        meta, body = raw.split(b"\n", 1)
+        meta = json.loads(meta)
+        return CachedResponse(meta["status_code"], meta["headers"], body)
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        raw = await self._redis.get(self.namespace + key)
+        return self._decode(raw) if raw is not None else None
+
+    async def set(self, key: str, value: CachedResponse, ttl: float):
+        await self._redis.set(self.namespace + key, self._encode(value), px=int(ttl * 1000))
+
+    async def purge(self, prefix: str = "") -> int:
+        removed = 0
+        async for key in self._redis.scan_iter(match=f"{self.namespace}{prefix}*"):
+            removed += await self._redis.delete(key)
+        return removed
+
+    def size(self) -> Optional[int]:
+        return None
+
+    async def close(self):
+        await self._redis.close()
+
+
+_backend = None
+_hits: Dict[str, int] = defaultdict(int)
+_misses: Dict[str, int] = defaultdict(int)
+_purged = 0
+
+
+def get_cache():
+    """
+    The configured cache backend (GATEWAY_CACHE_BACKEND=memory|redis), created on first use.
+    """
+    global _backend
+    if _backend is None:
+        if CACHE_BACKEND == "redis":
+            if aioredis is None:
+                logger.warning("Redis cache backend requested but the 'redis' package is not installed; using memory")
+                _backend = MemoryCache()
+            else:
+                _backend = RedisCache(CACHE_REDIS_URL)
+        else:
+            _backend = MemoryCache()
+    return _backend
+
+
+async def close_cache():
+    global _backend
+    if _backend is not None and hasattr(_backend, "close"):
+        try:
+            await _backend.close()
+        except Exception as e:
+            logger.warning(f"Failed to close cache backend: {e}")
+    _backend = None
+
+
+def cache_key(route: str, url: str, params: Optional[dict] = None) -> str:
+    """
+    Build a cache key from the route name, upstream URL and (sorted) query params.
+    Keys start with the route name so a whole route, or a group of routes, can be purged by prefix.
+    """
+    query = "&".join(f"{k}={v}" for k, v in sorted((params or {}).items()))
+    return f"{route}|{url}?{query}"
+
+
+async def cache_lookup(route: str, key: str) -> Optional[CachedResponse]:
+    try:
+        value = await get_cache().get(key)
+    except Exception as e:
+        # The cache must never take a route down; treat backend failures as a miss
+        logger.warning(f"Cache lookup failed for '{route}': {e}")
+        value = None
+    if value is None:
+        _misses[route] += 1
+    else:
+        _hits[route] += 1
+    return value
+
+
+async def cache_store(route: str, key: str, value: CachedResponse):
+    if len(value.body) > CACHE_MAX_BODY_BYTES:
+        return
+    try:
+        await get_cache().set(key, value, cache_ttl(route))
+    except Exception as e:
+        logger.warning(f"Cache store failed for '{route}': {e}")
+
+
+async def purge_cache(prefix: str = "") -> int:
+    """
+    Drop every cached entry whose route starts with prefix (everything when empty).
+    Called after writes that make cached reads stale, and from the purge endpoint.
+    """
+    global _purged
+    try:
+        removed = await get_cache().purge(prefix)
+    except Exception as e:
+        logger.warning(f"Cache purge failed for '{prefix}': {e}")
+        return 0
+    _purged += removed
+    return removed
+
+
+def cache_stats() -> dict:
+    backend = get_cache()
+    routes: List[str] = sorted(set(_hits) | set(_misses))
+    total_hits = sum(_hits.values())
+    total_misses = sum(_misses.values())
+    lookups = total_hits + total_misses
+    return {
+        "backend": backend.name,
+        "entries": backend.size(),
+        "evictions": getattr(backend, "evictions", None),
+        "purged": _purged,
+        "hits": total_hits,
+        "misses": total_misses,
+        "hit_ratio": round(total_hits / lookups, 4) if lookups else 0.0,
+        "routes": {
+            route: {"hits": _hits[route], "misses": _misses[route], "ttl": cache_ttl(route)}
+            for route in routes
+        },
+    }
@@ -0,0 +1,79 @@
+import asyncio
+import hashlib
+import logging
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, Mapping, Optional
+
+import httpx
+
+from config import COALESCE_GETS
+
+logger = logging.getLogger(__name__)
+
+# Request headers that decide what a caller is allowed to see. Requests only share an
+# upstream call when these match, so one user's response is never handed to another.
+AUTH_SCOPE_HEADERS = ("authorization", "cookie", "x-user-id", "x-user-role")
+
+# Identical idempotent GETs currently in flight: key -> task fetching the shared response
+_inflight: Dict[str, asyncio.Task] = {}
+_leaders: Dict[str, int] = defaultdict(int)
+_collapsed: Dict[str, int] = defaultdict(int)
+
+
+def _auth_scope(headers: Optional[Mapping[str, str]]) -> str:
+    if not headers:
+        return "-"
+    lowered = {k.lower(): v for k, v in headers.items()}
+    scope = "\n".join(f"{name}:{lowered[name]}" for name in AUTH_SCOPE_HEADERS if name in lowered)
+    return hashlib.sha256(scope.encode()).hexdigest()[:16] if scope else "-"
+
+
+def flight_key(service: str, url: str, params: Optional[dict] = None, headers: Optional[Mapping[str, str]] = None) -> Optional[str]:
+    """
+    Key for a coalescable GET (service, URL, sorted params and auth scope), or None when
+    coalescing is disabled with GATEWAY_COALESCE_GETS=false.
+    """
+    if not COALESCE_GETS:
+        return None
+    query = "&".join(f"{k}={v}" for k, v in sorted((params or {}).items()))
+    return f"{service}|{url}?{query}|{_auth_scope(headers)}"
+
+
+async def single_flight(service: str, key: str, fetch: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+    """
+    Run fetch once for all concurrent callers with the same key and give each of them the
+    same (fully read) response. Errors raised by fetch reach every caller.
+
+    The fetch runs in its own task, so a caller that disconnects does not cancel it for the others.
+    """
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(fetch())
+        _inflight[key] = task
+        _leaders[service] += 1
+
+        def _retire(done: asyncio.Task):
+            if _inflight.get(key) is done:
+                del _inflight[key]
+
+        task.add_done_callback(_retire)
+    else:
+        _collapsed[service] += 1
+    return await asyncio.shield(task)
+
+
+def coalescing_stats() -> dict:
+    services = sorted(set(_leaders) | set(_collapsed))
+    return {
+        "enabled": COALESCE_GETS,
+        "in_flight": len(_inflight),
+        "upstream_calls": sum(_leaders.values()),
+        "collapsed": sum(_collapsed.values()),
+        "services": {
+            service: {
+                "upstream_calls": _leaders[service],
+                "collapsed": _collapsed[service],
+            }
+            for service in services
+        },
+    }
@@ -0,0 +1,79 @@
+import logging
+from typing import Dict
+
+import httpx
+
+from config import UPSTREAM_SERVICES, upstream_pool_settings
+from utils.auth import attach_identity
+from utils.resilience import GuardedTransport
+
+logger = logging.getLogger(__name__)
+
+# One long-lived AsyncClient (and therefore one keep-alive pool) per upstream service
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401  (installed via httpx[http2])
+        return True
+    except ImportError:
+        return False
+
+
+def _build_client(service: str) -> httpx.AsyncClient:
+    settings = upstream_pool_settings(service)
+
+    http2 = settings["http2"]
+    if http2 and not _http2_available():
+        logger.warning(f"HTTP/2 requested for '{service}' but the 'h2' package is not installed; using HTTP/1.1")
+        http2 = False
+
+    limits = httpx.Limits(
+        max_connections=settings["max_connections"],
+        max_keepalive_connections=settings["max_keepalive_connections"],
+        keepalive_expiry=settings["keepalive_expiry"],
+    )
+    timeout = httpx.Timeout(
+        settings["read_timeout"],
+        connect=settings["connect_timeout"],
+        pool=settings["pool_timeout"],
+    )
+    # Bulkhead + circuit breaker sit in front of the real connection pool
+    transport = GuardedTransport(service, httpx.AsyncHTTPTransport(limits=limits, http2=http2))
+    # Verified callers are identified to the upstream with trusted headers (see utils/auth.py)
+    return httpx.AsyncClient(transport=transport, timeout=timeout, event_hooks={"request": [attach_identity]})
+
+
+def init_clients():
+    """
+    Create the pooled client for every known upstream. Called from the app lifespan.
+    """
+    for service in UPSTREAM_SERVICES:
+        if service not in _clients:
+            _clients[service] = _build_client(service)
+    logger.info(f"Upstream HTTP clients ready: {', '.join(_clients)}")
+
+
+async def close_clients():
+    """
+    Close every pooled client, releasing their keep-alive connections.
+    """
+    for service, client in list(_clients.items()):
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.warning(f"Failed to close HTTP client for '{service}': {e}")
+    _clients.clear()
+
+
+def get_client(service: str) -> httpx.AsyncClient:
+    """
+    Shared client for an upstream service. The client must not be closed by callers.
+    """
+    client = _clients.get(service)
+    if client is None or client.is_closed:
+        # Lazily created when used outside the app lifespan (scripts, tests)
+        client = _build_client(service)
+        _clients[service] = client
+    return client
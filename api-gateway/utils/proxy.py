@@ -0,0 +1,250 @@
+import json as jsonlib
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Mapping, Optional
+
+import httpx
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+
+from config import CACHE_MAX_BODY_BYTES
+from utils.cache import CachedResponse, cache_key, cache_lookup, cache_store
+from utils.coalesce import flight_key, single_flight
+from utils.http_clients import get_client
+
+logger = logging.getLogger(__name__)
+
+# Upstream response headers that are safe and useful to hand back to the client.
+# Hop-by-hop headers (connection, transfer-encoding, keep-alive, ...) are never forwarded.
+PASSTHROUGH_RESPONSE_HEADERS = (
+    "content-type",
+    "content-length",
+    "content-encoding",
+    "content-disposition",
+    "cache-control",
+    "etag",
+    "last-modified",
+    "retry-after",
+)
+
+# Extra headers for file downloads so clients can resume, seek and revalidate
+FILE_REQUEST_HEADERS = ("range", "if-range", "if-none-match", "if-modified-since")
+FILE_RESPONSE_HEADERS = PASSTHROUGH_RESPONSE_HEADERS + ("accept-ranges", "content-range")
+
+# Headers kept with a cached body; length and encoding are recomputed when it is replayed
+CACHED_RESPONSE_HEADERS = ("content-type", "cache-control", "etag", "last-modified")
+
+
+def select_headers(headers: httpx.Headers, names: Iterable[str] = PASSTHROUGH_RESPONSE_HEADERS) -> Dict[str, str]:
+    """
+    Pick the named headers out of an upstream response, keeping only those present.
+    """
+    return {name: headers[name] for name in names if name in headers}
+
+
+def _shared_response(upstream: httpx.Response, body: bytes) -> CachedResponse:
+    return CachedResponse(upstream.status_code, select_headers(upstream.headers, CACHED_RESPONSE_HEADERS), body)
+
+
+def _replay(shared: CachedResponse) -> Response:
+    return Response(content=shared.body, status_code=shared.status_code, headers=shared.headers)
+
+
+async def proxy_passthrough(
+    service: str,
+    method: str,
+    url: str,
+    *,
+    params: Optional[Dict[str, Any]] = None,
+    json: Any = None,
+    data: Optional[Dict[str, Any]] = None,
+    files: Any = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: Any = httpx.USE_CLIENT_DEFAULT,
+    response_headers: Iterable[str] = PASSTHROUGH_RESPONSE_HEADERS,
+    on_body: Optional[Callable[[CachedResponse], Awaitable[None]]] = None,
+    coalesce: bool = False,
+) -> Response:
+    """
+    Forward a request to an upstream service and hand its raw body, status code and
+    selected headers straight back, without decoding or re-encoding the payload.
+
+    Responses are streamed chunk by chunk. With coalesce=True (used for the cached dashboard
+    routes, which are small and hit in bursts) a plain GET goes through single-flight
+    coalescing instead (see utils/coalesce.py): concurrent identical calls share one upstream
+    request whose body is read once and replayed to each caller.
+
+    If on_body is given, a successful (200) body is also handed to on_body once complete,
+    unless it grows beyond CACHE_MAX_BODY_BYTES.
+
+    Raises httpx.RequestError if the upstream cannot be reached.
+    """
+    request_headers = {"Accept-Encoding": "identity"}
+    if headers:
+        request_headers.update(headers)
+
+    client = get_client(service)
+    request = client.build_request(
+        method,
+        url,
+        params=params,
+        json=json,
+        data=data,
+        files=files,
+        headers=request_headers,
+        timeout=timeout,
+    )
+
+    key = None
+    if coalesce and method.upper() == "GET" and json is None and data is None and files is None:
+        key = flight_key(service, url, params, request_headers)
+    if key is not None:
+        upstream = await single_flight(service, key, lambda: client.send(request))
+        if upstream.status_code == 200 and on_body is not None:
+            await on_body(_shared_response(upstream, upstream.content))
+        # The body is already decoded, so length and encoding are left for Response to set
+        replay_headers = [name for name in response_headers if name not in ("content-length", "content-encoding")]
+        return Response(
+            content=upstream.content,
+            status_code=upstream.status_code,
+            headers=select_headers(upstream.headers, replay_headers),
+        )
+
+    upstream = await client.send(request, stream=True)
+
+    body = upstream.aiter_raw()
+    if on_body is not None and upstream.status_code == 200:
+        body = _tee_body(upstream, on_body)
+
+    return StreamingResponse(
+        body,
+        status_code=upstream.status_code,
+        headers=select_headers(upstream.headers, response_headers),
+        background=BackgroundTask(upstream.aclose),
+    )
+
+
+async def _tee_body(
+    upstream: httpx.Response,
+    on_body: Callable[[CachedResponse], Awaitable[None]],
+) -> AsyncIterator[bytes]:
+    chunks = []
+    size = 0
+    keep = True
+    async for chunk in upstream.aiter_raw():
+        if keep:
+            size += len(chunk)
+            if size > CACHE_MAX_BODY_BYTES:
+                # Too big to keep around; finish streaming without collecting
+                keep = False
+                chunks.clear()
+            else:
+                chunks.append(chunk)
+        yield chunk
+    if keep:
+        await on_body(_shared_response(upstream, b"".join(chunks)))
+
+
+async def _request_json(
+    service: str,
+    method: str,
+    url: str,
+    on_body: Optional[Callable[[CachedResponse], Awaitable[None]]] = None,
+    **kwargs,
+):
+    kwargs.pop("response_headers", None)
+    client = get_client(service)
+
+    key = None
+    if method.upper() == "GET":
+        key = flight_key(service, url, kwargs.get("params"), kwargs.get("headers"))
+    if key is not None:
+        response = await single_flight(service, key, lambda: client.request(method, url, **kwargs))
+    else:
+        response = await client.request(method, url, **kwargs)
+
+    response.raise_for_status()
+    if response.status_code == 200 and on_body is not None:
+        await on_body(_shared_response(response, response.content))
+    return response.json()
+
+
+async def _cached_get(service: str, url: str, cache_route: str, passthrough: bool, **kwargs):
+    key = cache_key(cache_route, url, kwargs.get("params"))
+    cached = await cache_lookup(cache_route, key)
+    if cached is not None:
+        if passthrough:
+            return _replay(cached)
+        return jsonlib.loads(cached.body)
+
+    async def store(shared: CachedResponse):
+        await cache_store(cache_route, key, shared)
+
+    if passthrough:
+        return await proxy_passthrough(service, "GET", url, on_body=store, coalesce=True, **kwargs)
+    return await _request_json(service, "GET", url, on_body=store, **kwargs)
+
+
+async def forward_request(
+    service: str,
+    method: str,
+    url: str,
+    *,
+    passthrough: bool = True,
+    cache_route: Optional[str] = None,
+    **kwargs,
+):
+    """
+    Proxy helper used by the gateway service modules.
+
+    With passthrough=True (the default for routes that return the upstream body unchanged)
+    the upstream response is streamed back as-is. With passthrough=False the decoded JSON
+    body is returned instead, for callers that need to work with the data; upstream error
+    statuses raise httpx.HTTPStatusError in that mode.
+
+    GETs that pass a cache_route are served from the gateway response cache when possible
+    (see utils/cache.py); successful upstream responses are stored under that route's TTL,
+    and concurrent identical misses share a single upstream call. Uncached passthrough GETs
+    are streamed without coalescing; JSON-mode GETs are read in full anyway and are coalesced.
+    """
+    if cache_route and method.upper() == "GET":
+        return await _cached_get(service, url, cache_route, passthrough, **kwargs)
+
+    if passthrough:
+        return await proxy_passthrough(service, method, url, **kwargs)
+    return await _request_json(service, method, url, **kwargs)
+
+
+async def proxy_file_download(
+    service: str,
+    url: str,
+    *,
+    request_headers: Optional[Mapping[str, str]] = None,
+    default_disposition: str = "attachment",
+) -> StreamingResponse:
+    """
+    Stream a file from an upstream service chunk by chunk, so gateway memory stays flat
+    regardless of file size. Range and conditional headers from the client are forwarded,
+    and partial (206) or not-modified (304) answers are passed straight through.
+
+    Raises httpx.HTTPStatusError (with the body already read) for upstream error statuses.
+    """
+    forwarded = {"Accept-Encoding": "identity"}
+    if request_headers:
+        forwarded.update({name: request_headers[name] for name in FILE_REQUEST_HEADERS if name in request_headers})
+
+    client = get_client(service)
+    upstream = await client.send(client.build_request("GET", url, headers=forwarded), stream=True)
+    if upstream.is_error:
+        await upstream.aread()
+        await upstream.aclose()
+        upstream.raise_for_status()
+
+    headers = select_headers(upstream.headers, FILE_RESPONSE_HEADERS)
+    headers.setdefault("content-disposition", default_disposition)
+    return StreamingResponse(
+        upstream.aiter_raw(),
+        status_code=upstream.status_code,
+        media_type=None if "content-type" in headers else "application/octet-stream",
+        headers=headers,
+        background=BackgroundTask(upstream.aclose),
+    )
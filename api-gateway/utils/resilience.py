@@ -0,0 +1,249 @@
+import asyncio
+import contextvars
+import logging
+import math
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from config import upstream_guard_settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class UpstreamUnavailable(httpx.TransportError):
+    """
+    Raised instead of calling an upstream whose circuit is open or whose bulkhead is full.
+    Subclasses httpx.TransportError so existing `except httpx.RequestError` handlers apply.
+    """
+
+    def __init__(self, service: str, reason: str, retry_after: int):
+        super().__init__(f"{service} service unavailable ({reason}); retry after {retry_after}s")
+        self.service = service
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+# Fast-fail rejections seen while handling the current gateway request. The middleware in
+# main.py turns the resulting 5xx into a 503 with Retry-After, whatever the route's own
+# error handling made of the exception.
+_rejections: contextvars.ContextVar[Optional[List[UpstreamUnavailable]]] = contextvars.ContextVar(
+    "upstream_rejections", default=None
+)
+
+
+def track_rejections() -> List[UpstreamUnavailable]:
+    rejections: List[UpstreamUnavailable] = []
+    _rejections.set(rejections)
+    return rejections
+
+
+def _reject(service: str, reason: str, retry_after: float) -> UpstreamUnavailable:
+    error = UpstreamUnavailable(service, reason, max(1, math.ceil(retry_after)))
+    rejections = _rejections.get()
+    if rejections is not None:
+        rejections.append(error)
+    return error
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures (transport errors, timeouts or 5xx),
+    rejects calls for `reset_timeout` seconds, then lets a single probe through (half-open).
+    """
+
+    def __init__(self, service: str, failure_threshold: int, reset_timeout: float):
+        self.service = service
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.times_opened = 0
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+
+    def before_call(self):
+        if self.state == OPEN:
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0:
+                self.rejected += 1
+                raise _reject(self.service, "circuit open", remaining)
+            self.state = HALF_OPEN
+            logger.info(f"Circuit for '{self.service}' half-open; probing")
+        if self.state == HALF_OPEN:
+            if self.probe_in_flight:
+                self.rejected += 1
+                raise _reject(self.service, "circuit half-open", 1)
+            self.probe_in_flight = True
+
+    def on_success(self):
+        self.successes += 1
+        self.consecutive_failures = 0
+        self.probe_in_flight = False
+        if self.state != CLOSED:
+            logger.info(f"Circuit for '{self.service}' closed")
+        self.state = CLOSED
+
+    def on_failure(self):
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.probe_in_flight = False
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.times_opened += 1
+                logger.warning(f"Circuit for '{self.service}' opened after {self.consecutive_failures} failures")
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+
+class Bulkhead:
+    """
+    Caps concurrent calls to one upstream; callers queue for at most `queue_timeout` seconds.
+    """
+
+    def __init__(self, service: str, max_in_flight: int, queue_timeout: float):
+        self.service = service
+        self.max_in_flight = max_in_flight
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self.in_flight = 0
+        self.queued = 0
+        self.rejected = 0
+
+    async def acquire(self):
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise _reject(self.service, "too many concurrent requests", self.queue_timeout)
+        finally:
+            self.queued -= 1
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+
+class UpstreamGuard:
+    def __init__(self, service: str):
+        settings = upstream_guard_settings(service)
+        self.service = service
+        self.breaker = CircuitBreaker(service, settings["breaker_failures"], settings["breaker_reset_timeout"])
+        self.bulkhead = Bulkhead(service, settings["max_in_flight"], settings["queue_timeout"])
+
+    def stats(self) -> dict:
+        return {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "times_opened": self.breaker.times_opened,
+            "successes": self.breaker.successes,
+            "failures": self.breaker.failures,
+            "rejected_by_breaker": self.breaker.rejected,
+            "in_flight": self.bulkhead.in_flight,
+            "max_in_flight": self.bulkhead.max_in_flight,
+            "queued": self.bulkhead.queued,
+            "rejected_by_bulkhead": self.bulkhead.rejected,
+        }
+
+
+_guards: Dict[str, UpstreamGuard] = {}
+
+
+def get_guard(service: str) -> UpstreamGuard:
+    guard = _guards.get(service)
+    if guard is None:
+        guard = UpstreamGuard(service)
+        _guards[service] = guard
+    return guard
+
+
+def guard_stats() -> dict:
+    return {service: guard.stats() for service, guard in sorted(_guards.items())}
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    # Keeps the bulkhead slot until the response body is fully read or closed. The breaker
+    # already counted the call when the headers arrived; a body that breaks off is one more failure.
+    def __init__(self, stream: httpx.AsyncByteStream, release, breaker: CircuitBreaker):
+        self._stream = stream
+        self._release = release
+        self._breaker = breaker
+
+    async def __aiter__(self):
+        try:
+            async for chunk in self._stream:
+                yield chunk
+        except httpx.TransportError:
+            self._breaker.on_failure()
+            raise
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+
+class GuardedTransport(httpx.AsyncBaseTransport):
+    """
+    Wraps the real transport of a pooled upstream client with its bulkhead and circuit breaker,
+    so every call made through get_client(service) is protected without changes at call sites.
+    """
+
+    def __init__(self, service: str, transport: httpx.AsyncBaseTransport):
+        self.service = service
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        guard = get_guard(self.service)
+        guard.breaker.before_call()
+        try:
+            await guard.bulkhead.acquire()
+        except UpstreamUnavailable:
+            # Not the upstream's fault: free a half-open probe slot without counting a failure
+            guard.breaker.probe_in_flight = False
+            raise
+
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                guard.bulkhead.release()
+
+        try:
+            response = await self._transport.handle_async_request(request)
+        except httpx.TransportError:
+            guard.breaker.on_failure()
+            release()
+            raise
+        except BaseException:
+            guard.breaker.probe_in_flight = False
+            release()
+            raise
+
+        if response.status_code >= 500:
+            guard.breaker.on_failure()
+        else:
+            guard.breaker.on_success()
+
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_ReleasingStream(response.stream, release, guard.breaker),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self):
+        await self._transport.aclose()
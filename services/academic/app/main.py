@@ -1,6 +1,8 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .services import academic_student, academic_teacher
+from .services.indexes import ensure_indexes_in_background
 import os
 import google.generativeai as genai
 from dotenv import load_dotenv
@@ -9,7 +11,14 @@ from dotenv import load_dotenv
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
 
 
-app = FastAPI(title="Academic API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Index creation runs in the background so startup does not wait on Mongo
+    ensure_indexes_in_background()
+    yield
+
+
+app = FastAPI(title="Academic API", lifespan=lifespan)
 
 # # CORS configuration
 # app.add_middleware(
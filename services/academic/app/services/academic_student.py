@@ -1,7 +1,7 @@
 from datetime import datetime
 import os
 import uuid
-from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi import APIRouter, File, HTTPException, Request, UploadFile
 from typing import List
 from ..utils.grading_gemini import grade_answer
 from ..models.academic import StatusUpdateRequest,AssignmentListResponse, AssignmentViewResponse, ContentResponse, MarksResponse, SubjectResponse,AssignmentMarksResponse, SubmissionResponse
@@ -11,6 +11,8 @@ from ..utils.grading_gemini import grade_answer
 from fastapi.responses import FileResponse
 from .database import db
 from ..utils.file_utils import extract_text
+from ..utils.file_serving import get_file_meta, serve_file
+from ..utils.upload_utils import save_upload_file
 from ..utils.grading_gemini import grade_answer
 import io
 import logging
@@ -27,36 +29,22 @@ ALLOWED_EXTENSIONS = {"pdf", "txt"}  # Allowed file types
 router = APIRouter()
 
 @router.get("/content/file/{content_id}")
-async def serve_content_file(content_id: str):
+async def serve_content_file(content_id: str, request: Request):
     try:
-        # 1. Find the content document in the database
-        content = db["content"].find_one({"content_id": content_id})
-        if not content:
-            raise HTTPException(status_code=404, detail="Content metadata not found in the database.")
-
-        # 2. Get the file path directly from the database record
-        file_path = content.get("content_file_path")
-
-        # 3. Critically validate the path and file existence
-        if not file_path:
-            raise HTTPException(status_code=404, detail="The database record is missing a file path.")
-
-        # This is the most important check. It uses the exact path from the DB.
-        if not os.path.exists(file_path):
-            # We log this for clear debugging. Check your server console for this message.
-            print(f"[ERROR] CRITICAL: File does not exist at the path from the database: {file_path}")
-            raise HTTPException(status_code=404, detail=f"File not found on the server's disk.")
-
-
-        ext = os.path.splitext(file_path)[1].lower()
-        media_type = "application/pdf" if ext == ".pdf" else "text/plain" if ext == ".txt" else "application/octet-stream"
-
-        return FileResponse(
-            path=file_path,
-            media_type=media_type,
-            filename=os.path.basename(file_path),
-            headers={"Content-Disposition": f"inline; filename={os.path.basename(file_path)}"}
-        )
+        def resolve_path():
+            # Only the stored path is needed; the rest of the document is skipped
+            content = db["content"].find_one({"content_id": content_id}, {"_id": 0, "content_file_path": 1})
+            if not content:
+                raise HTTPException(status_code=404, detail="Content metadata not found in the database.")
+            file_path = content.get("content_file_path")
+            if not file_path:
+                raise HTTPException(status_code=404, detail="The database record is missing a file path.")
+            return file_path
+
+        meta = get_file_meta(f"content:{content_id}", resolve_path)
+        return serve_file(request, meta)
+    except HTTPException:
+        raise
     except Exception as e:
         # Catch any other unexpected crash and log it
         print(f"[CRITICAL ERROR] An unexpected exception occurred in serve_content_file: {e}")
@@ -64,31 +52,18 @@ async def serve_content_file(content_id: str):
     
     
 @router.get("/assignment/file/{assignment_id}")
-async def serve_assignment_file(assignment_id: str):
+async def serve_assignment_file(assignment_id: str, request: Request):
     try:
-        print(f"Looking up assignment_id: {assignment_id}")
-        assignment = db["assignment"].find_one({"assignment_id": assignment_id})
-        print(f"Content found: {assignment}")
-
-        if not assignment:
-            raise HTTPException(status_code=404, detail="Content not found")
-
-        file_path = assignment.get("assignment_file_path")
-        print(f"File path: {file_path}")
-
-        if not file_path or not os.path.exists(file_path):
-            raise HTTPException(status_code=404, detail="File not found")
-
-        ext = os.path.splitext(file_path)[1].lower()
-        media_type = "application/pdf" if ext == ".pdf" else "text/plain" if ext == ".txt" else "application/octet-stream"
-
-        print(f"Serving file: {file_path}, Media type: {media_type}")
-        return FileResponse(
-            path=file_path,
-            media_type=media_type,
-            filename=os.path.basename(file_path),
-            headers={"Content-Disposition": f"inline; filename={os.path.basename(file_path)}"}
-        )
+        def resolve_path():
+            assignment = db["assignment"].find_one({"assignment_id": assignment_id}, {"_id": 0, "assignment_file_path": 1})
+            if not assignment:
+                raise HTTPException(status_code=404, detail="Content not found")
+            return assignment.get("assignment_file_path")
+
+        meta = get_file_meta(f"assignment:{assignment_id}", resolve_path)
+        return serve_file(request, meta)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Unexpected error: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
@@ -419,17 +394,15 @@ async def submit_assignment(student_id: str, assignment_id: str, file: UploadFil
     
     file_path = os.path.join(submissions_path, f"{submission_id}_{file.filename}")
 
+    # Streamed to disk in chunks; 413 is raised before anything is kept if the file is too large
+    stored = await save_upload_file(file, file_path)
+
     try:
-        content = await file.read()
-        async with aiofiles.open(file_path, 'wb') as out_file:
-            await out_file.write(content)
-        
         # AI Auto-Grading (if applicable)
         marks = None
         if grading_type == "auto" and sample_answer:
             try:
-                # Use the in-memory content for text extraction, which is more efficient
-                student_text = extract_text(io.BytesIO(content), file.filename)
+                student_text = extract_text(file_path)
                 marks = grade_answer(sample_answer, student_text)
             except Exception as e:
                 logger.error(f"Auto-grading failed for submission_id={submission_id}: {str(e)}")
@@ -445,6 +418,8 @@ async def submit_assignment(student_id: str, assignment_id: str, file: UploadFil
             "class_id": class_id,
             "class_name": class_name,
             "file_name": file.filename,
+            "file_size": stored.size,
+            "file_sha256": stored.sha256,
             "marks": marks,
             "assignment_id": assignment_id,
             "assignment_name": assignment_name,
@@ -462,7 +437,8 @@ async def submit_assignment(student_id: str, assignment_id: str, file: UploadFil
         # Handle resubmission: delete old file and update record
         if existing_submission:
             old_file_path = existing_submission.get("content_file_path")
-            if old_file_path and os.path.exists(old_file_path):
+            # A resubmission with the same file name has already replaced the old file in place
+            if old_file_path and old_file_path != file_path and os.path.exists(old_file_path):
                 try:
                     os.remove(old_file_path)
                 except OSError as e:
@@ -6,6 +6,7 @@ from typing import List
 from openai import BaseModel
 from ..models.academic import StudentResponse,AssignmentResponse, ClassResponse, ContentUploadResponse, StudentsResponse,SubjectClassResponse, SubjectResponse, SubjectWithClasses,SubmissionResponse
 from .database import db
+from ..utils.upload_utils import save_upload_file
 import io
 import logging
 import os
@@ -150,10 +151,8 @@ async def create_assignment(
     file_path = os.path.join(assignments_path, f"{assignment_id}.{file_extension}")
 
     try:
-        # Save the file locally asynchronously
-        async with aiofiles.open(file_path, 'wb') as out_file:
-            content = await file.read()
-            await out_file.write(content)
+        # Stream the upload to disk in chunks instead of holding it in memory
+        await save_upload_file(file, file_path)
 
         # Convert deadline safely/
         try:
@@ -182,6 +181,8 @@ async def create_assignment(
         # You may need to adjust your AssignmentResponse model to expect 'assignment_file_path'
         return assignment_data
 
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         tb = traceback.format_exc()
@@ -213,15 +214,15 @@ async def upload_content(
     file_path = os.path.join(content_path, f"{content_id}_{file.filename}")
 
     try:
-        # Save the file locally asynchronously
-        async with aiofiles.open(file_path, 'wb') as out_file:
-            content = await file.read()
-            await out_file.write(content)
+        # Stream the upload to disk in chunks instead of holding it in memory
+        stored = await save_upload_file(file, file_path)
 
         content_data = {
             "content_id": content_id,
             "content_name": content_name,
             "content_file_path": file_path, # Store the local file path
+            "file_size": stored.size,
+            "file_sha256": stored.sha256,
             "upload_date": datetime.utcnow().date().isoformat(),
             "description": description,
             "class_id": class_id,
@@ -233,6 +234,8 @@ async def upload_content(
         # Adjust your ContentUploadResponse model to expect 'content_file_path'
         return ContentUploadResponse(**content_data)
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"[ERROR] Uploading content_id={content_id} -> {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to upload content: {str(e)}")
@@ -0,0 +1,40 @@
+import logging
+import threading
+
+from pymongo import ASCENDING
+
+from .database import db
+from .index_registry import IndexSpec, QuerySpec, apply_indexes, run_cli
+
+logger = logging.getLogger(__name__)
+
+ACADEMIC_INDEXES = [
+    # One exam marks document per student and year, updated in place when marks are added
+    IndexSpec("exam_marks", [("student_id", ASCENDING), ("exam_year", ASCENDING)], "student_exam_year"),
+    # Class result sheets
+    IndexSpec("exam_marks", [("class_id", ASCENDING), ("exam_year", ASCENDING)], "class_exam_year"),
+]
+
+ACADEMIC_HOT_QUERIES = [
+    QuerySpec("exam_marks", {"student_id": "STU001", "exam_year": 2025}, "exam marks of a student and year"),
+    QuerySpec("exam_marks", {"student_id": "STU001"}, "exam history of a student"),
+    QuerySpec("exam_marks", {"class_id": "CLS001", "exam_year": 2025}, "exam marks of a class and year"),
+]
+
+
+def ensure_indexes_in_background():
+    """
+    Applies the indexes above on a daemon thread, so startup does not wait on Mongo.
+    """
+    def apply():
+        try:
+            apply_indexes(db, ACADEMIC_INDEXES)
+        except Exception as e:
+            logger.warning(f"Could not apply academic indexes: {e}")
+
+    threading.Thread(target=apply, name="ensure-indexes", daemon=True).start()
+
+
+if __name__ == "__main__":
+    # python -m app.services.indexes apply|check
+    run_cli(db, ACADEMIC_INDEXES, ACADEMIC_HOT_QUERIES, "Academic service indexes")
@@ -0,0 +1,117 @@
+import mimetypes
+import os
+import stat
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Callable, NamedTuple, Optional
+
+from cachetools import TTLCache
+from fastapi import HTTPException, Request
+from fastapi.responses import FileResponse, Response
+
+# Uploaded files are written once under a unique name, so their metadata can be cached briefly
+FILE_META_CACHE_SIZE = int(os.getenv("FILE_META_CACHE_SIZE", "1024"))
+FILE_META_CACHE_TTL = int(os.getenv("FILE_META_CACHE_TTL", "300"))
+
+_meta_cache = TTLCache(maxsize=FILE_META_CACHE_SIZE, ttl=FILE_META_CACHE_TTL)
+_meta_lock = threading.Lock()
+
+
+class FileMeta(NamedTuple):
+    path: str
+    stat_result: os.stat_result
+    etag: str
+    last_modified: str
+    media_type: str
+
+
+def _media_type(file_path: str) -> str:
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == ".pdf":
+        return "application/pdf"
+    if ext == ".txt":
+        return "text/plain"
+    return mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+
+
+def _build_meta(file_path: str) -> FileMeta:
+    try:
+        st = os.stat(file_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found on the server's disk.")
+    if not stat.S_ISREG(st.st_mode):
+        raise HTTPException(status_code=404, detail="File not found on the server's disk.")
+
+    # Strong validator derived from the file identity (inode, size, modification time)
+    etag = f'"{st.st_ino:x}-{st.st_size:x}-{st.st_mtime_ns:x}"'
+    return FileMeta(
+        path=file_path,
+        stat_result=st,
+        etag=etag,
+        last_modified=formatdate(st.st_mtime, usegmt=True),
+        media_type=_media_type(file_path),
+    )
+
+
+def get_file_meta(cache_key: str, resolve_path: Callable[[], Optional[str]]) -> FileMeta:
+    """
+    Return the cached metadata for a stored file, resolving its path (database lookup)
+    and stat-ing it only on a cache miss.
+    """
+    with _meta_lock:
+        meta = _meta_cache.get(cache_key)
+    if meta is not None:
+        return meta
+
+    file_path = resolve_path()
+    if not file_path:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    meta = _build_meta(file_path)
+    with _meta_lock:
+        _meta_cache[cache_key] = meta
+    return meta
+
+
+def _not_modified(request: Request, meta: FileMeta) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since (RFC 9110 13.1.3)
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or meta.etag in tags or f"W/{meta.etag}" in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(meta.stat_result.st_mtime) <= since
+    return False
+
+
+def serve_file(request: Request, meta: FileMeta) -> Response:
+    """
+    Serve a stored file with conditional-GET and byte-range support.
+
+    304 is returned when the client's validators still match; otherwise FileResponse handles
+    Range / If-Range (206 / 416) using the cached stat result, so no further lookups happen.
+    """
+    filename = os.path.basename(meta.path)
+    headers = {
+        "ETag": meta.etag,
+        "Last-Modified": meta.last_modified,
+        "Cache-Control": "private, no-cache",
+    }
+
+    if _not_modified(request, meta):
+        return Response(status_code=304, headers=headers)
+
+    headers["Content-Disposition"] = f"inline; filename={filename}"
+    return FileResponse(
+        path=meta.path,
+        media_type=meta.media_type,
+        filename=filename,
+        headers=headers,
+        stat_result=meta.stat_result,
+    )
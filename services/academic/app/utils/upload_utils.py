@@ -0,0 +1,69 @@
+import hashlib
+import os
+import tempfile
+from typing import NamedTuple
+
+import aiofiles
+from fastapi import HTTPException, UploadFile
+
+# Uploads are copied in fixed-size chunks, so memory use per upload stays at one chunk
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE_MB", "200")) * 1024 * 1024
+
+
+class StoredFile(NamedTuple):
+    path: str
+    size: int
+    sha256: str
+
+
+def _too_large(max_size: int) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"File is too large. Maximum allowed size is {max_size // (1024 * 1024)} MB.",
+    )
+
+
+async def save_upload_file(
+    file: UploadFile,
+    dest_path: str,
+    max_size: int = MAX_UPLOAD_SIZE,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+) -> StoredFile:
+    """
+    Stream an uploaded file to dest_path chunk by chunk, computing its size and SHA-256
+    on the way. The data goes to a temp file in the destination directory first and is
+    renamed into place only once complete, so readers never see a partial file.
+
+    Raises HTTPException(413) as soon as the upload exceeds max_size.
+    """
+    # Reject early when the multipart parser already knows the size
+    if file.size is not None and file.size > max_size:
+        raise _too_large(max_size)
+
+    directory = os.path.dirname(dest_path) or "."
+    os.makedirs(directory, exist_ok=True)
+    # Same directory => same filesystem, which keeps the final rename atomic
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".part")
+    os.close(fd)
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(tmp_path, "wb") as out_file:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise _too_large(max_size)
+                digest.update(chunk)
+                await out_file.write(chunk)
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return StoredFile(path=dest_path, size=size, sha256=digest.hexdigest())
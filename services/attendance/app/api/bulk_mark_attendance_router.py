@@ -0,0 +1,28 @@
+from fastapi import APIRouter, HTTPException, status
+from app.utils.schemas import BulkAttendanceRequest
+from app.services.bulk_mark_attendance_service import bulk_mark_attendance_service
+
+router = APIRouter(
+    tags=["Attendance Entry"],
+    prefix="/attendance"
+)
+
+@router.post("/attendance_marking/bulk", status_code=status.HTTP_200_OK)
+async def bulk_mark_class_attendance(request: BulkAttendanceRequest):
+    """
+    Adds or updates many attendance records in one call, returning a result per entry.
+    Submitting the same entries again is safe.
+    """
+    try:
+        response = await bulk_mark_attendance_service(
+            [entry.dict() for entry in request.entries]
+        )
+        return response
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred: {str(e)}"
+        )
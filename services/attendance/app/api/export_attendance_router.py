@@ -0,0 +1,36 @@
+from fastapi import APIRouter, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
+from app.services.export_attendance_service import export_attendance_service
+
+router = APIRouter(
+    tags=["Class Attendance Summary"],
+    prefix="/attendance"
+)
+
+@router.get("/export", status_code=status.HTTP_200_OK)
+async def export_attendance_router(
+    class_id: str = Query(..., description="Class ID"),
+    subject_id: str = Query(..., description="Subject ID"),
+    start_date: str = Query(..., description="First date to export (YYYY-MM-DD)"),
+    end_date: str = Query(..., description="Last date to export (YYYY-MM-DD)"),
+    format: str = Query("csv", description="csv (gzip-compressed) or parquet"),
+):
+    """
+    Streams the attendance of a class and subject over a date range, one row per student
+    and date, as a download.
+    """
+    try:
+        body, media_type, file_name = export_attendance_service(class_id, subject_id, start_date, end_date, format)
+        return StreamingResponse(
+            body,
+            media_type=media_type,
+            headers={"Content-Disposition": f'attachment; filename="{file_name}"'}
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred: {str(e)}"
+        )
@@ -14,7 +14,7 @@ class AttendanceSummaryResponse(BaseModel):
     subject_id: str
     start_date: str
     end_date: str
-    avg: float
+    avg: Optional[float]
     exist_avg: Optional[float]
     exist: Dict[str, float]
     predict: Dict[str, float]
@@ -25,10 +25,11 @@ async def get_attendance_summary_endpoint(
     subject_id: str,
     start_date: str,
     end_date: str,
-    today_date: str
+    today_date: str,
+    existing_only: bool = False  # skip predictions, only recorded attendance
 ):
     try:
-        result = await get_attendance_summary(class_id, subject_id, start_date, end_date, today_date)
+        result = await get_attendance_summary(class_id, subject_id, start_date, end_date, today_date, existing_only)
         return result["data"]
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,47 @@
+from typing import Optional
+from fastapi import APIRouter, HTTPException, status, UploadFile, Form, File
+from app.services.import_attendance_service import start_import_service, get_import_status_service
+
+router = APIRouter(
+    tags=["Attendance Entry"],
+    prefix="/attendance"
+)
+
+@router.post("/import", status_code=status.HTTP_202_ACCEPTED)
+async def import_attendance_router(
+    file: UploadFile = File(...),
+    format: Optional[str] = Form(None),
+    restart: bool = Form(False),
+):
+    """
+    Starts importing historical attendance from a CSV or Parquet file (one row per student
+    and date). Uploading the same file again resumes an interrupted import.
+    """
+    try:
+        response = await start_import_service(file, format, restart)
+        return response
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred: {str(e)}"
+        )
+
+@router.get("/import/{import_id}", status_code=status.HTTP_200_OK)
+async def get_import_status_router(import_id: str):
+    """
+    Progress of an import: rows done, records written, state and throughput.
+    """
+    try:
+        response = await get_import_status_service(import_id)
+        return response
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred: {str(e)}"
+        )
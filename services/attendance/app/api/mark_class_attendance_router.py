@@ -21,6 +21,8 @@ async def mark_class_attendance(new_attendance: AttendanceEntry):
         )
         return response
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -0,0 +1,67 @@
+from fastapi import APIRouter, HTTPException, status, Request
+from app.utils.schemas import PresignedUploadRequest
+from app.services.medical_presigned_upload_service import (
+    create_presigned_upload_service,
+    complete_presigned_upload_service,
+    store_local_upload_service,
+)
+
+router = APIRouter(
+    tags=["Medical Related Documents"],
+    prefix="/attendance"
+)
+
+@router.post("/document-upload/presign", status_code=status.HTTP_201_CREATED)
+async def create_presigned_upload(request: PresignedUploadRequest):
+    """
+    Returns a short-lived URL to upload a medical document to, bypassing this service, with
+    the method, form fields and headers to send. Call the completion endpoint with the
+    returned upload_id once the upload has finished.
+    """
+    try:
+        response = await create_presigned_upload_service(request.dict())
+        return response
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred: {str(e)}"
+        )
+
+@router.post("/document-upload/{upload_id}/complete", status_code=status.HTTP_201_CREATED)
+async def complete_presigned_upload(upload_id: str):
+    """
+    Records a document uploaded through a presigned URL. Calling it again is safe.
+    """
+    try:
+        response = await complete_presigned_upload_service(upload_id)
+        return response
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred: {str(e)}"
+        )
+
+@router.put("/document-storage/{key:path}", status_code=status.HTTP_200_OK)
+async def local_presigned_upload(key: str, expires: int, signature: str, request: Request):
+    """
+    Target of presigned upload URLs when documents are kept in local storage.
+    """
+    try:
+        response = await store_local_upload_service(
+            key, request.headers.get("content-type", ""), expires, signature, request.stream()
+        )
+        return response
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred: {str(e)}"
+        )
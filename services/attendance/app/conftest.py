@@ -0,0 +1,82 @@
+import sys
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+
+class _BulkWriteResult:
+    def __init__(self, result: dict):
+        self.bulk_api_result = result
+
+
+def _bulk_write(collection):
+    # mongomock's bulk_write does not accept the operation objects of recent pymongo releases,
+    # so run the operations one by one, reporting duplicate keys as the server would
+    async def bulk_write(operations, ordered=True):
+        result = {"nInserted": 0, "nUpserted": 0, "nModified": 0, "nRemoved": 0, "writeErrors": []}
+        for index, operation in enumerate(operations):
+            try:
+                await run(operation, result)
+            except DuplicateKeyError as e:
+                result["writeErrors"].append({"index": index, "code": 11000, "errmsg": str(e)})
+                if ordered:
+                    break
+        if result["writeErrors"]:
+            raise BulkWriteError(result)
+        return _BulkWriteResult(result)
+
+    async def run(operation, result):
+        if isinstance(operation, InsertOne):
+            await collection.insert_one(operation._doc)
+            result["nInserted"] += 1
+        elif isinstance(operation, (UpdateOne, ReplaceOne)):
+            method = collection.update_one if isinstance(operation, UpdateOne) else collection.replace_one
+            outcome = await method(operation._filter, operation._doc, upsert=operation._upsert)
+            if outcome.upserted_id is not None:
+                result["nUpserted"] += 1
+            else:
+                result["nModified"] += outcome.modified_count
+        elif isinstance(operation, DeleteOne):
+            result["nRemoved"] += (await collection.delete_one(operation._filter)).deleted_count
+        elif isinstance(operation, DeleteMany):
+            result["nRemoved"] += (await collection.delete_many(operation._filter)).deleted_count
+        else:
+            raise TypeError(f"Unsupported bulk operation: {operation!r}")
+    return bulk_write
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """
+    Points every loaded app module at an in-memory database instead of the real cluster.
+    Returns the database.
+    """
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    database = mongomock_motor.AsyncMongoMockClient().LMS
+    collections = {}
+
+    def collection(name):
+        if name not in collections:
+            collections[name] = database[name]
+            collections[name].bulk_write = _bulk_write(collections[name])
+        return collections[name]
+
+    class Database:
+        # Collections looked up by name (staging collections) get the same bulk_write
+        def __getitem__(self, name):
+            return collection(name)
+
+        def __getattr__(self, name):
+            return getattr(database, name)
+
+    for module_name, module in list(sys.modules.items()):
+        if module_name != "app" and not module_name.startswith("app."):
+            continue
+        for attribute, value in list(vars(module).items()):
+            if isinstance(value, AsyncIOMotorCollection):
+                monkeypatch.setattr(module, attribute, collection(value.name))
+            elif isinstance(value, AsyncIOMotorDatabase):
+                monkeypatch.setattr(module, attribute, Database())
+    return Database()
@@ -3,11 +3,17 @@ import asyncio
 from contextlib import asynccontextmanager
 # from app.services.background_services.attendance_tracker import attendance_tracker
 from app.utils.mongodb_connection import attendance_store
+from app.utils.indexes import ensure_indexes
+from app.services.rollup_service import rollup_retry_loop
+from app.services.medical_presigned_upload_service import upload_cleanup_loop
+from app.services.background_services.document_storage import get_storage
 # from app.services.background_services.scheduler import setup_scheduler, start_scheduler
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.get_class_students_router import router as get_class_students_router
 from app.api.mark_class_attendance_router import router as mark_class_attendance_router
+from app.api.bulk_mark_attendance_router import router as bulk_mark_attendance_router
+from app.api.import_attendance_router import router as import_attendance_router
 from app.api.update_class_attendance_router import router as update_class_attendance_router
 from app.api.delete_class_attendance_router import router as delete_class_attendance_router
 from app.api.get_attendance_ratio_router import classrouter as class_ratio_router
@@ -15,7 +21,9 @@ from app.api.get_attendance_ratio_router import studentrouter as student_ratio_r
 from app.api.get_attendance_summary_router import classrouter as class_summary_router
 from app.api.get_attendance_summary_router import studentrouter as student_summary_router
 from app.api.get_class_history_router import router as get_class_history_router
+from app.api.export_attendance_router import router as export_attendance_router
 from app.api.medical_upload_router import router as medical_upload_router
+from app.api.medical_presigned_upload_router import router as medical_presigned_upload_router
 from app.api.get_medicals_router import router as get_medicals_router
 from app.api.medical_delete_router import router as medical_delete_router
 from app.api.get_nonacadamic_subjects_router import studentrouter as get_student_nonacadamic_subjects_router
@@ -40,7 +48,24 @@ from app.services.dashboard_services.get_daily_summary import router as daily_su
 #     yield
     
 
-app = FastAPI(title="Attendance Management API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # A misconfigured document storage stops startup rather than failing uploads later
+    get_storage()
+    # Index creation runs in the background so startup does not wait on Mongo; the task is
+    # kept so it is not garbage-collected before it finishes
+    index_task = asyncio.create_task(ensure_indexes())
+    # Applies attendance rollup deltas that could not be applied inline
+    retry_task = asyncio.create_task(rollup_retry_loop())
+    # Deletes the files of presigned uploads that were never completed
+    cleanup_task = asyncio.create_task(upload_cleanup_loop())
+    yield
+    retry_task.cancel()
+    cleanup_task.cancel()
+    index_task.cancel()
+
+
+app = FastAPI(title="Attendance Management API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -52,6 +77,8 @@ app.add_middleware(
 
 app.include_router(get_class_students_router)
 app.include_router(mark_class_attendance_router)
+app.include_router(bulk_mark_attendance_router)
+app.include_router(import_attendance_router)
 app.include_router(update_class_attendance_router)
 app.include_router(delete_class_attendance_router)
 app.include_router(class_ratio_router)
@@ -59,7 +86,9 @@ app.include_router(student_ratio_router)
 app.include_router(class_summary_router)
 app.include_router(student_summary_router)
 app.include_router(get_class_history_router)
+app.include_router(export_attendance_router)
 app.include_router(medical_upload_router)
+app.include_router(medical_presigned_upload_router)
 app.include_router(get_medicals_router)
 app.include_router(medical_delete_router)
 app.include_router(get_student_nonacadamic_subjects_router)
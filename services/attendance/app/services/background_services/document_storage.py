@@ -0,0 +1,314 @@
+"""
+Storage backends for medical documents.
+
+DOCUMENT_STORAGE_BACKEND selects where uploaded files go:
+  - "s3" (default): AWS S3, or any S3-compatible server such as MinIO when
+    DOCUMENT_STORAGE_ENDPOINT_URL is set.
+  - "local": a directory on disk (DOCUMENT_STORAGE_LOCAL_ROOT), for tests and benchmarks.
+    Its upload URLs are signed with DOCUMENT_STORAGE_SIGNING_KEY, which must be set.
+
+The S3 client and its credentials are only set up on first use, so importing this module
+needs neither boto3 configuration nor network access. Uploads run on worker threads and are
+streamed from the file object in multipart chunks, with at most
+DOCUMENT_UPLOAD_MAX_CONCURRENCY uploads in flight per process.
+
+Clients can also upload straight to storage: presign_upload returns a short-lived URL (a
+presigned POST form on S3) the file is sent to, so its bytes never pass through our services,
+and storage itself rejects files above the size limit. The local backend issues signed PUT
+URLs to its own endpoint (app/api/medical_presigned_upload_router.py) instead, which stops
+reading once the limit is passed.
+"""
+import abc
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Optional
+from urllib.parse import quote, unquote, urlparse
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+env_path = Path(__file__).resolve().parent.parent.parent / '.env'
+load_dotenv(dotenv_path=env_path)
+
+DOCUMENT_UPLOAD_MAX_CONCURRENCY = int(os.getenv("DOCUMENT_UPLOAD_MAX_CONCURRENCY", "4"))
+# Files above the threshold are sent as multipart uploads of DOCUMENT_UPLOAD_PART_SIZE parts
+DOCUMENT_UPLOAD_MULTIPART_THRESHOLD = int(os.getenv("DOCUMENT_UPLOAD_MULTIPART_THRESHOLD", str(8 * 1024 * 1024)))
+DOCUMENT_UPLOAD_PART_SIZE = int(os.getenv("DOCUMENT_UPLOAD_PART_SIZE", str(8 * 1024 * 1024)))
+# Parts of one multipart upload sent in parallel
+DOCUMENT_UPLOAD_PART_CONCURRENCY = int(os.getenv("DOCUMENT_UPLOAD_PART_CONCURRENCY", "4"))
+
+REQUIRED_S3_ENV_VARS = [
+    "AWS_ACCESS_KEY_ID",
+    "AWS_SECRET_ACCESS_KEY",
+    "AWS_REGION",
+    "AWS_BUCKET_NAME"
+]
+
+_upload_slots: Optional[asyncio.Semaphore] = None
+
+
+class DocumentTooLarge(Exception):
+    pass
+
+
+def _slots() -> asyncio.Semaphore:
+    # Created lazily so it belongs to the running event loop
+    global _upload_slots
+    if _upload_slots is None:
+        _upload_slots = asyncio.Semaphore(DOCUMENT_UPLOAD_MAX_CONCURRENCY)
+    return _upload_slots
+
+
+class DocumentStorage(abc.ABC):
+    """
+    Where medical documents are kept. Files are addressed by key; the URL returned by
+    upload is what is stored in document_store.file_path.
+    """
+
+    @abc.abstractmethod
+    def url_for(self, key: str) -> str:
+        ...
+
+    @abc.abstractmethod
+    def key_from_url(self, url: str) -> str:
+        ...
+
+    @abc.abstractmethod
+    def _upload(self, file_obj: BinaryIO, key: str, content_type: str):
+        ...
+
+    @abc.abstractmethod
+    def _delete(self, key: str):
+        ...
+
+    @abc.abstractmethod
+    def _presign_upload(self, key: str, content_type: str, max_bytes: int, expires_in: int) -> dict:
+        ...
+
+    @abc.abstractmethod
+    def _size(self, key: str) -> Optional[int]:
+        ...
+
+    async def upload(self, file_obj: BinaryIO, key: str, content_type: str) -> str:
+        """
+        Streams file_obj to key on a worker thread and returns the file's URL.
+        """
+        async with _slots():
+            await asyncio.to_thread(self._upload, file_obj, key, content_type)
+        return self.url_for(key)
+
+    async def delete(self, url: str):
+        await asyncio.to_thread(self._delete, self.key_from_url(url))
+
+    async def presign_upload(self, key: str, content_type: str, max_bytes: int, expires_in: int) -> dict:
+        """
+        How to upload one file of at most max_bytes to key with the given content type, for
+        expires_in seconds: {"method", "url", "fields", "headers"}. A POST sends a multipart
+        form with the fields followed by the file; a PUT sends the file as the body.
+        """
+        return await asyncio.to_thread(self._presign_upload, key, content_type, max_bytes, expires_in)
+
+    async def size(self, key: str) -> Optional[int]:
+        """
+        Size in bytes of the file stored under key, None if there is none.
+        """
+        return await asyncio.to_thread(self._size, key)
+
+
+class S3Storage(DocumentStorage):
+    def __init__(self):
+        self.bucket = os.getenv("AWS_BUCKET_NAME")
+        self.endpoint_url = os.getenv("DOCUMENT_STORAGE_ENDPOINT_URL")
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._create_client()
+        return self._client
+
+    def _create_client(self):
+        missing_vars = [var for var in REQUIRED_S3_ENV_VARS if not os.getenv(var)]
+        if missing_vars:
+            raise EnvironmentError(f"Missing required environment variables: {', '.join(missing_vars)}")
+
+        import boto3
+        from botocore.config import Config
+
+        return boto3.client(
+            "s3",
+            aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+            aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+            region_name=os.getenv("AWS_REGION"),
+            endpoint_url=self.endpoint_url,
+            # MinIO and other stand-ins serve buckets by path rather than by host name
+            config=Config(
+                s3={"addressing_style": "path" if self.endpoint_url else "auto"},
+                max_pool_connections=DOCUMENT_UPLOAD_MAX_CONCURRENCY * DOCUMENT_UPLOAD_PART_CONCURRENCY,
+            ),
+        )
+
+    def url_for(self, key: str) -> str:
+        if self.endpoint_url:
+            return f"{self.endpoint_url.rstrip('/')}/{self.bucket}/{quote(key)}"
+        return f"https://{self.bucket}.s3.amazonaws.com/{quote(key)}"
+
+    def key_from_url(self, url: str) -> str:
+        path = unquote(urlparse(url).path).lstrip('/')
+        if not path:
+            raise ValueError("Invalid S3 URL format")
+        if self.endpoint_url and path.startswith(f"{self.bucket}/"):
+            path = path[len(self.bucket) + 1:]
+        return path
+
+    def _upload(self, file_obj: BinaryIO, key: str, content_type: str):
+        from boto3.s3.transfer import TransferConfig
+
+        self.client.upload_fileobj(
+            file_obj,
+            self.bucket,
+            key,
+            ExtraArgs={"ContentType": content_type},
+            Config=TransferConfig(
+                multipart_threshold=DOCUMENT_UPLOAD_MULTIPART_THRESHOLD,
+                multipart_chunksize=DOCUMENT_UPLOAD_PART_SIZE,
+                max_concurrency=DOCUMENT_UPLOAD_PART_CONCURRENCY,
+            )
+        )
+
+    def _delete(self, key: str):
+        response = self.client.delete_object(Bucket=self.bucket, Key=key)
+        if response.get('ResponseMetadata', {}).get('HTTPStatusCode') != 204:
+            raise Exception(f"Unexpected response from S3: {response}")
+
+    def _presign_upload(self, key: str, content_type: str, max_bytes: int, expires_in: int) -> dict:
+        # A presigned PUT cannot limit the size of the body; the POST policy can
+        post = self.client.generate_presigned_post(
+            self.bucket,
+            key,
+            Fields={"Content-Type": content_type},
+            Conditions=[{"Content-Type": content_type}, ["content-length-range", 1, max_bytes]],
+            ExpiresIn=expires_in,
+        )
+        return {"method": "POST", "url": post["url"], "fields": post["fields"], "headers": {}}
+
+    def _size(self, key: str) -> Optional[int]:
+        from botocore.exceptions import ClientError
+
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=key)["ContentLength"]
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+
+class LocalStorage(DocumentStorage):
+    def __init__(self):
+        self.root = Path(os.getenv("DOCUMENT_STORAGE_LOCAL_ROOT", "/tmp/medical-documents")).resolve()
+        self.base_url = os.getenv("DOCUMENT_STORAGE_LOCAL_URL", self.root.as_uri()).rstrip('/')
+        # Where presigned uploads are PUT to
+        self.upload_url = os.getenv(
+            "DOCUMENT_STORAGE_LOCAL_UPLOAD_URL", "http://localhost:8000/attendance/document-storage"
+        ).rstrip('/')
+        # Must be the same in every worker, or a URL signed by one is rejected by the others
+        self.signing_key = os.getenv("DOCUMENT_STORAGE_SIGNING_KEY")
+        if not self.signing_key:
+            raise EnvironmentError("DOCUMENT_STORAGE_SIGNING_KEY is required by the local document storage")
+
+    def path_for(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if self.root not in path.parents:
+            raise ValueError(f"Invalid document key: {key}")
+        return path
+
+    def url_for(self, key: str) -> str:
+        return f"{self.base_url}/{quote(key)}"
+
+    def key_from_url(self, url: str) -> str:
+        if not url.startswith(f"{self.base_url}/"):
+            raise ValueError("Document URL does not belong to the local storage")
+        return unquote(url[len(self.base_url) + 1:])
+
+    def _upload(self, file_obj: BinaryIO, key: str, content_type: str):
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as target:
+            shutil.copyfileobj(file_obj, target, DOCUMENT_UPLOAD_PART_SIZE)
+
+    def _delete(self, key: str):
+        self.path_for(key).unlink()
+
+    def _signature(self, key: str, content_type: str, expires: int) -> str:
+        message = f"{key}\n{content_type}\n{expires}".encode()
+        return hmac.new(self.signing_key.encode(), message, hashlib.sha256).hexdigest()
+
+    def _presign_upload(self, key: str, content_type: str, max_bytes: int, expires_in: int) -> dict:
+        # The size limit is enforced by store_stream
+        expires = int(time.time()) + expires_in
+        url = f"{self.upload_url}/{quote(key)}?expires={expires}&signature={self._signature(key, content_type, expires)}"
+        return {"method": "PUT", "url": url, "fields": {}, "headers": {"Content-Type": content_type}}
+
+    def verify_upload(self, key: str, content_type: str, expires: int, signature: str) -> bool:
+        if expires < time.time():
+            return False
+        return hmac.compare_digest(signature, self._signature(key, content_type, expires))
+
+    async def store_stream(self, key: str, chunks: AsyncIterator[bytes], max_bytes: int) -> int:
+        """
+        Writes a presigned upload's request body to key as it arrives; returns its size.
+        Raises DocumentTooLarge, keeping nothing, as soon as the body passes max_bytes.
+        """
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        size = 0
+        try:
+            with open(path, "wb") as target:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise DocumentTooLarge(f"Documents can be at most {max_bytes} bytes")
+                    await asyncio.to_thread(target.write, chunk)
+        except BaseException:
+            path.unlink(missing_ok=True)
+            raise
+        return size
+
+    def _size(self, key: str) -> Optional[int]:
+        path = self.path_for(key)
+        return path.stat().st_size if path.is_file() else None
+
+
+STORAGE_BACKENDS = {
+    "s3": S3Storage,
+    "local": LocalStorage,
+}
+
+_storage: Optional[DocumentStorage] = None
+
+
+def get_storage() -> DocumentStorage:
+    """
+    The configured storage backend, created on first use. Raises EnvironmentError when the
+    backend is not configured.
+    """
+    global _storage
+    if _storage is None:
+        backend = os.getenv("DOCUMENT_STORAGE_BACKEND", "s3").lower()
+        if backend not in STORAGE_BACKENDS:
+            raise EnvironmentError(f"Unknown DOCUMENT_STORAGE_BACKEND '{backend}', use one of: {', '.join(STORAGE_BACKENDS)}")
+        _storage = STORAGE_BACKENDS[backend]()
+        logger.info(f"Medical documents are stored with the {backend} backend")
+    return _storage
@@ -152,22 +152,74 @@
 
 
 from datetime import datetime, timedelta
-from typing import Dict
+from typing import Callable, Dict, Optional
 from fastapi import HTTPException
 import logging
 
 from app.utils.mongodb_connection import attendance_store
-from app.services.ml_service.prediction_service import predict_attendance
+from app.services.ml_service.prediction_service import predict_attendance_batch
 
 logger = logging.getLogger(__name__)
 
+async def fetch_existing_attendance(class_id: str, subject_id: str, start_date: str, end_date: str) -> Dict[str, float]:
+    """
+    Recorded attendance percentage per date (rounded to 2 places) for a class and subject,
+    start_date and end_date inclusive. One query for the whole range; when a date has more
+    than one record the last one stored wins.
+    """
+    if start_date > end_date:
+        return {}
+
+    pipeline = [
+        {
+            "$match": {
+                "class_id": class_id,
+                "subject_id": subject_id,
+                "date": {"$gte": start_date, "$lte": end_date}
+            }
+        },
+        {"$sort": {"_id": 1}},
+        {
+            "$group": {
+                "_id": "$date",
+                "attendance_percentage": {"$last": "$attendance_percentage"}
+            }
+        }
+    ]
+
+    records = await attendance_store.aggregate(pipeline).to_list(length=None)
+    return {
+        record["_id"]: round(record["attendance_percentage"], 2)
+        for record in sorted(records, key=lambda record: record["_id"])
+        if record.get("attendance_percentage") is not None
+    }
+
+
+def average_by_bucket(exist_data: Dict[str, float], bucket_of: Callable[[str], Optional[str]]) -> Dict[str, float]:
+    """
+    Groups per-date values with bucket_of(date) and averages each bucket the same way
+    calculate_averages computes exist_avg. Dates mapped to None are skipped.
+    """
+    buckets: Dict[str, list] = {}
+    for date, value in exist_data.items():
+        bucket = bucket_of(date)
+        if bucket is not None:
+            buckets.setdefault(bucket, []).append(value)
+    return {bucket: round(sum(values) / len(values), 2) for bucket, values in buckets.items()}
+
+
 async def get_attendance_summary(
     class_id: str,
     subject_id: str,
     start_date: str,
     end_date: str,
-    today_date: str  # e.g. "2025-01-23"
+    today_date: str,  # e.g. "2025-01-23"
+    existing_only: bool = False
 ) -> Dict:
+    """
+    Recorded attendance between start_date and min(today_date, end_date), plus predictions for
+    the remaining dates up to end_date unless existing_only is set.
+    """
     try:
         logger.info(f"Request received: class_id={class_id}, subject_id={subject_id}, start_date={start_date}, end_date={end_date}, today_date={today_date}")
 
@@ -179,51 +231,31 @@ async def get_attendance_summary(
         # Adjust end_date if today is between start and end
         adjusted_end = min(today, end)
 
-        # Historical attendance query (including today)
-        historical_pipeline = [
-            {
-                "$match": {
-                    "class_id": class_id,
-                    "subject_id": subject_id,
-                    "date": {"$gte": start_date, "$lte": adjusted_end.strftime("%Y-%m-%d")}
-                }
-            },
-            {
-                "$project": {
-                    "_id": 0,
-                    "date": 1,
-                    "attendance_percentage": 1
-                }
-            }
-        ]
-
-        history_cursor = attendance_store.aggregate(historical_pipeline)
-        history_records = await history_cursor.to_list(length=None)
-
-        exist_data = {
-            record["date"]: round(record["attendance_percentage"], 2)
-            for record in history_records
-        }
+        # Historical attendance (including today)
+        exist_data = await fetch_existing_attendance(
+            class_id, subject_id, start_date, adjusted_end.strftime("%Y-%m-%d")
+        )
 
-        # Determine which dates to predict
+        # Determine which dates to predict (none when only existing data was asked for)
         predict_dates = []
 
-        if today.strftime("%Y-%m-%d") not in exist_data:
-            predict_dates.append(today.strftime("%Y-%m-%d"))
+        if not existing_only:
+            if today.strftime("%Y-%m-%d") not in exist_data:
+                predict_dates.append(today.strftime("%Y-%m-%d"))
 
-        next_day = today + timedelta(days=1)
-        while next_day <= end:
-            predict_dates.append(next_day.strftime("%Y-%m-%d"))
-            next_day += timedelta(days=1)
+            next_day = today + timedelta(days=1)
+            while next_day <= end:
+                predict_dates.append(next_day.strftime("%Y-%m-%d"))
+                next_day += timedelta(days=1)
 
         predicted_data = {}
         if predict_dates:
-            for date in predict_dates:
-                result = await predict_attendance(
-                    class_id=class_id,
-                    subject_id=subject_id,
-                    target_date=datetime.strptime(date, "%Y-%m-%d")
-                )
+            results = await predict_attendance_batch(
+                class_id=class_id,
+                subject_id=subject_id,
+                dates=[datetime.strptime(date, "%Y-%m-%d") for date in predict_dates]
+            )
+            for date, result in zip(predict_dates, results):
                 predicted_data[date] = result["predicted_attendance_rate"]
 
         exist_avg, avg = calculate_averages(exist_data, predicted_data)
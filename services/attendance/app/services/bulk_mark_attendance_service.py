@@ -0,0 +1,141 @@
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from bson.objectid import ObjectId
+from fastapi import HTTPException, status
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.utils.mongodb_connection import attendance_store
+from app.services.mark_class_attendance_service import build_attendance_record
+from app.services.rollup_service import write_many_with_rollups
+
+BULK_MARKING_MAX_ENTRIES = int(os.getenv("BULK_MARKING_MAX_ENTRIES", "5000"))
+# Entries looked up and written per round trip
+BULK_MARKING_CHUNK_SIZE = int(os.getenv("BULK_MARKING_CHUNK_SIZE", "500"))
+
+RecordKey = Tuple[str, str, str]  # (class_id, subject_id, date)
+
+
+def _key(entry: dict) -> RecordKey:
+    return entry["class_id"], entry["subject_id"], entry["date"]
+
+
+def _result(index: int, entry: dict, result: str, record: Optional[dict] = None, detail: str = None) -> dict:
+    outcome = {
+        "index": index,
+        "class_id": entry["class_id"],
+        "subject_id": entry["subject_id"],
+        "date": entry["date"],
+        "result": result,
+        "attendance_id": str(record["_id"]) if record else None,
+        "attendance_percentage": record.get("attendance_percentage") if record else None,
+    }
+    if detail:
+        outcome["detail"] = detail
+    return outcome
+
+
+async def _mark_chunk(chunk: List[Tuple[int, dict, dict]], results: List[Optional[dict]]):
+    # chunk holds (index in request, entry, new record) with unique keys
+    existing: Dict[RecordKey, dict] = {}
+    cursor = attendance_store.find(
+        {"$or": [{"class_id": c, "subject_id": s, "date": d} for c, s, d in (_key(entry) for _, entry, _ in chunk)]}
+    ).sort("_id", 1)
+    async for record in cursor:
+        existing.setdefault(_key(record), record)
+
+    planned = []  # (index, entry, action, old record, new record)
+    for index, entry, record in chunk:
+        old = existing.get(_key(entry))
+        if old is None:
+            planned.append((index, entry, "mark", None, {"_id": ObjectId(), **record}))
+        elif old.get("status") == record["status"]:
+            # Already recorded exactly like this; resubmitting is a no-op
+            results[index] = _result(index, entry, "unchanged", old)
+        else:
+            new = {**old, **record, "updated_at": int(datetime.now().timestamp())}
+            planned.append((index, entry, "update", old, new))
+
+    write_errors: Dict[int, str] = {}
+
+    async def write(versions: Dict[ObjectId, ObjectId]):
+        operations = []
+        for _, entry, action, old, new in planned:
+            version = versions[new["_id"]]
+            if action == "mark":
+                # Upsert on the unique (class_id, subject_id, date) key: if the record appeared
+                # since it was looked up, nothing is written and the entry is reported as a conflict
+                operations.append(UpdateOne(
+                    {"class_id": entry["class_id"], "subject_id": entry["subject_id"], "date": entry["date"]},
+                    {"$setOnInsert": {**new, "rollup_version": version}},
+                    upsert=True
+                ))
+            else:
+                fields = {field: value for field, value in new.items() if field not in ("_id", "rollup_version")}
+                operations.append(UpdateOne(
+                    {"_id": old["_id"], "rollup_version": old.get("rollup_version")},
+                    {"$set": {**fields, "rollup_version": version}}
+                ))
+        try:
+            await attendance_store.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                write_errors[error["index"]] = error.get("errmsg", "Write failed")
+
+    written = await write_many_with_rollups(
+        [(action, new["_id"], old, new) for _, _, action, old, new in planned],
+        write
+    )
+
+    for position, (index, entry, action, old, new) in enumerate(planned):
+        if new["_id"] in written:
+            results[index] = _result(index, entry, "created" if action == "mark" else "updated", new)
+        else:
+            detail = write_errors.get(position, "Attendance record was modified concurrently, please retry")
+            results[index] = _result(index, entry, "error", detail=detail)
+
+
+async def bulk_mark_attendance_service(entries: List[dict]) -> dict:
+    """
+    Marks attendance for many (class_id, subject_id, date, status) entries at once.
+
+    Each entry creates the record for its class, subject and date, or updates the existing
+    one, so resubmitting the same entries is safe. Lookups and writes are batched per
+    BULK_MARKING_CHUNK_SIZE entries, with unordered bulk writes. Returns one result per entry,
+    in request order: created, updated, unchanged or error.
+    """
+    if len(entries) > BULK_MARKING_MAX_ENTRIES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {BULK_MARKING_MAX_ENTRIES} entries can be marked per request."
+        )
+
+    results: List[Optional[dict]] = [None] * len(entries)
+    valid: List[Tuple[int, dict, dict]] = []
+    seen = set()
+    for index, entry in enumerate(entries):
+        if _key(entry) in seen:
+            results[index] = _result(index, entry, "error", detail="Duplicate class_id, subject_id and date in this request")
+            continue
+        seen.add(_key(entry))
+        try:
+            record = build_attendance_record(entry["class_id"], entry["subject_id"], entry["date"], entry["status"])
+        except ValueError:
+            results[index] = _result(index, entry, "error", detail="Invalid date format. Use YYYY-MM-DD")
+            continue
+        valid.append((index, entry, record))
+
+    for start in range(0, len(valid), BULK_MARKING_CHUNK_SIZE):
+        await _mark_chunk(valid[start:start + BULK_MARKING_CHUNK_SIZE], results)
+
+    counts = {"created": 0, "updated": 0, "unchanged": 0, "error": 0}
+    for outcome in results:
+        counts[outcome["result"]] += 1
+
+    return {
+        "success": counts["error"] == 0,
+        "counts": counts,
+        "results": results
+    }
@@ -2,7 +2,7 @@ import calendar
 from datetime import datetime, timedelta
 from typing import Dict
 from fastapi import APIRouter, HTTPException
-from app.services.background_services.get_daily_attendance_service import get_attendance_summary
+from app.services.background_services.get_daily_attendance_service import fetch_existing_attendance
 import logging
 
 logger = logging.getLogger(__name__)
@@ -22,6 +22,7 @@ async def get_daily_summary(
 ) -> Dict:
     """
     Generate a daily attendance summary for the given week of a specific month.
+    Days without recorded attendance are reported as 0.0; no predictions are made.
     """
     try:
         today = datetime.strptime(today_date, "%Y-%m-%d")
@@ -61,31 +62,20 @@ async def get_daily_summary(
         start_date = max(monday, first_day)
         end_date = min(sunday, last_day)
 
-        daily_summary = {}
+        # One query for the whole week (up to today)
+        exist_data = await fetch_existing_attendance(
+            class_id, subject_id, start_date.strftime("%Y-%m-%d"), min(end_date, today).strftime("%Y-%m-%d")
+        )
 
+        daily_summary = {}
         current_day = start_date
         while current_day <= end_date:
             date_str = current_day.strftime("%Y-%m-%d")
-            summary = await get_attendance_summary(
-                class_id=class_id,
-                subject_id=subject_id,
-                start_date=date_str,
-                end_date=date_str,
-                today_date=today_date
-            )
-
-            logger.info(f"Daily summary for {date_str}: {summary}")
-
-            exist_avg = summary.get("exist_avg") or summary.get("data", {}).get("exist_avg")
-
-            if exist_avg is None:
-                logger.warning(f"Missing 'exist_avg' for {date_str}. Defaulting to 0.0")
-                exist_avg = 0.0
-
-            daily_summary[date_str] = exist_avg
-
+            daily_summary[date_str] = exist_data.get(date_str, 0.0)
             current_day += timedelta(days=1)
 
+        logger.info(f"Daily summary for week {week} of {month}: {daily_summary}")
+
         return {
             "class_id": class_id,
             "subject_id": subject_id,
@@ -2,7 +2,7 @@ import calendar
 from datetime import datetime
 from typing import Dict
 from fastapi import APIRouter, HTTPException
-from app.services.background_services.get_daily_attendance_service import get_attendance_summary
+from app.services.background_services.get_daily_attendance_service import fetch_existing_attendance, average_by_bucket
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,45 +20,24 @@ async def get_monthly_summary(
 ) -> Dict:
     """
     Generate a monthly attendance summary (per month exist_avg).
+    Months without recorded attendance are reported as 0.0; no predictions are made.
     """
     try:
         today = datetime.strptime(today_date, "%Y-%m-%d")
         year = today.year
 
-        monthly_summary = {}
+        # One query for January 1st up to today, bucketed by month in memory
+        exist_data = await fetch_existing_attendance(
+            class_id, subject_id, datetime(year, 1, 1).strftime("%Y-%m-%d"), today_date
+        )
+        month_avgs = average_by_bucket(exist_data, lambda date: date[:7])
 
-        # Loop through months from January to current month
+        monthly_summary = {}
         for month in range(1, today.month + 1):
-            # Compute first and last day of the month
-            start_date = datetime(year, month, 1).strftime("%Y-%m-%d")
-            last_day = calendar.monthrange(year, month)[1]
-            end_date = datetime(year, month, last_day).strftime("%Y-%m-%d")
-
-            try:
-                summary = await get_attendance_summary(
-                    class_id=class_id,
-                    subject_id=subject_id,
-                    start_date=start_date,
-                    end_date=end_date,
-                    today_date=today_date
-                )
-
-                logger.info(f"Monthly summary for {calendar.month_name[month]}: {summary}")
-
-                # Use .get() with fallback
-                exist_avg = summary.get("exist_avg") or summary.get("data", {}).get("exist_avg")
-
-                if exist_avg is None:
-                    logger.warning(f"Missing 'exist_avg' for {calendar.month_name[month]}. Defaulting to 0.0")
-                    exist_avg = 0.0
-
-                month_name = calendar.month_name[month].lower()
-                monthly_summary[month_name] = exist_avg
+            month_name = calendar.month_name[month].lower()
+            monthly_summary[month_name] = month_avgs.get(f"{year}-{month:02d}", 0.0)
 
-            except Exception as e:
-                logger.error(f"Error processing month {calendar.month_name[month]}: {e}")
-                month_name = calendar.month_name[month].lower()
-                monthly_summary[month_name] = 0.0  # Default to 0.0 if error
+        logger.info(f"Monthly summary for {class_id}/{subject_id}: {monthly_summary}")
 
         return {
             "class_id": class_id,
@@ -2,7 +2,7 @@ import calendar
 from datetime import datetime, timedelta
 from typing import Dict
 from fastapi import APIRouter, HTTPException
-from app.services.background_services.get_daily_attendance_service import get_attendance_summary
+from app.services.background_services.get_daily_attendance_service import fetch_existing_attendance, average_by_bucket
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,6 +21,7 @@ async def get_weekly_summary(
 ) -> Dict:
     """
     Generate a weekly attendance summary for the given month (week1, week2, ...) using exist_avg.
+    Weeks without recorded attendance are reported as 0.0; no predictions are made.
     """
     try:
         today = datetime.strptime(today_date, "%Y-%m-%d")
@@ -43,46 +44,26 @@ async def get_weekly_summary(
         last_day_num = calendar.monthrange(year, month_num)[1]
         last_day = datetime(year, month_num, last_day_num)
 
-        # Calculate all Mondays in the selected month
-        current_day = first_day
-        weekly_summary = {}
-        week_counter = 1
+        # Weeks run Monday to Sunday, clipped to the month: week1 is the one holding the 1st
+        first_monday = first_day - timedelta(days=first_day.weekday())
+        week_count = (last_day - first_monday).days // 7 + 1
 
-        while current_day <= last_day:
-            # Find the Monday of the current week
-            monday = current_day - timedelta(days=current_day.weekday())
-            # Find the Sunday of the current week
-            sunday = monday + timedelta(days=6)
+        def week_of(date: str) -> str:
+            day = datetime.strptime(date, "%Y-%m-%d")
+            return f"week{(day - first_monday).days // 7 + 1}"
 
-            # Clip the range to stay within the month
-            start_date = max(monday, first_day)
-            end_date = min(sunday, last_day)
+        # One query for the whole month (up to today), bucketed by week in memory
+        exist_data = await fetch_existing_attendance(
+            class_id, subject_id, first_day.strftime("%Y-%m-%d"), min(last_day, today).strftime("%Y-%m-%d")
+        )
+        week_avgs = average_by_bucket(exist_data, week_of)
 
-            # Format as strings
-            start_date_str = start_date.strftime("%Y-%m-%d")
-            end_date_str = end_date.strftime("%Y-%m-%d")
-
-            summary = await get_attendance_summary(
-                class_id=class_id,
-                subject_id=subject_id,
-                start_date=start_date_str,
-                end_date=end_date_str,
-                today_date=today_date
-            )
-
-            logger.info(f"Weekly summary for {month} week{week_counter}: {summary}")
-
-            exist_avg = summary.get("exist_avg") or summary.get("data", {}).get("exist_avg")
-
-            if exist_avg is None:
-                logger.warning(f"Missing 'exist_avg' for week {week_counter}. Defaulting to 0.0")
-                exist_avg = 0.0
-
-            weekly_summary[f"week{week_counter}"] = exist_avg
+        weekly_summary = {
+            f"week{week}": week_avgs.get(f"week{week}", 0.0)
+            for week in range(1, week_count + 1)
+        }
 
-            # Move to next week (Monday)
-            current_day = monday + timedelta(days=7)
-            week_counter += 1
+        logger.info(f"Weekly summary for {month}: {weekly_summary}")
 
         return {
             "class_id": class_id,
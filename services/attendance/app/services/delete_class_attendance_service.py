@@ -1,6 +1,7 @@
 from fastapi import HTTPException
 from bson.objectid import ObjectId
 from app.utils.mongodb_connection import attendance_store
+from app.services.rollup_service import write_with_rollups
 
 # global dict to cache deleted record metadata (for trigger logic)
 attendance_delete_cache = {}
@@ -27,9 +28,15 @@ async def delete_class_attendance_service(attendance_id: str):
         }
 
         # Delete the record
-        delete_result = await attendance_store.delete_one({"_id": attendance_object_id})
-        if delete_result.deleted_count == 0:
-            raise HTTPException(status_code=500, detail="Failed to delete attendance record")
+        async def delete(rollup_version):
+            result = await attendance_store.delete_one(
+                {"_id": attendance_object_id, "rollup_version": existing_record.get("rollup_version")}
+            )
+            if result.deleted_count == 0:
+                raise HTTPException(status_code=500, detail="Failed to delete attendance record")
+            return result
+
+        await write_with_rollups("delete", attendance_object_id, existing_record, None, delete)
 
         return {"status_code": 200, "message": "Attendance record deleted"}
 
@@ -0,0 +1,170 @@
+"""
+Streaming attendance export.
+
+Rows come from attendance_store through a Motor cursor, EXPORT_BATCH_SIZE records at a time,
+and are encoded and sent as each batch arrives, so memory stays flat however long the range.
+There is one row per student and record (attendance_id, class_id, subject_id, date, weekday,
+student_id, status).
+
+  - csv: gzip-compressed as it is written (a .csv.gz download).
+  - parquet: one row group per batch, column chunks gzip-compressed by the Parquet writer.
+    Needs pyarrow.
+"""
+import asyncio
+import csv
+import io
+import os
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, List, Tuple
+
+from fastapi import HTTPException, status
+
+from app.utils.mongodb_connection import attendance_store
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+EXPORT_COLUMNS = ["attendance_id", "class_id", "subject_id", "date", "weekday", "student_id", "status"]
+
+EXPORT_FORMATS = {
+    "csv": ("application/gzip", "csv.gz"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def _rows(records: List[dict]) -> List[list]:
+    return [
+        [str(record["_id"]), record.get("class_id"), record.get("subject_id"), record.get("date"),
+         record.get("weekday"), student_id, value]
+        for record in records
+        for student_id, value in sorted((record.get("status") or {}).items())
+    ]
+
+
+async def _batches(class_id: str, subject_id: str, start_date: str, end_date: str) -> AsyncIterator[List[dict]]:
+    cursor = attendance_store.find(
+        {"class_id": class_id, "subject_id": subject_id, "date": {"$gte": start_date, "$lte": end_date}},
+        {"class_id": 1, "subject_id": 1, "date": 1, "weekday": 1, "status": 1}
+    ).sort("date", 1).batch_size(EXPORT_BATCH_SIZE)
+
+    batch = []
+    async for record in cursor:
+        batch.append(record)
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class _CsvGzipEncoder:
+    def __init__(self):
+        # wbits=31 writes a gzip header and trailer around the deflate stream
+        self.compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        self.header_written = False
+
+    def encode(self, rows: List[list]) -> bytes:
+        text = io.StringIO()
+        writer = csv.writer(text)
+        if not self.header_written:
+            writer.writerow(EXPORT_COLUMNS)
+            self.header_written = True
+        writer.writerows(rows)
+        return self.compressor.compress(text.getvalue().encode())
+
+    def finish(self) -> bytes:
+        return self.encode([]) + self.compressor.flush()
+
+
+class _StreamSink(io.RawIOBase):
+    """
+    Write-only file the Parquet writer writes to; what it has written so far is taken out
+    with drain(). It reports its own position because the footer records absolute offsets.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.chunks: List[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class _ParquetEncoder:
+    def __init__(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.schema = pa.schema([(column, pa.string()) for column in EXPORT_COLUMNS])
+        self.sink = _StreamSink()
+        self.writer = pq.ParquetWriter(self.sink, self.schema, compression="gzip")
+
+    def encode(self, rows: List[list]) -> bytes:
+        columns = list(zip(*rows)) if rows else [[] for _ in EXPORT_COLUMNS]
+        table = self.pa.Table.from_arrays([self.pa.array(column, self.pa.string()) for column in columns], schema=self.schema)
+        self.writer.write_table(table)
+        return self.sink.drain()
+
+    def finish(self) -> bytes:
+        self.writer.close()
+        return self.sink.drain()
+
+
+def _validate(start_date: str, end_date: str, export_format: str):
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid format. Use one of: {', '.join(EXPORT_FORMATS)}"
+        )
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d")
+        end = datetime.strptime(end_date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid date format. Use YYYY-MM-DD")
+    if start > end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start_date must not be after end_date")
+
+
+def export_attendance_service(class_id: str, subject_id: str, start_date: str, end_date: str, export_format: str) -> Tuple[AsyncIterator[bytes], str, str]:
+    """
+    Validates the request and returns (body chunks, media type, file name) for a streaming
+    response; records are only read as the body is consumed.
+    """
+    _validate(start_date, end_date, export_format)
+    if export_format == "parquet":
+        try:
+            encoder = _ParquetEncoder()
+        except ImportError:
+            raise HTTPException(
+                status_code=status.HTTP_501_NOT_IMPLEMENTED,
+                detail="Parquet export needs pyarrow to be installed"
+            )
+    else:
+        encoder = _CsvGzipEncoder()
+
+    async def body() -> AsyncIterator[bytes]:
+        async for batch in _batches(class_id, subject_id, start_date, end_date):
+            # Encoding and compression run off the event loop
+            chunk = await asyncio.to_thread(encoder.encode, _rows(batch))
+            if chunk:
+                yield chunk
+        yield await asyncio.to_thread(encoder.finish)
+
+    media_type, extension = EXPORT_FORMATS[export_format]
+    file_name = f"attendance_{class_id}_{subject_id}_{start_date}_{end_date}.{extension}"
+    return body(), media_type, file_name
@@ -240,77 +240,145 @@
 
 
 from fastapi import HTTPException, status
-from app.utils.mongodb_connection import class_attendance_summery, attendance_store
-from datetime import datetime
+from app.utils.mongodb_connection import class_attendance_summery, attendance_store, student_attendance
+from app.services.rollup_service import get_rollup
+from app.services.student_attendance_service import student_attendance_ready
+from datetime import datetime, timedelta
 
-async def calculate_attendance_ratio(subject_id: str, summary_type: str, class_id: str = None, student_id: str = None):
+
+def period_bounds(summary_type: str, now: datetime = None):
     """
-    Calculates attendance ratio for the given subject and summary_type.
-    Handles both class-level and student-level queries.
+    Returns (period, start, end) for the current day, month or year, where start/end are
+    "YYYY-MM-DD" bounds (end exclusive) usable in a range query on the stored date strings.
     """
-    today = datetime.now().strftime("%Y-%m-%d")
-    current_month = datetime.now().strftime("%Y-%m")
-    current_year = datetime.now().strftime("%Y")
+    now = now or datetime.now()
 
-    query = {"subject_id": subject_id}
+    if summary_type == "daily":
+        period = now.strftime("%Y-%m-%d")
+        return period, period, (now + timedelta(days=1)).strftime("%Y-%m-%d")
+    if summary_type == "monthly":
+        next_month = datetime(now.year + 1, 1, 1) if now.month == 12 else datetime(now.year, now.month + 1, 1)
+        return now.strftime("%Y-%m"), now.strftime("%Y-%m-01"), next_month.strftime("%Y-%m-%d")
+    if summary_type == "yearly":
+        return now.strftime("%Y"), f"{now.year}-01-01", f"{now.year + 1}-01-01"
 
-    if student_id is None and class_id is None:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="class_id is required for class-level calculations."
-        )
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Invalid summary_type. Choose from: daily, monthly, yearly."
+    )
 
-    if student_id is None and class_id:
-        query["class_id"] = class_id
 
-    records_cursor = attendance_store.find(query)
-    records = await records_cursor.to_list(length=None)
+def _status_is(value: str) -> dict:
+    # Same normalisation as before: status values are compared trimmed and lower-cased
+    return {"$eq": [{"$toLower": {"$trim": {"input": "$$entry.v"}}}, value]}
+
 
-    if not records:
+def class_ratio_pipeline(match: dict) -> list:
+    """
+    Average share of present students per record, computed inside Mongo.
+    """
+    return [
+        {"$match": match},
+        {"$project": {"entries": {"$objectToArray": {"$ifNull": ["$status", {}]}}}},
+        {"$project": {
+            "total": {"$size": "$entries"},
+            "present": {"$size": {"$filter": {"input": "$entries", "as": "entry", "cond": _status_is("present")}}},
+        }},
+        {"$match": {"total": {"$gt": 0}}},
+        {"$group": {
+            "_id": None,
+            "ratio_sum": {"$sum": {"$divide": ["$present", "$total"]}},
+            "count": {"$sum": 1},
+        }},
+    ]
+
+
+def student_ratio_pipeline(match: dict, student_id: str, projected: bool = False) -> list:
+    """
+    Present and marked (present or absent) day counts for one student, computed inside Mongo.
+    With projected=True the pipeline runs on the per-student projection, where the student
+    is part of the indexed match instead of a `status.<student_id>` filter.
+    """
+    if projected:
+        match = {**match, "student_id": student_id}
+        student_status = {"$toLower": {"$trim": {"input": "$status"}}}
+    else:
+        match = {**match, f"status.{student_id}": {"$exists": True}}
+        student_status = {"$toLower": {"$trim": {"input": f"$status.{student_id}"}}}
+    return [
+        {"$match": match},
+        {"$project": {"_id": 0, "student_status": student_status}},
+        {"$group": {
+            "_id": None,
+            "present": {"$sum": {"$cond": [{"$eq": ["$student_status", "present"]}, 1, 0]}},
+            "total": {"$sum": {"$cond": [{"$in": ["$student_status", ["present", "absent"]]}, 1, 0]}},
+        }},
+    ]
+
+
+async def _raise_not_found(query: dict, period: str):
+    # Only reached when the period has nothing to count; tell the caller which part is missing
+    if await attendance_store.find_one(query, {"_id": 1}) is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"No attendance records found for subject '{subject_id}'."
+            detail=f"No attendance records found for subject '{query['subject_id']}'."
         )
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"No attendance data found for the given period '{period}'."
+    )
 
-    if summary_type == "daily":
-        filtered_records = [r for r in records if r.get("date") == today]
-        period = today
-    elif summary_type == "monthly":
-        filtered_records = [r for r in records if r.get("date", "").startswith(current_month)]
-        period = current_month
-    elif summary_type == "yearly":
-        filtered_records = [r for r in records if r.get("date", "").startswith(current_year)]
-        period = current_year
-    else:
+
+async def calculate_attendance_ratio(subject_id: str, summary_type: str, class_id: str = None, student_id: str = None):
+    """
+    Calculates attendance ratio for the given subject and summary_type.
+    Handles both class-level and student-level queries.
+
+    Served from the write-time rollups (app/services/rollup_service.py) when they have been
+    built. Otherwise only the records of the requested day, month or year are read: the date
+    range and the counting are pushed into a single aggregation, backed by the
+    (class_id, subject_id, date) index for classes and by the per-student projection
+    (app/services/student_attendance_service.py) for students.
+    """
+    if student_id is None and class_id is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid summary_type. Choose from: daily, monthly, yearly."
+            detail="class_id is required for class-level calculations."
         )
 
-    if not filtered_records:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"No attendance data found for the given period '{period}'."
-        )
+    period, start, end = period_bounds(summary_type)
+
+    query = {"subject_id": subject_id}
+    if student_id is None and class_id:
+        query["class_id"] = class_id
+    match = {**query, "date": {"$gte": start, "$lt": end}}
 
     if student_id:
-        # Corrected student-level attendance ratio logic
-        total_days = len(filtered_records)
-        present_days = 0
-        t_days = 0
-
-        for record in filtered_records:
-            status_dict = record.get("status", {})
-            student_status = status_dict.get(student_id, "").strip().lower()
-            if student_status == "present":
-                present_days += 1
-                t_days += 1
-            elif student_status == "absent":
-                t_days += 1
-            # If missing or not 'present', considered absent
+        rollup = await get_rollup("student", student_id, subject_id, summary_type, period)
+        if rollup and rollup.get("total", 0) > 0:
+            return {
+                "subject_id": subject_id,
+                "summary_type": summary_type,
+                "student_id": student_id,
+                "attendance_ratio": round((rollup["present"] / rollup["total"]) * 100, 2)
+            }
+
+        if await student_attendance_ready():
+            pipeline = student_ratio_pipeline(match, student_id, projected=True)
+            rows = await student_attendance.aggregate(pipeline).to_list(length=1)
+        else:
+            rows = await attendance_store.aggregate(student_ratio_pipeline(match, student_id)).to_list(length=1)
+        if not rows or rows[0]["total"] == 0:
+            if await attendance_store.find_one(match, {"_id": 1}) is None:
+                await _raise_not_found(query, period)
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"No valid attendance data found for the given period '{period}'."
+            )
 
+        present_days = rows[0]["present"]
+        t_days = rows[0]["total"]
         ratio = round((present_days / t_days) * 100, 2)
-        print(f"present_days: {present_days}, total_days: {t_days}, ratio: {ratio}")
 
         result = {
             "subject_id": subject_id,
@@ -320,29 +388,25 @@ async def calculate_attendance_ratio(subject_id: str, summary_type: str, class_i
         }
 
     else:
-        # Class-level logic remains the same
-        total_percentage = 0
-        count = 0
-
-        for record in filtered_records:
-            status_dict = record.get("status", {})
-            total_students = len(status_dict)
-            if total_students == 0:
-                continue
-
-            present_count = sum(1 for status in status_dict.values() if status.strip().lower() == "present")
-            attendance_percentage = (present_count / total_students)
-            # attendance_percentage = (present_count / total_students) * 100
-            total_percentage += attendance_percentage
-            count += 1
-
-        if count == 0:
+        rollup = await get_rollup("class", class_id, subject_id, summary_type, period)
+        if rollup and rollup.get("records", 0) > 0:
+            return {
+                "subject_id": subject_id,
+                "summary_type": summary_type,
+                "class_id": class_id,
+                "attendance_ratio": round(rollup["ratio_sum"] / rollup["records"], 2)
+            }
+
+        rows = await attendance_store.aggregate(class_ratio_pipeline(match)).to_list(length=1)
+        if not rows or rows[0]["count"] == 0:
+            if await attendance_store.find_one(match, {"_id": 1}) is None:
+                await _raise_not_found(query, period)
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"No valid attendance data found for the given period '{period}'."
             )
 
-        ratio = round(total_percentage / count, 2)
+        ratio = round(rows[0]["ratio_sum"] / rows[0]["count"], 2)
 
         result = {
             "subject_id": subject_id,
@@ -218,6 +218,7 @@
 
 from fastapi import HTTPException, status
 from app.utils.mongodb_connection import attendance_store
+from app.services.student_attendance_service import find_student_records
 from datetime import datetime
 from collections import defaultdict
 
@@ -228,15 +229,19 @@ async def calculate_attendance_summary(
     class_id: str = None,
     student_id: str = None
 ):
-    # Filter query
-    query = {"subject_id": subject_id}
-    if class_id:
-        query["class_id"] = class_id
-    if student_id:
-        query[f"status.{student_id}"] = {"$exists": True}
-
-    records_cursor = attendance_store.find(query)
-    records = await records_cursor.to_list(length=None)
+    # Student records come from the indexed per-student projection once it is built
+    records = await find_student_records(student_id, subject_id) if student_id else None
+
+    if records is None:
+        # Filter query
+        query = {"subject_id": subject_id}
+        if class_id:
+            query["class_id"] = class_id
+        if student_id:
+            query[f"status.{student_id}"] = {"$exists": True}
+
+        records_cursor = attendance_store.find(query)
+        records = await records_cursor.to_list(length=None)
 
     if not records:
         raise HTTPException(
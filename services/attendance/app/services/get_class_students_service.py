@@ -1,25 +1,33 @@
 from datetime import datetime
+from typing import Dict, List
 from fastapi import HTTPException
 from motor.motor_asyncio import AsyncIOMotorCollection
 from app.utils.mongodb_connection import attendance_store, student, student_attendance_summery
 
 
-async def get_att_ratio(student_id: str, class_id: str, year: int, subject_id: str) -> float:
-    try:
-        summary = await student_attendance_summery.find_one({
-            "student_id": student_id,
-            "class_id": class_id,
-            "year": year
-        })
+def _subject_ratio(summary: dict, subject_id: str) -> float:
+    for record in summary.get("attendance", []):
+        if record.get("subject_id") == subject_id:
+            return record.get("current_year", {}).get("yearly_attendance_ratio", 0.0)
+    return 0.0
 
-        if not summary:
-            return 0.0
 
-        for record in summary.get("attendance", []):
-            if record.get("subject_id") == subject_id:
-                return record.get("current_year", {}).get("yearly_attendance_ratio", 0.0)
+async def get_att_ratios(student_ids: List[str], class_id: str, year: int, subject_id: str) -> Dict[str, float]:
+    """
+    Yearly attendance ratio of each student for subject_id, fetched with one query.
+    Students without a summary get 0.0.
+    """
+    try:
+        cursor = student_attendance_summery.find(
+            {"student_id": {"$in": student_ids}, "class_id": class_id, "year": year},
+            {"student_id": 1, "attendance": 1}
+        )
+        ratios = {}
+        async for summary in cursor:
+            # The first summary per student wins, as find_one would pick
+            ratios.setdefault(summary["student_id"], _subject_ratio(summary, subject_id))
 
-        return 0.0
+        return {student_id: ratios.get(student_id, 0.0) for student_id in student_ids}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching attendance ratio: {str(e)}")
@@ -27,16 +35,14 @@ async def get_att_ratio(student_id: str, class_id: str, year: int, subject_id: s
 
 async def get_class_students_service(class_id: str, subject_type: str, subject_id: str, date: str):
     try:
-        attendance_exists = await attendance_store.find_one(
+        # One query serves as both the existence check and the fetch
+        cursor = attendance_store.find(
             {"class_id": class_id, "date": date, "subject_id": subject_id}
         )
+        attendance_data = await cursor.to_list(length=None)
+        attendance_exists = bool(attendance_data)
 
         if attendance_exists:
-            cursor = attendance_store.find(
-                {"class_id": class_id, "date": date, "subject_id": subject_id}
-            )
-            attendance_data = await cursor.to_list(length=None)
-
             student_ids = set()
             for record in attendance_data:
                 student_ids.update(record.get("status", {}).keys())
@@ -74,12 +80,13 @@ async def get_class_students_service(class_id: str, subject_type: str, subject_i
 
         # Add attendance ratio and convert _id to str
         year = datetime.strptime(date, "%Y-%m-%d").year
+        student_ids = list({doc["student_id"] for doc in data if doc.get("student_id")})
+        att_ratios = await get_att_ratios(student_ids, class_id, year, subject_id) if student_ids else {}
         for doc in data:
             doc["_id"] = str(doc["_id"]) if "_id" in doc else None
             student_id = doc.get("student_id")
             if student_id:
-                att_ratio = await get_att_ratio(student_id, class_id, year, subject_id)
-                doc["att_ratio"] = round(att_ratio, 2)
+                doc["att_ratio"] = round(att_ratios[student_id], 2)
 
         return {
             "_id": str(attendance_data[0]["_id"]) if attendance_exists else None,
@@ -0,0 +1,416 @@
+"""
+Bulk import of historical attendance.
+
+Reads a CSV (optionally gzipped) or Parquet file with one row per student and date, in the
+layout of the attendance export: class_id, subject_id, date (YYYY-MM-DD), student_id and
+status (present/absent); other columns are ignored. Rows of one class, subject and date must be
+contiguous, as they are in an export. A record whose rows turn up again after it was written
+would replace the students written before, so it is not written again: it is counted in
+split_records and logged instead.
+
+The file is read IMPORT_CHUNK_SIZE rows at a time. Each chunk is turned into attendance_store
+records with vectorized pandas operations (weekday and attendance_percentage included) and
+written with unordered bulk upserts on the unique (class_id, subject_id, date) key, so an
+imported record replaces an existing one and importing a chunk twice is harmless. Records are
+stamped with the import, the attempt and the first row of their chunk, which is how a record
+split across chunks is told apart from one rewritten when an interrupted import resumes.
+
+Progress is checkpointed in attendance_imports after every chunk. Importing the same file again
+(same content, hence same import id) resumes after the last checkpoint; a finished import is
+not repeated. Imported records bypass the rollup outbox: once every chunk is written the
+rollups and the per-student projection are rebuilt in one pass each. Like the projection
+rebuild, run imports when marking traffic is quiet.
+
+    python -m app.services.import_attendance_service <file> [--format csv|parquet] [--restart]
+
+or POST the file to /attendance/import and poll /attendance/import/{import_id}.
+"""
+import argparse
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException, UploadFile, status
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.utils.mongodb_connection import attendance_store, attendance_imports
+from app.services.rollup_service import rebuild_rollups
+from app.services.student_attendance_service import rebuild_student_attendance
+
+logger = logging.getLogger(__name__)
+
+# Source rows read and converted at a time
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "50000"))
+# Records per bulk write, and bulk writes in flight at once
+IMPORT_WRITE_BATCH_SIZE = int(os.getenv("IMPORT_WRITE_BATCH_SIZE", "1000"))
+IMPORT_WRITE_CONCURRENCY = int(os.getenv("IMPORT_WRITE_CONCURRENCY", "4"))
+# Where files uploaded through the API are kept while they are imported
+IMPORT_UPLOAD_DIR = os.getenv("IMPORT_UPLOAD_DIR") or tempfile.gettempdir()
+
+IMPORT_COLUMNS = ["class_id", "subject_id", "date", "student_id", "status"]
+RECORD_KEY = ["class_id", "subject_id", "date"]
+IMPORT_FORMATS = ("csv", "parquet")
+DUPLICATE_KEY_ERROR = 11000
+
+
+def file_import_id(path: str) -> str:
+    """
+    Content hash of the file, so importing the same data again finds its checkpoint.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()[:24]
+
+
+def import_format(path: str, requested: Optional[str] = None) -> str:
+    if requested:
+        if requested not in IMPORT_FORMATS:
+            raise ValueError(f"Invalid format. Use one of: {', '.join(IMPORT_FORMATS)}")
+        return requested
+    return "parquet" if path.lower().endswith((".parquet", ".pq")) else "csv"
+
+
+def read_chunks(path: str, file_format: str, skip_rows: int = 0) -> Iterator[pd.DataFrame]:
+    """
+    The file's rows in chunks of IMPORT_CHUNK_SIZE, after skipping the first skip_rows.
+    """
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path)
+        columns = [column for column in IMPORT_COLUMNS if column in parquet_file.schema_arrow.names]
+        for batch in parquet_file.iter_batches(batch_size=IMPORT_CHUNK_SIZE, columns=columns):
+            if skip_rows >= batch.num_rows:
+                skip_rows -= batch.num_rows
+                continue
+            yield batch.slice(skip_rows).to_pandas()
+            skip_rows = 0
+    else:
+        yield from pd.read_csv(
+            path,
+            usecols=lambda column: column in IMPORT_COLUMNS,
+            dtype=str,
+            skiprows=range(1, skip_rows + 1),
+            chunksize=IMPORT_CHUNK_SIZE,
+        )
+
+
+def _check_columns(chunk: pd.DataFrame):
+    missing = [column for column in IMPORT_COLUMNS if column not in chunk.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+
+def split_last_record(chunk: pd.DataFrame):
+    """
+    Splits a chunk of source rows into the rows of its complete records and the rows of its
+    last record, which may continue in the next chunk and is held back.
+    """
+    _check_columns(chunk)
+    if chunk.empty:
+        return chunk, chunk
+    keys = pd.DataFrame({column: chunk[column].astype("string").str.strip() for column in RECORD_KEY})
+    tail = keys.eq(keys.iloc[-1]).all(axis=1).to_numpy(dtype=bool)
+    # Rows after the last one that belongs to another record
+    start = 0 if tail.all() else len(tail) - int(np.argmin(tail[::-1]))
+    return chunk.iloc[:start], chunk.iloc[start:]
+
+
+def normalise_rows(chunk: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cleans a chunk of source rows and drops the invalid ones (missing ids, a date that is not
+    YYYY-MM-DD, a status other than present/absent).
+    """
+    _check_columns(chunk)
+    rows = pd.DataFrame({column: chunk[column].astype("string").str.strip() for column in IMPORT_COLUMNS})
+    rows["status"] = rows["status"].str.lower()
+    dates = pd.to_datetime(rows["date"], format="%Y-%m-%d", errors="coerce")
+
+    valid = dates.notna().to_numpy() & rows["status"].isin(["present", "absent"]).fillna(False).to_numpy(dtype=bool)
+    for column in ("class_id", "subject_id", "student_id"):
+        valid &= (rows[column].fillna("") != "").to_numpy(dtype=bool)
+
+    rows = rows[valid].copy()
+    rows["date"] = dates[valid].dt.strftime("%Y-%m-%d")
+    # A student listed twice for the same record keeps the last status, as a status map would
+    return rows.drop_duplicates(subset=RECORD_KEY + ["student_id"], keep="last")
+
+
+def build_records(rows: pd.DataFrame) -> List[dict]:
+    """
+    attendance_store records (without _id) from normalised rows, one per class, subject and
+    date, matching build_attendance_record in mark_class_attendance_service.
+    """
+    if rows.empty:
+        return []
+    rows = rows.assign(
+        group=rows.groupby(RECORD_KEY, sort=False).ngroup(),
+        present=(rows["status"] == "present").astype(np.int64),
+    ).sort_values("group", kind="stable")
+
+    groups = rows.groupby("group", sort=True)
+    first = groups[RECORD_KEY].first()
+    present = groups["present"].sum().to_numpy()
+    total = groups.size().to_numpy()
+    percentages = np.round(present / total * 100, 2)
+    weekdays = pd.to_datetime(first["date"], format="%Y-%m-%d").dt.day_name().to_numpy()
+
+    # Boundaries of each group's rows, to build the status maps without a per-row loop
+    bounds = np.concatenate([[0], np.cumsum(total)])
+    students = rows["student_id"].to_numpy()
+    statuses = rows["status"].to_numpy()
+
+    return [
+        {
+            "class_id": class_id,
+            "subject_id": subject_id,
+            "date": date,
+            "weekday": weekdays[i],
+            "status": dict(zip(students[bounds[i]:bounds[i + 1]], statuses[bounds[i]:bounds[i + 1]])),
+            "attendance_percentage": float(percentages[i]),
+        }
+        for i, (class_id, subject_id, date) in enumerate(first.itertuples(index=False, name=None))
+    ]
+
+
+async def write_records(records: List[dict], import_id: str, attempt: str, first_row: int,
+                        resumed_from: int) -> dict:
+    """
+    Upserts records on (class_id, subject_id, date) with unordered bulk writes. first_row is
+    where the records' chunk starts and resumed_from where this attempt started reading.
+
+    A record this import already wrote is only replaced when an earlier attempt wrote it from
+    a chunk that was not checkpointed; otherwise the upsert misses, the unique key rejects the
+    insert and the record is counted in split_records.
+    """
+    slots = asyncio.Semaphore(IMPORT_WRITE_CONCURRENCY)
+    counts = {"inserted": 0, "updated": 0, "write_errors": 0, "split_records": 0}
+
+    async def write_batch(batch: List[dict]):
+        operations = [
+            UpdateOne(
+                {
+                    "class_id": record["class_id"],
+                    "subject_id": record["subject_id"],
+                    "date": record["date"],
+                    "$or": [
+                        {"import_id": {"$ne": import_id}},
+                        {"import_attempt": {"$ne": attempt}, "import_row": {"$gte": resumed_from}},
+                    ],
+                },
+                {"$set": {
+                    "weekday": record["weekday"],
+                    "status": record["status"],
+                    "attendance_percentage": record["attendance_percentage"],
+                    "import_id": import_id,
+                    "import_attempt": attempt,
+                    "import_row": first_row,
+                }},
+                upsert=True
+            )
+            for record in batch
+        ]
+        async with slots:
+            try:
+                result = await attendance_store.bulk_write(operations, ordered=False)
+                details = result.bulk_api_result
+            except BulkWriteError as e:
+                details = e.details
+                errors = details.get("writeErrors", [])
+                split = [error for error in errors if error.get("code") == DUPLICATE_KEY_ERROR]
+                counts["split_records"] += len(split)
+                counts["write_errors"] += len(errors) - len(split)
+                for error in split[:5]:
+                    key = batch[error["index"]]
+                    logger.error(
+                        f"Import {import_id}: rows of {key['class_id']} {key['subject_id']} {key['date']} "
+                        f"are not contiguous; the later rows were not written"
+                    )
+                for error in [error for error in errors if error.get("code") != DUPLICATE_KEY_ERROR][:5]:
+                    logger.warning(f"Import write failed: {error.get('errmsg')}")
+        counts["inserted"] += details.get("nUpserted", 0)
+        counts["updated"] += details.get("nModified", 0)
+
+    await asyncio.gather(*[
+        write_batch(records[start:start + IMPORT_WRITE_BATCH_SIZE])
+        for start in range(0, len(records), IMPORT_WRITE_BATCH_SIZE)
+    ])
+    return counts
+
+
+async def import_attendance(path: str, file_format: Optional[str] = None, import_id: Optional[str] = None,
+                            restart: bool = False) -> dict:
+    """
+    Imports the file at path, resuming from its checkpoint, and rebuilds the rollups and the
+    per-student projection at the end. Returns the checkpoint with this run's throughput.
+    """
+    file_format = import_format(path, file_format)
+    import_id = import_id or await asyncio.to_thread(file_import_id, path)
+
+    checkpoint = None if restart else await attendance_imports.find_one({"_id": import_id})
+    if checkpoint and checkpoint.get("state") == "completed":
+        return {**checkpoint, "resumed": True, "rows_this_run": 0}
+    if checkpoint is None:
+        checkpoint = {
+            "_id": import_id,
+            "source": os.path.basename(path),
+            "format": file_format,
+            "state": "importing",
+            "rows_done": 0,
+            "skipped_rows": 0,
+            "records_inserted": 0,
+            "records_updated": 0,
+            "write_errors": 0,
+            "split_records": 0,
+            "started_at": datetime.utcnow(),
+        }
+        await attendance_imports.replace_one({"_id": import_id}, checkpoint, upsert=True)
+    resumed = checkpoint["rows_done"] > 0 or checkpoint["state"] != "importing"
+
+    started = time.monotonic()
+    rows_this_run = 0
+    attempt = str(ObjectId())
+    resumed_from = checkpoint["rows_done"]
+
+    async def save(**changes):
+        checkpoint.update(changes, updated_at=datetime.utcnow())
+        await attendance_imports.update_one({"_id": import_id}, {"$set": {**changes, "updated_at": checkpoint["updated_at"]}})
+
+    try:
+        if checkpoint["state"] == "importing":
+            chunks = read_chunks(path, file_format, skip_rows=checkpoint["rows_done"])
+            held_back = None
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    if held_back is None:
+                        break
+                    ready, held_back = held_back, None
+                else:
+                    if held_back is not None:
+                        chunk = pd.concat([held_back, chunk], ignore_index=True)
+                    ready, held_back = split_last_record(chunk)
+                if ready.empty:
+                    continue
+
+                rows = await asyncio.to_thread(normalise_rows, ready)
+                records = await asyncio.to_thread(build_records, rows)
+                counts = await write_records(records, import_id, attempt, checkpoint["rows_done"], resumed_from)
+
+                # Held-back rows are not counted as done, so a resumed import reads them again
+                rows_this_run += len(ready)
+                await save(
+                    rows_done=checkpoint["rows_done"] + len(ready),
+                    skipped_rows=checkpoint["skipped_rows"] + len(ready) - len(rows),
+                    records_inserted=checkpoint["records_inserted"] + counts["inserted"],
+                    records_updated=checkpoint["records_updated"] + counts["updated"],
+                    write_errors=checkpoint["write_errors"] + counts["write_errors"],
+                    split_records=checkpoint.get("split_records", 0) + counts["split_records"],
+                    rows_per_second=round(rows_this_run / max(time.monotonic() - started, 1e-9), 1),
+                )
+                logger.info(f"Import {import_id}: {checkpoint['rows_done']} rows done, {checkpoint['rows_per_second']:.0f} rows/s")
+            await save(state="rebuilding")
+
+        import_seconds = time.monotonic() - started
+        rollups = await rebuild_rollups()
+        projection = await rebuild_student_attendance()
+        await save(state="completed", completed_at=datetime.utcnow(), error=None)
+        if checkpoint.get("split_records"):
+            logger.error(f"Import {import_id}: {checkpoint['split_records']} records had rows after they were written; sort the file by class_id, subject_id and date")
+    except Exception as e:
+        await save(error=str(e))
+        raise
+
+    elapsed = time.monotonic() - started
+    return {
+        **checkpoint,
+        "resumed": resumed,
+        "rows_this_run": rows_this_run,
+        "import_seconds": round(import_seconds, 3),
+        "rows_per_second": round(rows_this_run / import_seconds, 1) if import_seconds else None,
+        "total_seconds": round(elapsed, 3),
+        "rollups": rollups.get("rollups"),
+        "projection_rows": projection.get("rows"),
+    }
+
+
+# Imports started through the API in this process, by import id
+_running: Dict[str, asyncio.Task] = {}
+
+
+def _save_upload(source: BinaryIO, suffix: str) -> Tuple[str, str]:
+    # Copies the upload to a file the import can outlive the request with, hashing it on the way
+    digest = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(dir=IMPORT_UPLOAD_DIR, suffix=suffix, delete=False) as target:
+        for block in iter(lambda: source.read(1024 * 1024), b""):
+            digest.update(block)
+            target.write(block)
+    return target.name, digest.hexdigest()[:24]
+
+
+async def start_import_service(file: UploadFile, file_format: Optional[str], restart: bool) -> dict:
+    """
+    Stores the uploaded file and imports it in the background; progress is read back with
+    get_import_status_service.
+    """
+    name = file.filename or "import.csv"
+    try:
+        file_format = import_format(name, file_format)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    await file.seek(0)
+    suffix = "".join(Path(name).suffixes[-2:]) or f".{file_format}"
+    path, import_id = await asyncio.to_thread(_save_upload, file.file, suffix)
+    if import_id in _running and not _running[import_id].done():
+        os.remove(path)
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="This file is already being imported")
+
+    async def run():
+        try:
+            result = await import_attendance(path, file_format, import_id, restart)
+            logger.info(f"Import {import_id} finished: {result.get('rows_this_run')} rows at {result.get('rows_per_second')} rows/s")
+        except Exception as e:
+            logger.error(f"Import {import_id} failed: {e}")
+        finally:
+            os.remove(path)
+            _running.pop(import_id, None)
+
+    _running[import_id] = asyncio.create_task(run())
+    return {"import_id": import_id, "message": "Import started"}
+
+
+async def get_import_status_service(import_id: str) -> dict:
+    checkpoint = await attendance_imports.find_one({"_id": import_id})
+    if not checkpoint:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Import not found")
+    return {**checkpoint, "import_id": checkpoint.pop("_id"), "running": import_id in _running}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import historical attendance from CSV or Parquet")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="defaults to the file extension")
+    parser.add_argument("--import-id", help="defaults to a hash of the file content")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    result = asyncio.run(import_attendance(args.path, args.format, args.import_id, args.restart))
+    print(result)
+
+
+if __name__ == "__main__":
+    main()
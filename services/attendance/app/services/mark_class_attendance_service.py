@@ -1,27 +1,49 @@
 from datetime import datetime
+from bson.objectid import ObjectId
+from fastapi import HTTPException
+from pymongo.errors import DuplicateKeyError
 from app.utils.mongodb_connection import attendance_store
+from app.services.rollup_service import write_with_rollups
 
-async def mark_class_attendance_service(class_id: str, subject_id: str, date: str, status: dict):
-    try:
-        date_obj = datetime.strptime(date, "%Y-%m-%d")
-        weekday = date_obj.strftime("%A")
+def build_attendance_record(class_id: str, subject_id: str, date: str, status: dict) -> dict:
+    """
+    The attendance_store document for one class, subject and date (without _id).
+    Raises ValueError for a date that is not YYYY-MM-DD.
+    """
+    date_obj = datetime.strptime(date, "%Y-%m-%d")
+    weekday = date_obj.strftime("%A")
 
-        total_students = len(status)
-        present_students = sum(1 for s in status.values() if s.lower() == "present")
+    total_students = len(status)
+    present_students = sum(1 for s in status.values() if s.lower() == "present")
 
-        # Calculate to two decimal places
-        attendance_percentage = round((present_students / total_students) * 100, 2) if total_students > 0 else 0.0
+    # Calculate to two decimal places
+    attendance_percentage = round((present_students / total_students) * 100, 2) if total_students > 0 else 0.0
 
-        attendance_data = {
-            "class_id": class_id,
-            "subject_id": subject_id,
-            "date": date,
-            "weekday": weekday,
-            "status": status,
-            "attendance_percentage": attendance_percentage
-        }
+    return {
+        "class_id": class_id,
+        "subject_id": subject_id,
+        "date": date,
+        "weekday": weekday,
+        "status": status,
+        "attendance_percentage": attendance_percentage
+    }
+
+
+async def mark_class_attendance_service(class_id: str, subject_id: str, date: str, status: dict):
+    try:
+        attendance_data = {"_id": ObjectId(), **build_attendance_record(class_id, subject_id, date, status)}
+        attendance_percentage = attendance_data["attendance_percentage"]
+
+        async def insert(rollup_version):
+            await attendance_store.insert_one({**attendance_data, "rollup_version": rollup_version})
 
-        await attendance_store.insert_one(attendance_data)
+        try:
+            await write_with_rollups("mark", attendance_data["_id"], None, attendance_data, insert)
+        except DuplicateKeyError:
+            raise HTTPException(
+                status_code=409,
+                detail="Attendance is already marked for this class, subject and date; update it instead"
+            )
 
         return {
             "message": "Attendance record added successfully",
@@ -29,6 +51,8 @@ async def mark_class_attendance_service(class_id: str, subject_id: str, date: st
             "attendance_percentage": attendance_percentage
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise Exception(f"Failed to mark attendance: {str(e)}")
 
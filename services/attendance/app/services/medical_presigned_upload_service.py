@@ -0,0 +1,188 @@
+"""
+Direct-to-storage medical document uploads.
+
+1. The client asks for an upload URL (create_presigned_upload_service). A session recording
+   who the document belongs to is kept in document_upload_sessions.
+2. The client sends the file to that URL as described by the response (a POST form on S3,
+   whose policy rejects files above DOCUMENT_UPLOAD_MAX_BYTES); the bytes go straight to
+   storage.
+3. The client calls the completion callback (complete_presigned_upload_service), which checks
+   the file is there and records the DocumentUpload in document_store under the session's id,
+   so calling it again returns the same document.
+
+Sessions that are not completed within PRESIGNED_UPLOAD_SESSION_SECONDS expire:
+upload_cleanup_loop deletes whatever was uploaded for them, then the session.
+"""
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import AsyncIterator
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException, status
+from pymongo.errors import DuplicateKeyError
+
+from app.services.background_services.document_storage import DocumentTooLarge, LocalStorage, get_storage
+from app.services.medical_upload_service import ALLOWED_DOCUMENT_TYPES
+from app.utils.mongodb_connection import document_store, document_upload_sessions
+from app.utils.schemas import DocumentUpload
+
+logger = logging.getLogger(__name__)
+
+# How long an upload URL can be used
+PRESIGNED_UPLOAD_EXPIRES_SECONDS = int(os.getenv("PRESIGNED_UPLOAD_EXPIRES_SECONDS", "900"))
+# How long an upload can be completed after its URL was issued
+PRESIGNED_UPLOAD_SESSION_SECONDS = int(os.getenv("PRESIGNED_UPLOAD_SESSION_SECONDS", str(24 * 3600)))
+DOCUMENT_UPLOAD_MAX_BYTES = int(os.getenv("DOCUMENT_UPLOAD_MAX_BYTES", str(20 * 1024 * 1024)))
+# How often expired sessions and their files are cleaned up
+UPLOAD_CLEANUP_INTERVAL = float(os.getenv("UPLOAD_CLEANUP_INTERVAL", "3600"))
+
+
+async def create_presigned_upload_service(request: dict) -> dict:
+    """
+    Issues a short-lived URL the client uploads one medical document to.
+    """
+    file_type = ALLOWED_DOCUMENT_TYPES.get(request["content_type"])
+    if not file_type:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid file type")
+
+    upload_id = ObjectId()
+    key = f"{uuid.uuid4()}_{request['file_name']}"
+    upload = await get_storage().presign_upload(
+        key, request["content_type"], DOCUMENT_UPLOAD_MAX_BYTES, PRESIGNED_UPLOAD_EXPIRES_SECONDS
+    )
+
+    now = datetime.utcnow()
+    await document_upload_sessions.insert_one({
+        "_id": upload_id,
+        "key": key,
+        "student_id": request["student_id"],
+        "class_id": request["class_id"],
+        "subject_id": request["subject_id"],
+        "date": request["date"],
+        "file_name": request["file_name"],
+        "file_type": file_type,
+        "content_type": request["content_type"],
+        "created_at": now,
+    })
+
+    return {
+        "upload_id": str(upload_id),
+        "upload_url": upload["url"],
+        "method": upload["method"],
+        # Signed for this content type, so the upload must send them unchanged
+        "fields": upload["fields"],
+        "headers": upload["headers"],
+        "max_bytes": DOCUMENT_UPLOAD_MAX_BYTES,
+        "expires_at": (now + timedelta(seconds=PRESIGNED_UPLOAD_EXPIRES_SECONDS)).isoformat(),
+    }
+
+
+def _uploaded(document_id: ObjectId, document: dict) -> dict:
+    data = {field: value for field, value in document.items() if field != "_id"}
+    return {"message": "File uploaded successfully", "document_id": str(document_id), "data": data}
+
+
+async def complete_presigned_upload_service(upload_id: str) -> dict:
+    """
+    Records the uploaded document once its file is in storage.
+    """
+    try:
+        document_id = ObjectId(upload_id)
+    except InvalidId:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid upload ID format")
+
+    existing = await document_store.find_one({"_id": document_id})
+    if existing:
+        return _uploaded(document_id, existing)
+
+    session = await document_upload_sessions.find_one({"_id": document_id})
+    if not session or session["created_at"] < _expired_before():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found or expired")
+
+    storage = get_storage()
+    size = await storage.size(session["key"])
+    if size is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="The file has not been uploaded yet")
+    if size > DOCUMENT_UPLOAD_MAX_BYTES:
+        await storage.delete(storage.url_for(session["key"]))
+        await document_upload_sessions.delete_one({"_id": document_id})
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Documents can be at most {DOCUMENT_UPLOAD_MAX_BYTES} bytes"
+        )
+
+    document = DocumentUpload(
+        student_id=session["student_id"],
+        class_id=session["class_id"],
+        subject_id=session["subject_id"],
+        date=session["date"],
+        file_path=storage.url_for(session["key"]),
+        file_name=session["file_name"],
+        file_type=session["file_type"],
+        is_checked=False,
+    )
+    try:
+        await document_store.insert_one({"_id": document_id, **document.model_dump()})
+    except DuplicateKeyError:
+        # Completed concurrently by a retried callback
+        pass
+    await document_upload_sessions.delete_one({"_id": document_id})
+
+    return _uploaded(document_id, document.model_dump())
+
+
+async def store_local_upload_service(key: str, content_type: str, expires: int, signature: str, chunks: AsyncIterator[bytes]) -> dict:
+    """
+    Receives a presigned upload when documents are kept in local storage (tests and benchmarks).
+    """
+    storage = get_storage()
+    if not isinstance(storage, LocalStorage):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+    if not storage.verify_upload(key, content_type, expires, signature):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid or expired upload URL")
+
+    try:
+        size = await storage.store_stream(key, chunks, DOCUMENT_UPLOAD_MAX_BYTES)
+    except DocumentTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    return {"key": key, "size": size}
+
+
+def _expired_before() -> datetime:
+    return datetime.utcnow() - timedelta(seconds=PRESIGNED_UPLOAD_SESSION_SECONDS)
+
+
+async def cleanup_expired_uploads_service() -> int:
+    """
+    Deletes the sessions that were not completed in time, and the files uploaded for them.
+    A file is deleted before its session, so a failure leaves the session to be retried.
+    Returns how many files were deleted.
+    """
+    storage = get_storage()
+    deleted = 0
+    async for session in document_upload_sessions.find({"created_at": {"$lt": _expired_before()}}):
+        try:
+            # A completed upload whose session was not removed keeps its file
+            completed = await document_store.find_one({"_id": session["_id"]}, {"_id": 1})
+            if not completed and await storage.size(session["key"]) is not None:
+                await storage.delete(storage.url_for(session["key"]))
+                deleted += 1
+            await document_upload_sessions.delete_one({"_id": session["_id"]})
+        except Exception as e:
+            logger.warning(f"Could not clean up upload {session['_id']}: {e}")
+    return deleted
+
+
+async def upload_cleanup_loop(interval: float = UPLOAD_CLEANUP_INTERVAL):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            deleted = await cleanup_expired_uploads_service()
+            if deleted:
+                logger.info(f"Deleted {deleted} files of expired medical document uploads")
+        except Exception as e:
+            logger.warning(f"Upload cleanup loop error: {e}")
@@ -3,7 +3,14 @@ from app.services.background_services.medical_upload_to_cloud import medical_upl
 from fastapi import UploadFile
 from app.utils.schemas import DocumentUpload
 from app.utils.mongodb_connection import document_store
-import io  # Import BytesIO
+
+# Accepted content types and the file_type they are stored as
+ALLOWED_DOCUMENT_TYPES = {
+    "application/pdf": "pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": "docx",
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation": "pptx",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": "xlsx",
+}
 
 
 async def medical_upload_service(file: UploadFile, student_id: str, class_id: str, subject_id: str, date: str):
@@ -11,23 +18,13 @@ async def medical_upload_service(file: UploadFile, student_id: str, class_id: st
     Upload new document for absent dates
     """
     try:
-        allowed_types = {
-            "application/pdf": "pdf",
-            "application/vnd.openxmlformats-officedocument.wordprocessingml.document": "docx",
-            "application/vnd.openxmlformats-officedocument.presentationml.presentation": "pptx",
-            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": "xlsx",
-        }
-
-        file_type = allowed_types.get(file.content_type)
+        file_type = ALLOWED_DOCUMENT_TYPES.get(file.content_type)
         if not file_type:
             return {"error": "Invalid file type"}
 
-        # Convert UploadFile to BytesIO for compatibility with S3
-        file_content = await file.read()
-        file_like_object = io.BytesIO(file_content)
-
-        # Upload to S3
-        file_url = medical_upload_to_cloud(file_like_object, file.filename, file.content_type)
+        # Stream the spooled upload to storage instead of reading it into memory
+        await file.seek(0)
+        file_url = await medical_upload_to_cloud(file.file, file.filename, file.content_type)
         if not file_url:
             return {"error": "Failed to upload to S3"}
 
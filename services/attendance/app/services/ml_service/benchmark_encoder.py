@@ -0,0 +1,95 @@
+"""
+Microbenchmark for the prediction feature encoder.
+
+Times the original per-call pd.get_dummies encoding against the compiled FeatureEncoder, for
+encoding alone and for a full single-row prediction, and checks that both give bit-identical
+model inputs and predictions. Run with:
+    python -m app.services.ml_service.benchmark_encoder [--iterations N]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from app.services.ml_service.prediction_service import (
+    CATEGORICAL_COLS,
+    encoder,
+    feature_columns,
+    make_prediction,
+    model,
+)
+
+
+def get_dummies_encode(features: dict) -> pd.DataFrame:
+    # The encoding make_prediction used before FeatureEncoder
+    input_df = pd.DataFrame([features])
+    input_df_encoded = pd.get_dummies(input_df, columns=CATEGORICAL_COLS, drop_first=True)
+
+    for col in feature_columns:
+        if col not in input_df_encoded.columns:
+            input_df_encoded[col] = 0
+
+    return input_df_encoded[feature_columns]
+
+
+def get_dummies_predict(features: dict) -> float:
+    return model.predict(get_dummies_encode(features))[0]
+
+
+def sample_features(count: int) -> list:
+    start = datetime(2025, 1, 6)
+    samples = []
+    for i in range(count):
+        target_date = start + timedelta(days=i)
+        samples.append({
+            "weekday": target_date.strftime("%A"),
+            "month": target_date.strftime("%B"),
+            "class": f"CLS{(i % 12) + 1:03d}",
+            "subject": f"CLB{(i % 5) + 1:03d}",
+            "year": target_date.year,
+            "day": target_date.day,
+            "number_of_school_days_in_week": 5 - (i % 3),
+            "days_until_next_holiday": i % 7,
+            "days_since_last_holiday": (i * 3) % 7,
+            "is_event_day": i % 2,
+            "is_exam_day": int(i % 5 == 0),
+        })
+    return samples
+
+
+def per_call_us(func, samples: list, iterations: int) -> float:
+    started = time.perf_counter()
+    for i in range(iterations):
+        func(samples[i % len(samples)])
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the prediction feature encoder")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    samples = sample_features(365)
+
+    for features in samples:
+        before = get_dummies_encode(features).to_numpy(dtype=np.float64)
+        if not np.array_equal(before, encoder.encode(features)):
+            raise SystemExit(f"Encodings differ for {features}")
+        if get_dummies_predict(features) != make_prediction(features):
+            raise SystemExit(f"Predictions differ for {features}")
+    print(f"{len(samples)} samples: encodings and predictions are identical")
+
+    results = [
+        ("encode (get_dummies)", per_call_us(get_dummies_encode, samples, args.iterations)),
+        ("encode (FeatureEncoder)", per_call_us(encoder.encode, samples, args.iterations)),
+        ("predict (get_dummies)", per_call_us(get_dummies_predict, samples, args.iterations)),
+        ("predict (FeatureEncoder)", per_call_us(make_prediction, samples, args.iterations)),
+    ]
+    for name, micros in results:
+        print(f"{name:<26}{micros:>10.1f} us/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Memoized attendance forecasts.
+
+A forecast only depends on the class, subject and target date, the model, and the calendar
+events around that date, so it is stored under a key built from exactly those: the model
+version (a hash of the model files) and a hash of the calendar window. When either changes
+the key changes with it, and the stale entry is simply never read again.
+
+Forecasts are kept in an in-process LRU and in the `attendance_forecasts` collection, which
+workers share and which survives restarts. Storing a calendar event deletes the entries it
+affects, and a TTL index expires entries left behind by older models.
+"""
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from pymongo import ReplaceOne
+
+from app.utils.mongodb_connection import attendance_forecasts
+
+logger = logging.getLogger(__name__)
+
+FORECAST_CACHE_MAX_ENTRIES = int(os.getenv("FORECAST_CACHE_MAX_ENTRIES", "5000"))
+# How long a stored forecast is kept at most (TTL index on created_at)
+FORECAST_RETENTION_SECONDS = int(os.getenv("FORECAST_RETENTION_SECONDS", str(30 * 24 * 3600)))
+
+# key -> forecast, in LRU order
+_forecasts: "OrderedDict[str, dict]" = OrderedDict()
+
+
+def file_version(*paths: str) -> str:
+    # Content hash of the given files, used as the model version
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def calendar_hash(events: list) -> str:
+    """
+    Hash of the calendar events a forecast was computed from, in the order they were used.
+    """
+    canonical = [
+        [event["date"].strftime("%Y-%m-%d"), event["features"]]
+        for event in events
+    ]
+    payload = json.dumps(canonical, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def forecast_key(class_id: str, subject_id: str, target_date: datetime, model_version: str, calendar_version: str) -> str:
+    return "|".join([class_id, subject_id, target_date.isoformat(), model_version, calendar_version])
+
+
+def _remember(key: str, forecast: dict):
+    _forecasts[key] = forecast
+    _forecasts.move_to_end(key)
+    while len(_forecasts) > FORECAST_CACHE_MAX_ENTRIES:
+        _forecasts.popitem(last=False)
+
+
+async def get_forecasts(keys: List[str]) -> Dict[str, dict]:
+    """
+    The stored forecasts for the given keys; keys without one are left out.
+    """
+    found = {}
+    missing = []
+    for key in keys:
+        forecast = _forecasts.get(key)
+        if forecast is None:
+            missing.append(key)
+        else:
+            _forecasts.move_to_end(key)
+            found[key] = dict(forecast)
+
+    if missing:
+        try:
+            cursor = attendance_forecasts.find({"_id": {"$in": missing}}, {"forecast": 1})
+            async for doc in cursor:
+                _remember(doc["_id"], doc["forecast"])
+                found[doc["_id"]] = dict(doc["forecast"])
+        except Exception as e:
+            logger.warning(f"Could not read stored forecasts: {e}")
+
+    return found
+
+
+async def store_forecasts(entries: List[Tuple[str, dict]]):
+    """
+    Stores freshly computed (key, forecast) pairs. A failure only costs a recomputation
+    later, so it is logged rather than raised.
+    """
+    if not entries:
+        return
+    for key, forecast in entries:
+        _remember(key, dict(forecast))
+
+    now = datetime.utcnow()
+    operations = [
+        ReplaceOne(
+            {"_id": key},
+            {
+                "class_id": forecast["class_id"],
+                "subject_id": forecast["subject_id"],
+                "date": forecast["date"],
+                "forecast": forecast,
+                "created_at": now,
+            },
+            upsert=True,
+        )
+        for key, forecast in entries
+    ]
+    try:
+        await attendance_forecasts.bulk_write(operations, ordered=False)
+    except Exception as e:
+        logger.warning(f"Could not store forecasts: {e}")
+
+
+async def invalidate_forecasts(class_id: str, subject_id: str, start_date: str, end_date: str) -> int:
+    """
+    Drops the forecasts of one class and subject for dates between start_date and end_date
+    (inclusive, YYYY-MM-DD), both in this process and in the collection.
+    """
+    stale = [
+        key for key, forecast in _forecasts.items()
+        if forecast["class_id"] == class_id
+        and forecast["subject_id"] == subject_id
+        and start_date <= forecast["date"] <= end_date
+    ]
+    for key in stale:
+        del _forecasts[key]
+
+    result = await attendance_forecasts.delete_many({
+        "class_id": class_id,
+        "subject_id": subject_id,
+        "date": {"$gte": start_date, "$lte": end_date},
+    })
+    return result.deleted_count
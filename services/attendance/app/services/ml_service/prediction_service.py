@@ -147,11 +147,15 @@
 
 
 
+import numpy as np
 import pandas as pd
 import joblib
 import os
+from bisect import bisect_left, bisect_right
 from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
 from app.utils.mongodb_connection import calendar_events
+from app.services.ml_service import forecast_cache
 
 # Load model and feature columns
 BASE_DIR = os.path.dirname(__file__)
@@ -162,11 +166,64 @@ columns_path = os.path.join(MODEL_DIR, "feature_columns.pkl")
 
 model = joblib.load(model_path)
 feature_columns = joblib.load(columns_path)
+# Part of every forecast cache key, so a retrained model never serves old forecasts
+model_version = forecast_cache.file_version(model_path, columns_path)
+
+CATEGORICAL_COLS = ['weekday', 'month', 'class', 'subject']
+
+
+class FeatureEncoder:
+    """
+    Encodes feature dicts into model input rows, compiled once from feature_columns.
+
+    Numeric features are written straight to their column index in a preallocated row. The
+    one-hot columns (weekday_*, month_*, class_*, subject_*) are left at 0, which is what the
+    original per-call pd.get_dummies(drop_first=True) produced: on a one-row frame it drops
+    the only level of every categorical column.
+    """
+
+    def __init__(self, columns: List[str]):
+        self.columns = list(columns)
+        one_hot_prefixes = tuple(f"{col}_" for col in CATEGORICAL_COLS)
+        self.numeric_index = [
+            (name, index) for index, name in enumerate(self.columns)
+            if not name.startswith(one_hot_prefixes)
+        ]
+        self._row = np.zeros((1, len(self.columns)), dtype=np.float64)
+
+    def encode_many(self, features_list: List[dict]) -> np.ndarray:
+        rows = np.zeros((len(features_list), len(self.columns)), dtype=np.float64)
+        for position, features in enumerate(features_list):
+            for name, index in self.numeric_index:
+                rows[position, index] = features.get(name, 0)
+        return rows
+
+    def encode(self, features: dict) -> np.ndarray:
+        # Reuses one row buffer; callers must not hold on to the result
+        row = self._row
+        for name, index in self.numeric_index:
+            row[0, index] = features.get(name, 0)
+        return row
+
+    def frame(self, rows: np.ndarray) -> pd.DataFrame:
+        # The model was fitted on a DataFrame, so it is given the same column names
+        return pd.DataFrame(rows, columns=self.columns, copy=False)
+
+
+encoder = FeatureEncoder(feature_columns)
+
+
+# Calendar context used for each prediction: events up to this many days either side
+WINDOW_DAYS = 7
 
-async def predict_attendance(class_id: str, subject_id: str, target_date: datetime) -> dict:
-    # Query ±7 days of calendar events
-    date_buffer_start = (target_date - timedelta(days=7)).strftime("%Y-%m-%d")
-    date_buffer_end = (target_date + timedelta(days=7)).strftime("%Y-%m-%d")
+
+async def fetch_calendar_index(class_id: str, subject_id: str, dates: List[datetime]) -> "CalendarIndex":
+    """
+    Loads the calendar events for every date in dates with one query, covering the whole
+    span plus WINDOW_DAYS of padding on each side.
+    """
+    date_buffer_start = (min(dates) - timedelta(days=WINDOW_DAYS)).strftime("%Y-%m-%d")
+    date_buffer_end = (max(dates) + timedelta(days=WINDOW_DAYS)).strftime("%Y-%m-%d")
 
     calendar_filter = {
         "class_id": class_id,
@@ -175,10 +232,56 @@ async def predict_attendance(class_id: str, subject_id: str, target_date: dateti
     }
 
     cursor = calendar_events.find(calendar_filter)
-    events = await cursor.to_list(length=None)
-
+    return CalendarIndex(await cursor.to_list(length=None))
+
+
+def _midnight(value: datetime) -> datetime:
+    return datetime(value.year, value.month, value.day)
+
+
+class CalendarIndex:
+    """
+    Calendar events of one class and subject sorted by date, so the events, holidays and
+    school days around a target date are found by bisection instead of scanning every event.
+    Events on the same date keep the order the query returned them in.
+    """
+
+    def __init__(self, events: list):
+        self.events = sorted(
+            ({**event, "date": datetime.strptime(event["date"], "%Y-%m-%d")} for event in events),
+            key=lambda event: event["date"]
+        )
+        self.dates = [event["date"] for event in self.events]
+        self.holidays = [event["date"] for event in self.events if event["features"]["is_school_day"] == 0]
+        self.school_days = [event["date"] for event in self.events if event["features"]["is_school_day"] == 1]
+
+    def window(self, target_date: datetime) -> Tuple[datetime, datetime]:
+        # [start, end) covering the calendar days within WINDOW_DAYS of target_date
+        start = _midnight(target_date) - timedelta(days=WINDOW_DAYS)
+        end = _midnight(target_date) + timedelta(days=WINDOW_DAYS + 1)
+        return start, end
+
+    def count_after(self, target_date: datetime) -> int:
+        # Events after target_date within its window
+        _, end = self.window(target_date)
+        return bisect_left(self.dates, end) - bisect_right(self.dates, target_date)
+
+    def events_in_window(self, target_date: datetime) -> list:
+        start, end = self.window(target_date)
+        return self.events[bisect_left(self.dates, start):bisect_left(self.dates, end)]
+
+    def events_on(self, target_date: datetime) -> list:
+        day = _midnight(target_date)
+        return self.events[bisect_left(self.dates, day):bisect_left(self.dates, day + timedelta(days=1))]
+
+
+def build_features(class_id: str, subject_id: str, target_date: datetime, calendar: CalendarIndex) -> Tuple[Optional[dict], Optional[dict]]:
+    """
+    Returns (result, None) when no prediction is needed (-1: not enough calendar data, or
+    school closed), otherwise (None, features) with the model inputs for target_date.
+    """
     # Check if at least 7 future calendar events exist after prediction date
-    future_events_count = len([e for e in events if datetime.strptime(e["date"], "%Y-%m-%d") > target_date])
+    future_events_count = calendar.count_after(target_date)
     if future_events_count < 7:
         # Return -1 to indicate prediction cannot be done
         return {
@@ -187,13 +290,9 @@ async def predict_attendance(class_id: str, subject_id: str, target_date: dateti
             "date": target_date.strftime("%Y-%m-%d"),
             "predicted_attendance_rate": -1,
             "features_used": {}
-        }
+        }, None
 
-    # Parse event dates
-    for event in events:
-        event["date"] = datetime.strptime(event["date"], "%Y-%m-%d")
-
-    events_today = [e for e in events if e["date"].date() == target_date.date()]
+    events_today = calendar.events_on(target_date)
 
     # If school closed on target date, return -1
     if events_today and events_today[0]["features"]["is_school_day"] == 0:
@@ -207,11 +306,11 @@ async def predict_attendance(class_id: str, subject_id: str, target_date: dateti
                 "is_exam_week": events_today[0]["features"]["is_exam_week"],
                 "is_school_day": events_today[0]["features"]["is_school_day"]
             }
-        }
+        }, None
 
     # Calculate features for prediction
-    days_until_next_holiday, days_since_last_holiday = calculate_holiday_distances(events, target_date)
-    number_of_school_days_in_week = calculate_school_days_in_week(events, target_date)
+    days_until_next_holiday, days_since_last_holiday = calculate_holiday_distances(calendar, target_date)
+    number_of_school_days_in_week = calculate_school_days_in_week(calendar, target_date)
     is_event_day = events_today[0]["features"].get("is_event_day", 0) if events_today else 0
     is_exam_day = events_today[0]["features"].get("is_exam_week", 0) if events_today else 0
 
@@ -228,58 +327,103 @@ async def predict_attendance(class_id: str, subject_id: str, target_date: dateti
         "is_event_day": is_event_day,
         "is_exam_day": is_exam_day
     }
+    return None, features
 
-    prediction = make_prediction(features)
-
-    return {
-        "class_id": class_id,
-        "subject_id": subject_id,
-        "date": target_date.strftime("%Y-%m-%d"),
-        "predicted_attendance_rate": round(float(prediction), 2),
-        "features_used": features
-    }
 
+async def predict_attendance(class_id: str, subject_id: str, target_date: datetime) -> dict:
+    results = await predict_attendance_batch(class_id, subject_id, [target_date])
+    return results[0]
+
+
+async def predict_attendance_batch(class_id: str, subject_id: str, dates: List[datetime]) -> List[dict]:
+    """
+    predict_attendance for many dates of one class and subject, in the same order as dates.
+    The calendar is fetched once for the whole span. Forecasts whose inputs (model and
+    calendar window) are unchanged come from forecast_cache; the remaining predictable
+    dates go into one matrix and the model is called once.
+    """
+    if not dates:
+        return []
+
+    calendar = await fetch_calendar_index(class_id, subject_id, dates)
+    keys = [
+        forecast_cache.forecast_key(
+            class_id, subject_id, target_date, model_version,
+            forecast_cache.calendar_hash(calendar.events_in_window(target_date))
+        )
+        for target_date in dates
+    ]
+    cached = await forecast_cache.get_forecasts(keys)
+
+    results: List[Optional[dict]] = []
+    fresh = []  # (index in results, key)
+    pending = []  # (index in results, target_date, features)
+
+    for target_date, key in zip(dates, keys):
+        if key in cached:
+            results.append(cached[key])
+            continue
+        result, features = build_features(class_id, subject_id, target_date, calendar)
+        if result is None:
+            pending.append((len(results), target_date, features))
+        fresh.append((len(results), key))
+        results.append(result)
+
+    if pending:
+        predictions = make_predictions([features for _, _, features in pending])
+        for (index, target_date, features), prediction in zip(pending, predictions):
+            results[index] = {
+                "class_id": class_id,
+                "subject_id": subject_id,
+                "date": target_date.strftime("%Y-%m-%d"),
+                "predicted_attendance_rate": round(float(prediction), 2),
+                "features_used": features
+            }
 
-def make_prediction(features: dict) -> float:
-    input_df = pd.DataFrame([features])
+    await forecast_cache.store_forecasts([(key, results[index]) for index, key in fresh])
+    return results
 
-    categorical_cols = ['weekday', 'month', 'class', 'subject']
-    input_df_encoded = pd.get_dummies(input_df, columns=categorical_cols, drop_first=True)
 
-    for col in feature_columns:
-        if col not in input_df_encoded.columns:
-            input_df_encoded[col] = 0
+async def invalidate_forecasts(class_id: str, subject_id: str, date: str) -> int:
+    """
+    Drops the cached forecasts whose calendar window includes date (YYYY-MM-DD).
+    """
+    event_date = datetime.strptime(date, "%Y-%m-%d")
+    start = (event_date - timedelta(days=WINDOW_DAYS)).strftime("%Y-%m-%d")
+    end = (event_date + timedelta(days=WINDOW_DAYS)).strftime("%Y-%m-%d")
+    return await forecast_cache.invalidate_forecasts(class_id, subject_id, start, end)
 
-    input_df_encoded = input_df_encoded[feature_columns]
 
-    prediction = model.predict(input_df_encoded)[0]
+def make_prediction(features: dict) -> float:
+    prediction = model.predict(encoder.frame(encoder.encode(features)))[0]
     return prediction
 
 
-def calculate_holiday_distances(events, current_date):
-    days_until_next_holiday = float('inf')
-    days_since_last_holiday = float('inf')
+def make_predictions(features_list: List[dict]):
+    """
+    Predictions for many feature rows with a single model call.
+    """
+    return model.predict(encoder.frame(encoder.encode_many(features_list)))
+
+
+def calculate_holiday_distances(calendar: CalendarIndex, current_date: datetime):
+    # Nearest holidays on either side of current_date, within its window
+    start, end = calendar.window(current_date)
+    position = bisect_left(calendar.holidays, current_date)
 
-    for event in events:
-        event_date = event["date"]
-        is_holiday = event["features"]["is_school_day"] == 0
-        delta_days = (event_date - current_date).days
+    days_until_next_holiday = 0
+    if position < len(calendar.holidays) and calendar.holidays[position] < end:
+        days_until_next_holiday = (calendar.holidays[position] - current_date).days
 
-        if is_holiday:
-            if delta_days >= 0:
-                days_until_next_holiday = min(days_until_next_holiday, delta_days)
-            else:
-                days_since_last_holiday = min(days_since_last_holiday, abs(delta_days))
+    days_since_last_holiday = 0
+    if position > 0 and calendar.holidays[position - 1] >= start:
+        days_since_last_holiday = abs((calendar.holidays[position - 1] - current_date).days)
 
-    return (
-        days_until_next_holiday if days_until_next_holiday != float('inf') else 0,
-        days_since_last_holiday if days_since_last_holiday != float('inf') else 0
-    )
+    return days_until_next_holiday, days_since_last_holiday
 
 
-def calculate_school_days_in_week(events, current_date):
-    year, week_num, _ = current_date.isocalendar()
-    return sum(
-        1 for event in events
-        if event["date"].isocalendar()[:2] == (year, week_num) and event["features"]["is_school_day"] == 1
-    )
+def calculate_school_days_in_week(calendar: CalendarIndex, current_date: datetime):
+    # School days in the ISO week (Monday to Sunday) of current_date
+    monday = _midnight(current_date) - timedelta(days=current_date.weekday())
+    next_monday = monday + timedelta(days=7)
+    return bisect_left(calendar.school_days, next_monday) - bisect_left(calendar.school_days, monday)
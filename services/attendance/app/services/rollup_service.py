@@ -0,0 +1,539 @@
+"""
+Write-time attendance rollups.
+
+Every attendance_store write applies its delta to `attendance_rollups`: present/total counts per
+day, month and year, for the class and for each student. Ratio reads then fetch one small
+document instead of scanning raw records.
+
+Writes go through an outbox so the rollups stay consistent when applying a delta fails:
+  1. the delta is stored in `attendance_rollup_outbox` before the attendance write,
+  2. the attendance write stamps the record with the outbox entry id (`rollup_version`),
+  3. the delta is applied with $inc upserts and the outbox entry removed.
+The per-student projection (app/services/student_attendance_service.py) is synced in step 3
+as well, before the delta, since syncing it twice is harmless and applying a delta twice is not.
+Entries left behind (a failed apply, a crash) are retried by a background loop, which first
+checks that the attendance write really happened and drops the entry otherwise. A new write
+to the same record settles its pending entries first; each entry also keeps the version it
+was written on top of, so a write that was since overwritten is still recognised.
+
+Rebuild everything from attendance_store with:
+    python -m app.services.rollup_service rebuild
+While a rebuild runs, the rollups meta document is flagged `rebuilding`: writes leave their
+outbox entries pending instead of applying them, and the retry loop leaves them alone. Once
+the new rollups are swapped in, the days those entries touched are recomputed from
+attendance_store and the entries the recomputation already covers are dropped. If a rebuild
+dies half-way the flag stays set; running it again clears it.
+"""
+import argparse
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from bson.objectid import ObjectId
+from pymongo import DeleteOne, ReplaceOne, UpdateOne
+
+from app.utils.mongodb_connection import db, attendance_store, attendance_rollups, attendance_rollup_outbox
+from app.utils.indexes import ensure_indexes
+from app.services.student_attendance_service import sync_student_attendance, sync_student_attendance_many
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_RETRY_INTERVAL = float(os.getenv("ROLLUP_RETRY_INTERVAL", "30"))
+ROLLUP_STAGING_COLLECTION = "attendance_rollups_rebuild"
+# Outbox entries are settled in the order they were written. created_at is only kept to the
+# millisecond and a batch shares one, so the ObjectId (increasing per process) breaks ties;
+# settling a later entry of a record first would make the earlier one look never written.
+OUTBOX_ORDER = [("created_at", 1), ("_id", 1)]
+
+SUMMARY_PERIODS = {"daily": "day", "monthly": "month", "yearly": "year"}
+
+RollupKey = Tuple[str, str, str, str, str]  # (scope, owner_id, subject_id, period, key)
+ROLLUP_FIELDS = ("present", "total", "records", "ratio_sum")
+
+
+def _period_keys(date: str) -> List[Tuple[str, str]]:
+    return [("day", date), ("month", date[:7]), ("year", date[:4])]
+
+
+def _normalise(status_value) -> str:
+    return str(status_value).strip().lower()
+
+
+def record_contributions(record: Optional[dict], sign: int = 1) -> Dict[RollupKey, Dict[str, float]]:
+    """
+    What one attendance record adds to the rollups (or removes, with sign=-1).
+
+    Class rollups keep present/total students plus `records` and `ratio_sum` (the sum of each
+    record's present share), so the class ratio stays the average share per record.
+    Student rollups keep present and marked (present or absent) days.
+    """
+    contributions: Dict[RollupKey, Dict[str, float]] = {}
+    if not record:
+        return contributions
+
+    class_id = record.get("class_id")
+    subject_id = record.get("subject_id")
+    date = record.get("date") or ""
+    status = record.get("status") or {}
+    if not class_id or not subject_id or len(date) < 10:
+        return contributions
+
+    statuses = {sid: _normalise(value) for sid, value in status.items()}
+    total = len(statuses)
+    present = sum(1 for value in statuses.values() if value == "present")
+
+    for period, key in _period_keys(date):
+        contributions[("class", class_id, subject_id, period, key)] = {
+            "present": sign * present,
+            "total": sign * total,
+            "records": sign * (1 if total else 0),
+            "ratio_sum": sign * (present / total if total else 0.0),
+        }
+        for sid, value in statuses.items():
+            if value not in ("present", "absent"):
+                continue
+            contributions[("student", sid, subject_id, period, key)] = {
+                "present": sign * (1 if value == "present" else 0),
+                "total": sign,
+            }
+    return contributions
+
+
+def rollup_deltas(old_record: Optional[dict], new_record: Optional[dict]) -> List[dict]:
+    """
+    The $inc updates that move the rollups from old_record to new_record (either may be None).
+    """
+    merged = record_contributions(old_record, sign=-1)
+    for rollup_key, inc in record_contributions(new_record).items():
+        current = merged.setdefault(rollup_key, {})
+        for field, value in inc.items():
+            current[field] = current.get(field, 0) + value
+
+    deltas = []
+    for (scope, owner_id, subject_id, period, key), inc in merged.items():
+        inc = {field: value for field, value in inc.items() if abs(value) > 1e-12}
+        if inc:
+            deltas.append({
+                "filter": {"scope": scope, "owner_id": owner_id, "subject_id": subject_id, "period": period, "key": key},
+                "inc": inc,
+            })
+    return deltas
+
+
+async def apply_deltas(deltas: List[dict]):
+    if deltas:
+        await attendance_rollups.bulk_write(
+            [UpdateOne(delta["filter"], {"$inc": delta["inc"]}, upsert=True) for delta in deltas],
+            ordered=False
+        )
+
+
+async def write_with_rollups(
+    action: str,
+    attendance_id: ObjectId,
+    old_record: Optional[dict],
+    new_record: Optional[dict],
+    write: Callable[[ObjectId], Awaitable],
+):
+    """
+    Runs write(rollup_version) and keeps the rollups in step with it through the outbox.
+    write must stamp the record with rollup_version (mark/update) or delete it (delete).
+    Returns whatever write returned.
+    """
+    await _settle(attendance_rollup_outbox.find({"attendance_id": attendance_id}).sort(OUTBOX_ORDER))
+
+    deltas = rollup_deltas(old_record, new_record)
+    entry_id = ObjectId()
+    await attendance_rollup_outbox.insert_one({
+        "_id": entry_id,
+        "action": action,
+        "attendance_id": attendance_id,
+        "previous_version": _version(old_record),
+        "deltas": deltas,
+        "created_at": datetime.utcnow(),
+        "attempts": 0,
+    })
+
+    try:
+        result = await write(entry_id)
+    except Exception:
+        await attendance_rollup_outbox.delete_one({"_id": entry_id})
+        raise
+
+    try:
+        await sync_student_attendance(attendance_id, new_record)
+        if await rebuilding():
+            # rebuild_rollups settles the entry once the new rollups are in place
+            return result
+        await apply_deltas(deltas)
+        await attendance_rollup_outbox.delete_one({"_id": entry_id})
+    except Exception as e:
+        # The attendance write succeeded; the retry loop applies the delta later
+        logger.warning(f"Deferred rollup update for attendance {attendance_id}: {e}")
+    return result
+
+
+async def write_many_with_rollups(
+    changes: List[Tuple[str, ObjectId, Optional[dict], Optional[dict]]],
+    write: Callable[[Dict[ObjectId, ObjectId]], Awaitable],
+) -> Set[ObjectId]:
+    """
+    write_with_rollups for many (action, attendance_id, old_record, new_record) mark or update
+    changes, with one outbox insert, one write and one rollup update for all of them.
+
+    write receives {attendance_id: rollup_version} and must stamp each record it writes with
+    its version. Some writes may not happen (a concurrent change, a duplicate key), so which
+    ones did is read back afterwards. Returns the ids of the records that were written.
+    """
+    if not changes:
+        return set()
+    attendance_ids = [attendance_id for _, attendance_id, _, _ in changes]
+    await _settle(attendance_rollup_outbox.find({"attendance_id": {"$in": attendance_ids}}).sort(OUTBOX_ORDER))
+
+    now = datetime.utcnow()
+    entries = [
+        {
+            "_id": ObjectId(),
+            "action": action,
+            "attendance_id": attendance_id,
+            "previous_version": _version(old_record),
+            "deltas": rollup_deltas(old_record, new_record),
+            "created_at": now,
+            "attempts": 0,
+        }
+        for action, attendance_id, old_record, new_record in changes
+    ]
+    await attendance_rollup_outbox.insert_many(entries, ordered=False)
+
+    # If write raises, the entries stay behind and the retry loop settles whatever happened
+    await write({entry["attendance_id"]: entry["_id"] for entry in entries})
+
+    records = {
+        record["_id"]: record
+        async for record in attendance_store.find({"_id": {"$in": attendance_ids}})
+    }
+    written = [
+        entry for entry in entries
+        if records.get(entry["attendance_id"], {}).get("rollup_version") == entry["_id"]
+    ]
+    written_ids = {entry["attendance_id"] for entry in written}
+    not_written = [entry["_id"] for entry in entries if entry["attendance_id"] not in written_ids]
+    if not_written:
+        await attendance_rollup_outbox.delete_many({"_id": {"$in": not_written}})
+
+    try:
+        await sync_student_attendance_many([(attendance_id, records[attendance_id]) for attendance_id in written_ids])
+        if await rebuilding():
+            return written_ids
+        await apply_deltas([delta for entry in written for delta in entry["deltas"]])
+        await attendance_rollup_outbox.delete_many({"_id": {"$in": [entry["_id"] for entry in written]}})
+    except Exception as e:
+        logger.warning(f"Deferred rollup update for {len(written)} attendance records: {e}")
+    return written_ids
+
+
+def _version(record: Optional[dict]) -> Optional[ObjectId]:
+    return record.get("rollup_version") if record else None
+
+
+async def _written_record(entry: dict) -> Tuple[bool, Optional[dict]]:
+    # Whether the entry's write happened, and the record as it is now
+    record = await attendance_store.find_one({"_id": entry["attendance_id"]})
+    if entry["action"] == "delete":
+        return record is None, None
+    if record is not None:
+        version = record.get("rollup_version")
+    else:
+        deleted = await attendance_rollup_outbox.find_one({"attendance_id": entry["attendance_id"], "action": "delete"})
+        version = deleted.get("previous_version") if deleted else None
+    # Later writes still pending were made on top of this one if their chain leads back to it
+    while version is not None and version != entry["_id"]:
+        later = await attendance_rollup_outbox.find_one({"_id": version}, {"previous_version": 1})
+        version = later.get("previous_version") if later else None
+    return version == entry["_id"], record
+
+
+async def _settle(entries) -> int:
+    if await rebuilding():
+        return 0
+    applied = 0
+    async for entry in entries:
+        try:
+            happened, record = await _written_record(entry)
+            if happened:
+                await sync_student_attendance(entry["attendance_id"], record)
+                await apply_deltas(entry["deltas"])
+                applied += 1
+            await attendance_rollup_outbox.delete_one({"_id": entry["_id"]})
+        except Exception as e:
+            logger.warning(f"Rollup retry failed for outbox entry {entry['_id']}: {e}")
+            await attendance_rollup_outbox.update_one({"_id": entry["_id"]}, {"$inc": {"attempts": 1}})
+    return applied
+
+
+async def retry_pending(older_than: float = ROLLUP_RETRY_INTERVAL) -> int:
+    """
+    Applies outbox entries that were not completed inline. Returns how many were applied.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=older_than)
+    return await _settle(attendance_rollup_outbox.find({"created_at": {"$lt": cutoff}}).sort(OUTBOX_ORDER))
+
+
+async def rollup_retry_loop(interval: float = ROLLUP_RETRY_INTERVAL):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            applied = await retry_pending(interval)
+            if applied:
+                logger.info(f"Applied {applied} pending attendance rollup updates")
+        except Exception as e:
+            logger.warning(f"Rollup retry loop error: {e}")
+
+
+_ready: Optional[bool] = None
+
+
+async def rollups_ready() -> bool:
+    """
+    Rollups are only trusted once a rebuild has seeded them from the existing records.
+    """
+    global _ready
+    if not _ready:
+        _ready = await attendance_rollups.find_one({"scope": "meta", "built_at": {"$exists": True}}, {"_id": 1}) is not None
+    return _ready
+
+
+async def rebuilding() -> bool:
+    """
+    Whether rebuild_rollups is running, in this or any other process. Checked after each
+    attendance write, so a write either lands before the rebuild starts reading or leaves its
+    outbox entry for the rebuild to settle.
+    """
+    return await attendance_rollups.find_one({"scope": "meta", "rebuilding": True}, {"_id": 1}) is not None
+
+
+async def get_rollup(scope: str, owner_id: str, subject_id: str, summary_type: str, key: str) -> Optional[dict]:
+    """
+    The rollup document for one class or student, subject and period, or None when it does not
+    exist or the rollups have not been built yet.
+    """
+    period = SUMMARY_PERIODS.get(summary_type)
+    if period is None or not await rollups_ready():
+        return None
+    return await attendance_rollups.find_one(
+        {"scope": scope, "owner_id": owner_id, "subject_id": subject_id, "period": period, "key": key}
+    )
+
+
+_PERIODS = [
+    {"period": "day", "key": "$date"},
+    {"period": "month", "key": {"$substrBytes": ["$date", 0, 7]}},
+    {"period": "year", "key": {"$substrBytes": ["$date", 0, 4]}},
+]
+
+
+def _status_is(path: str, value: str) -> dict:
+    return {"$eq": [{"$toLower": {"$trim": {"input": path}}}, value]}
+
+
+def rebuild_pipeline() -> list:
+    """
+    Recomputes every class and student rollup from attendance_store in one aggregation.
+    """
+    rollup_fields = {"_id": 0, "owner_id": "$_id.owner_id", "subject_id": "$_id.subject_id", "period": "$_id.period", "key": "$_id.key"}
+    valid_dates = {"$match": {"class_id": {"$type": "string"}, "subject_id": {"$type": "string"}, "date": {"$type": "string"}}}
+
+    class_rollups = [
+        valid_dates,
+        {"$project": {"class_id": 1, "subject_id": 1, "date": 1, "entries": {"$objectToArray": {"$ifNull": ["$status", {}]}}}},
+        {"$project": {
+            "class_id": 1, "subject_id": 1, "date": 1,
+            "total": {"$size": "$entries"},
+            "present": {"$size": {"$filter": {"input": "$entries", "as": "entry", "cond": _status_is("$$entry.v", "present")}}},
+        }},
+        {"$project": {"class_id": 1, "subject_id": 1, "present": 1, "total": 1, "periods": _PERIODS}},
+        {"$unwind": "$periods"},
+        {"$group": {
+            "_id": {"owner_id": "$class_id", "subject_id": "$subject_id", "period": "$periods.period", "key": "$periods.key"},
+            "present": {"$sum": "$present"},
+            "total": {"$sum": "$total"},
+            "records": {"$sum": {"$cond": [{"$gt": ["$total", 0]}, 1, 0]}},
+            "ratio_sum": {"$sum": {"$cond": [{"$gt": ["$total", 0]}, {"$divide": ["$present", "$total"]}, 0]}},
+        }},
+        {"$project": {**rollup_fields, "scope": {"$literal": "class"}, "present": 1, "total": 1, "records": 1, "ratio_sum": 1}},
+    ]
+
+    student_rollups = [
+        valid_dates,
+        {"$project": {"subject_id": 1, "date": 1, "entries": {"$objectToArray": {"$ifNull": ["$status", {}]}}}},
+        {"$unwind": "$entries"},
+        {"$project": {
+            "subject_id": 1, "date": 1,
+            "student_id": "$entries.k",
+            "status": {"$toLower": {"$trim": {"input": "$entries.v"}}},
+        }},
+        {"$match": {"status": {"$in": ["present", "absent"]}}},
+        {"$project": {"student_id": 1, "subject_id": 1, "status": 1, "periods": _PERIODS}},
+        {"$unwind": "$periods"},
+        {"$group": {
+            "_id": {"owner_id": "$student_id", "subject_id": "$subject_id", "period": "$periods.period", "key": "$periods.key"},
+            "present": {"$sum": {"$cond": [{"$eq": ["$status", "present"]}, 1, 0]}},
+            "total": {"$sum": 1},
+        }},
+        {"$project": {**rollup_fields, "scope": {"$literal": "student"}, "present": 1, "total": 1}},
+    ]
+
+    return class_rollups + [
+        {"$unionWith": {"coll": attendance_store.name, "pipeline": student_rollups}},
+        {"$out": ROLLUP_STAGING_COLLECTION},
+    ]
+
+
+def _add(totals: Dict[RollupKey, Dict[str, float]], rollup_key: RollupKey, inc: Dict[str, float]):
+    current = totals.setdefault(rollup_key, {})
+    for field, value in inc.items():
+        current[field] = current.get(field, 0) + value
+
+
+def _rollup_document(rollup_key: RollupKey, fields: Dict[str, float]) -> dict:
+    scope, owner_id, subject_id, period, key = rollup_key
+    return {"scope": scope, "owner_id": owner_id, "subject_id": subject_id, "period": period, "key": key, **fields}
+
+
+async def _replace_rollups(stale: Set[RollupKey], totals: Dict[RollupKey, Dict[str, float]]):
+    # Sets the rollups in totals and removes the stale ones that are no longer there
+    operations = [
+        ReplaceOne(_rollup_document(rollup_key, {}), _rollup_document(rollup_key, fields), upsert=True)
+        for rollup_key, fields in totals.items()
+    ]
+    operations += [DeleteOne(_rollup_document(rollup_key, {})) for rollup_key in stale - set(totals)]
+    if operations:
+        await attendance_rollups.bulk_write(operations, ordered=False)
+
+
+async def _recompute_days(stale: Set[RollupKey]) -> Dict[ObjectId, Optional[ObjectId]]:
+    """
+    Recomputes the given day rollups, and every other one of the same subjects and dates,
+    from attendance_store; then the month and year rollups of every class and student
+    involved. Returns the version of each record that was read.
+    """
+    seen: Dict[ObjectId, Optional[ObjectId]] = {}
+    totals: Dict[RollupKey, Dict[str, float]] = {}
+    for subject_id, date in sorted({(subject_id, date) for _, _, subject_id, _, date in stale}):
+        async for record in attendance_store.find({"subject_id": subject_id, "date": date}):
+            seen[record["_id"]] = record.get("rollup_version")
+            for rollup_key, inc in record_contributions(record).items():
+                if rollup_key[3] == "day":
+                    _add(totals, rollup_key, inc)
+    await _replace_rollups(stale, totals)
+
+    # Months are the sum of their days and years the sum of their months
+    for period, part, length in (("month", "day", 7), ("year", "month", 4)):
+        owners: Dict[Tuple[str, str, str], Set[str]] = {}
+        for scope, owner_id, subject_id, _, key in set(totals) | stale:
+            owners.setdefault((scope, subject_id, key[:length]), set()).add(owner_id)
+        totals, stale = {}, set()
+        for (scope, subject_id, key), owner_ids in owners.items():
+            for owner_id in owner_ids:
+                stale.add((scope, owner_id, subject_id, period, key))
+            async for rollup in attendance_rollups.find({
+                "scope": scope, "owner_id": {"$in": sorted(owner_ids)}, "subject_id": subject_id,
+                "period": part, "key": {"$regex": f"^{key}"},
+            }):
+                fields = {field: value for field, value in rollup.items() if field in ROLLUP_FIELDS}
+                _add(totals, (scope, rollup["owner_id"], subject_id, period, key), fields)
+        await _replace_rollups(stale, totals)
+    return seen
+
+
+def _descends_from(entry: dict, version: Optional[ObjectId], entries: Dict[ObjectId, dict]) -> bool:
+    previous = entry.get("previous_version")
+    while previous is not None and previous != version:
+        previous = entries[previous].get("previous_version") if previous in entries else None
+    return version is not None and previous == version
+
+
+async def _replay_outbox() -> int:
+    """
+    Brings the rollups up to date with the outbox entries left pending while rebuilding.
+
+    A write that landed while the rebuild was reading may or may not be in its result, so the
+    days those entries touch are recomputed from attendance_store rather than their deltas
+    applied. Entries the recomputation covers are dropped; entries made on top of what it read
+    stay pending and are settled as usual. Returns how many entries were settled this way.
+    """
+    entries = await attendance_rollup_outbox.find({}).to_list(length=None)
+    if not entries:
+        return 0
+
+    # Every day rollup the rebuild may have counted one of these records in
+    days = {
+        tuple(delta["filter"][field] for field in ("scope", "owner_id", "subject_id", "period", "key"))
+        for entry in entries for delta in entry["deltas"]
+        if delta["filter"]["period"] == "day"
+    }
+    seen = await _recompute_days(days)
+
+    by_record: Dict[ObjectId, Dict[ObjectId, dict]] = {}
+    for entry in entries:
+        by_record.setdefault(entry["attendance_id"], {})[entry["_id"]] = entry
+    covered = []
+    for attendance_id, record_entries in by_record.items():
+        if attendance_id in seen:
+            covered += [
+                entry_id for entry_id, entry in record_entries.items()
+                if not _descends_from(entry, seen[attendance_id], record_entries)
+            ]
+        elif any(entry["action"] == "delete" for entry in record_entries.values()):
+            # Deleted before it was read: nothing can be written to it any more
+            covered += list(record_entries)
+        # Otherwise it has not been written yet (or never will be) and is settled as usual
+    if covered:
+        await attendance_rollup_outbox.delete_many({"_id": {"$in": covered}})
+    return len(covered)
+
+
+async def rebuild_rollups() -> dict:
+    """
+    Recomputes the rollups from scratch into a staging collection and swaps it in.
+
+    Marking can go on while it runs: writes leave their outbox entries pending until the new
+    rollups are in place, and _replay_outbox then brings them up to date.
+    """
+    started_at = datetime.utcnow()
+    await attendance_rollups.update_one(
+        {"scope": "meta"}, {"$set": {"rebuilding": True, "rebuild_started_at": started_at}}, upsert=True
+    )
+    await attendance_store.aggregate(rebuild_pipeline()).to_list(length=None)
+
+    staging = db[ROLLUP_STAGING_COLLECTION]
+    documents = await staging.count_documents({})
+    await staging.insert_one({"scope": "meta", "built_at": started_at, "rebuilding": True})
+    await staging.rename(attendance_rollups.name, dropTarget=True)
+    await ensure_indexes()
+
+    settled = await _replay_outbox()
+    await attendance_rollups.update_one({"scope": "meta"}, {"$unset": {"rebuilding": "", "rebuild_started_at": ""}})
+
+    global _ready
+    _ready = True
+    return {"rollups": documents, "settled_outbox_entries": settled, "built_at": started_at.isoformat()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the attendance rollups")
+    parser.add_argument("command", choices=["rebuild", "retry"])
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "rebuild":
+        result = asyncio.run(rebuild_rollups())
+    else:
+        result = {"applied": asyncio.run(retry_pending(older_than=0))}
+    print(result)
+
+
+if __name__ == "__main__":
+    main()
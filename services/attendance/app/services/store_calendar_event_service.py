@@ -1,6 +1,10 @@
+import logging
 from typing import Dict, Any
 from datetime import datetime
 from app.utils.mongodb_connection import calendar_events
+from app.services.ml_service.prediction_service import invalidate_forecasts
+
+logger = logging.getLogger(__name__)
 
 async def store_calendar_event(event_data: Dict[str, Any]):
     """
@@ -33,5 +37,12 @@ async def store_calendar_event(event_data: Dict[str, Any]):
     
     # Insert the calendar event
     result = await calendar_events.insert_one(event_data)
-    
+
+    # Forecasts around this date were computed without the event. Their cache keys no longer
+    # match anyway, so a failure here only leaves unreachable entries behind.
+    try:
+        await invalidate_forecasts(event_data["class_id"], event_data["subject_id"], event_data["date"])
+    except Exception as e:
+        logger.warning(f"Could not invalidate forecasts for {event_data['class_id']}/{event_data['subject_id']}: {e}")
+
     return result 
\ No newline at end of file
@@ -0,0 +1,164 @@
+"""
+Per-student attendance projection.
+
+attendance_store keeps one document per class, subject and date with the students in a
+`status` map, so finding one student's records needs a `status.<student_id>` filter that no
+index can serve. `student_attendance` holds the same data with one row per student and
+record (attendance_id, student_id, class_id, subject_id, date, weekday, status), indexed on
+(student_id, subject_id, date).
+
+Rows are kept in step by write_with_rollups (app/services/rollup_service.py), through the same
+outbox as the rollups. Syncing a record replaces its rows, so repeating it is harmless.
+Student reads use the projection once it has been built from the existing records with:
+    python -m app.services.student_attendance_service rebuild
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from bson.objectid import ObjectId
+from pymongo import DeleteMany, ReplaceOne
+
+from app.utils.mongodb_connection import db, attendance_store, student_attendance
+from app.utils.indexes import ensure_indexes
+
+logger = logging.getLogger(__name__)
+
+PROJECTION_STAGING_COLLECTION = "student_attendance_rebuild"
+META_ID = "meta"
+
+
+def student_rows(attendance_id: ObjectId, record: Optional[dict]) -> List[dict]:
+    """
+    The projection rows of one attendance record; none for a deleted record.
+    """
+    if not record:
+        return []
+    return [
+        {
+            "attendance_id": attendance_id,
+            "student_id": student_id,
+            "class_id": record.get("class_id"),
+            "subject_id": record.get("subject_id"),
+            "date": record.get("date"),
+            "weekday": record.get("weekday"),
+            "status": value,
+        }
+        for student_id, value in (record.get("status") or {}).items()
+    ]
+
+
+def _sync_operations(attendance_id: ObjectId, record: Optional[dict]) -> list:
+    rows = student_rows(attendance_id, record)
+    operations = [DeleteMany({"attendance_id": attendance_id, "student_id": {"$nin": [row["student_id"] for row in rows]}})]
+    operations += [
+        ReplaceOne({"attendance_id": attendance_id, "student_id": row["student_id"]}, row, upsert=True)
+        for row in rows
+    ]
+    return operations
+
+
+async def sync_student_attendance(attendance_id: ObjectId, record: Optional[dict]):
+    """
+    Replaces the projection rows of attendance_id with those of record (None when deleted).
+    """
+    await student_attendance.bulk_write(_sync_operations(attendance_id, record), ordered=False)
+
+
+async def sync_student_attendance_many(records: List[Tuple[ObjectId, Optional[dict]]]):
+    """
+    sync_student_attendance for many (attendance_id, record) pairs with one bulk write.
+    """
+    operations = [operation for attendance_id, record in records for operation in _sync_operations(attendance_id, record)]
+    if operations:
+        await student_attendance.bulk_write(operations, ordered=False)
+
+
+_ready: Optional[bool] = None
+
+
+async def student_attendance_ready() -> bool:
+    """
+    The projection is only trusted once a rebuild has seeded it from the existing records.
+    """
+    global _ready
+    if not _ready:
+        _ready = await student_attendance.find_one({"_id": META_ID}, {"_id": 1}) is not None
+    return _ready
+
+
+async def find_student_records(student_id: str, subject_id: str) -> Optional[List[dict]]:
+    """
+    The attendance records of subject_id that mention student_id, shaped like attendance_store
+    documents but with only that student in `status`. None when the projection is not built.
+    """
+    if not await student_attendance_ready():
+        return None
+    cursor = student_attendance.find(
+        {"student_id": student_id, "subject_id": subject_id},
+        {"_id": 0, "attendance_id": 1, "class_id": 1, "date": 1, "weekday": 1, "status": 1}
+    ).sort("attendance_id", 1)
+    return [
+        {
+            "_id": row["attendance_id"],
+            "class_id": row.get("class_id"),
+            "subject_id": subject_id,
+            "date": row.get("date"),
+            "weekday": row.get("weekday"),
+            "status": {student_id: row.get("status")},
+        }
+        async for row in cursor
+    ]
+
+
+def rebuild_pipeline() -> list:
+    return [
+        {"$project": {
+            "class_id": 1, "subject_id": 1, "date": 1, "weekday": 1,
+            "entries": {"$objectToArray": {"$ifNull": ["$status", {}]}},
+        }},
+        {"$unwind": "$entries"},
+        {"$project": {
+            "_id": 0,
+            "attendance_id": "$_id",
+            "student_id": "$entries.k",
+            "class_id": 1, "subject_id": 1, "date": 1, "weekday": 1,
+            "status": "$entries.v",
+        }},
+        {"$out": PROJECTION_STAGING_COLLECTION},
+    ]
+
+
+async def rebuild_student_attendance() -> dict:
+    """
+    Rebuilds the projection from attendance_store into a staging collection and swaps it in.
+    Run it when marking traffic is quiet, or run it again after: rows synced while it runs
+    may be lost in the swap.
+    """
+    started_at = datetime.utcnow()
+    await attendance_store.aggregate(rebuild_pipeline()).to_list(length=None)
+
+    staging = db[PROJECTION_STAGING_COLLECTION]
+    rows = await staging.count_documents({})
+    await staging.insert_one({"_id": META_ID, "built_at": started_at})
+    await staging.rename(student_attendance.name, dropTarget=True)
+    await ensure_indexes()
+
+    global _ready
+    _ready = True
+    return {"rows": rows, "built_at": started_at.isoformat()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the per-student attendance projection")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    print(asyncio.run(rebuild_student_attendance()))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ from datetime import datetime
 from bson.objectid import ObjectId
 from fastapi import HTTPException
 from app.utils.mongodb_connection import attendance_store
+from app.services.rollup_service import write_with_rollups
 
 async def update_class_attendance_service(
     attendance_id: str,
@@ -31,9 +32,18 @@ async def update_class_attendance_service(
             "updated_at": int(datetime.now().timestamp())
         }
 
-        update_result = await attendance_store.update_one(
-            {"_id": attendance_object_id},
-            {"$set": updated_data}
+        async def update(rollup_version):
+            # Only update the version we computed the rollup delta from
+            result = await attendance_store.update_one(
+                {"_id": attendance_object_id, "rollup_version": existing_record.get("rollup_version")},
+                {"$set": {**updated_data, "rollup_version": rollup_version}}
+            )
+            if result.matched_count == 0:
+                raise HTTPException(status_code=409, detail="Attendance record was modified concurrently, please retry")
+            return result
+
+        update_result = await write_with_rollups(
+            "update", attendance_object_id, existing_record, updated_data, update
         )
 
         if update_result.modified_count == 0:
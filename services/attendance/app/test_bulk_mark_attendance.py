@@ -0,0 +1,89 @@
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import mark_class_attendance_router
+from app.services.bulk_mark_attendance_service import bulk_mark_attendance_service
+from app.services.rollup_service import record_contributions
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def entry(class_id: str, date: str, status: dict) -> dict:
+    return {"class_id": class_id, "subject_id": "academic", "date": date, "status": status}
+
+
+async def unique_key(mongo):
+    await mongo["attendance_store"].create_index([("class_id", 1), ("subject_id", 1), ("date", 1)], unique=True)
+
+
+def test_bulk_marking_reports_a_result_per_entry(mongo):
+    async def main():
+        await unique_key(mongo)
+        first = await bulk_mark_attendance_service([
+            entry("CLS001", "2025-03-03", {"STU1": "present", "STU2": "absent"}),
+            entry("CLS001", "2025-03-04", {"STU1": "present", "STU2": "present"}),
+        ])
+        second = await bulk_mark_attendance_service([
+            entry("CLS001", "2025-03-03", {"STU1": "present", "STU2": "absent"}),
+            entry("CLS001", "2025-03-04", {"STU1": "absent", "STU2": "present"}),
+            entry("CLS002", "2025-03-04", {"STU3": "present"}),
+            entry("CLS002", "2025-03-04", {"STU3": "absent"}),
+            entry("CLS002", "2025-13-04", {"STU3": "absent"}),
+        ])
+        return first, second
+
+    first, second = run(main())
+
+    assert first["counts"] == {"created": 2, "updated": 0, "unchanged": 0, "error": 0}
+    assert [outcome["result"] for outcome in second["results"]] == ["unchanged", "updated", "created", "error", "error"]
+    assert second["results"][3]["detail"] == "Duplicate class_id, subject_id and date in this request"
+    assert second["results"][4]["detail"] == "Invalid date format. Use YYYY-MM-DD"
+    assert second["results"][1]["attendance_id"] == first["results"][1]["attendance_id"]
+    assert second["results"][1]["attendance_percentage"] == 50.0
+    assert second["success"] is False
+
+
+def test_bulk_marking_keeps_rollups_and_projection_in_step(mongo):
+    async def main():
+        await unique_key(mongo)
+        await bulk_mark_attendance_service([
+            entry("CLS001", "2025-03-03", {"STU1": "present", "STU2": "absent"}),
+            entry("CLS002", "2025-03-03", {"STU3": "present"}),
+        ])
+        await bulk_mark_attendance_service([entry("CLS001", "2025-03-03", {"STU1": "absent", "STU2": "absent"})])
+
+        expected = {}
+        async for record in mongo["attendance_store"].find({}):
+            for rollup_key, inc in record_contributions(record).items():
+                expected[rollup_key] = inc
+        found = {}
+        async for rollup in mongo["attendance_rollups"].find({}):
+            rollup_key = (rollup["scope"], rollup["owner_id"], rollup["subject_id"], rollup["period"], rollup["key"])
+            found[rollup_key] = {field: rollup.get(field, 0) for field in expected[rollup_key]}
+
+        assert found == expected
+        assert await mongo["attendance_rollup_outbox"].count_documents({}) == 0
+        rows = await mongo["student_attendance"].find({}, {"_id": 0, "student_id": 1, "status": 1}).to_list(length=None)
+        assert sorted((row["student_id"], row["status"]) for row in rows) == [
+            ("STU1", "absent"), ("STU2", "absent"), ("STU3", "present")
+        ]
+
+    run(main())
+
+
+def test_marking_an_existing_record_again_is_a_conflict(mongo):
+    app = FastAPI()
+    app.include_router(mark_class_attendance_router.router)
+    client = TestClient(app)
+    run(unique_key(mongo))
+    body = entry("CLS001", "2025-03-03", {"STU1": "present"})
+
+    assert client.post("/attendance/attendance_marking", json=body).status_code == 201
+    response = client.post("/attendance/attendance_marking", json=body)
+
+    assert response.status_code == 409
+    assert "already marked" in response.json()["detail"]
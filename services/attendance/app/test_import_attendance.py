@@ -0,0 +1,167 @@
+import asyncio
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from app.services import import_attendance_service as importer
+from app.services.import_attendance_service import build_records, normalise_rows, split_last_record
+from app.services.mark_class_attendance_service import build_attendance_record
+
+ROWS = [
+    # class_id, subject_id, date, student_id, status
+    ("CLS001", "academic", "2025-03-03", "STU1", "present"),
+    ("CLS001", "academic", "2025-03-03", " STU2 ", "ABSENT"),
+    ("CLS001", "academic", "2025-03-03", "STU3", "present"),
+    ("CLS001", "academic", "2025-03-03", "STU2", "present"),
+    ("CLS001", "academic", "2025-03-04", "STU1", "absent"),
+    ("CLS001", "academic", "2025-03-04", "STU2", "late"),
+    ("CLS001", "academic", "2025-03-04", "", "present"),
+    ("CLS001", "sports", "2025-03-04", "STU1", "absent"),
+    ("CLS002", "academic", "2025-03-05", "STU4", "Present"),
+    ("CLS002", "academic", "2025-02-30", "STU5", "present"),
+    ("CLS002", "academic", "2025-03-07", "STU4", "absent"),
+    ("CLS002", "academic", "2025-03-07", "STU5", "absent"),
+]
+
+
+RECORD_FIELDS = {"_id": 0, "class_id": 1, "subject_id": 1, "date": 1, "weekday": 1, "status": 1, "attendance_percentage": 1}
+
+
+def frame(rows=ROWS) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=importer.IMPORT_COLUMNS, dtype="string")
+
+
+def expected_records(rows=ROWS) -> list:
+    # The records marking each class, subject and date one at a time would store
+    status_maps = {}
+    for class_id, subject_id, date, student_id, status in rows:
+        student_id, status = student_id.strip(), status.strip().lower()
+        try:
+            datetime.strptime(date, "%Y-%m-%d")
+        except ValueError:
+            continue
+        if not student_id or status not in ("present", "absent"):
+            continue
+        status_maps.setdefault((class_id, subject_id, date), {})[student_id] = status
+    return [build_attendance_record(*key, status) for key, status in status_maps.items()]
+
+
+def test_vectorized_records_match_marking_one_at_a_time():
+    records = build_records(normalise_rows(frame()))
+
+    assert records == expected_records()
+    assert [record["attendance_percentage"] for record in records] == [100.0, 0.0, 0.0, 100.0, 0.0]
+    assert all(type(record["attendance_percentage"]) is float for record in records)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 12])
+def test_records_split_across_chunks_are_built_whole(chunk_size):
+    source = frame()
+    records, held_back = [], None
+    for start in range(0, len(source), chunk_size):
+        chunk = source.iloc[start:start + chunk_size]
+        if held_back is not None:
+            chunk = pd.concat([held_back, chunk], ignore_index=True)
+        ready, held_back = split_last_record(chunk)
+        records += build_records(normalise_rows(ready))
+    records += build_records(normalise_rows(held_back))
+
+    assert records == expected_records()
+
+
+def test_interrupted_import_resumes_from_its_checkpoint(mongo, monkeypatch, tmp_path):
+    path = tmp_path / "attendance.csv"
+    frame().to_csv(path, index=False)
+    monkeypatch.setattr(importer, "IMPORT_CHUNK_SIZE", 4)
+
+    async def rebuild_rollups():
+        return {"rollups": 0}
+
+    async def rebuild_student_attendance():
+        return {"rows": 0}
+
+    monkeypatch.setattr(importer, "rebuild_rollups", rebuild_rollups)
+    monkeypatch.setattr(importer, "rebuild_student_attendance", rebuild_student_attendance)
+
+    write_records = importer.write_records
+    writes = []
+
+    async def crash_before_second_checkpoint(records, *args):
+        writes.append(records)
+        counts = await write_records(records, *args)
+        if len(writes) == 2:
+            raise RuntimeError("connection lost")
+        return counts
+
+    async def main():
+        await mongo["attendance_store"].create_index([("class_id", 1), ("subject_id", 1), ("date", 1)], unique=True)
+
+        monkeypatch.setattr(importer, "write_records", crash_before_second_checkpoint)
+        with pytest.raises(RuntimeError):
+            await importer.import_attendance(str(path), import_id="import-1")
+        checkpoint = await mongo["attendance_imports"].find_one({"_id": "import-1"})
+
+        monkeypatch.setattr(importer, "write_records", write_records)
+        resumed = await importer.import_attendance(str(path), import_id="import-1")
+        again = await importer.import_attendance(str(path), import_id="import-1")
+        stored = await mongo["attendance_store"].find({}, RECORD_FIELDS).sort([("class_id", 1), ("subject_id", 1), ("date", 1)]).to_list(length=None)
+        return checkpoint, resumed, again, stored
+
+    checkpoint, resumed, again, stored = asyncio.run(main())
+
+    # The first chunk is one unfinished record, so the first write covers the first two
+    # records and the last row of the second chunk is held back for the next one. The second
+    # write happened but was not checkpointed, so it is repeated on resume
+    assert checkpoint["state"] == "importing"
+    assert checkpoint["rows_done"] == 7
+    assert checkpoint["error"] == "connection lost"
+    assert [record["date"] for record in writes[0]] == ["2025-03-03", "2025-03-04"]
+
+    assert resumed["resumed"] is True
+    assert resumed["state"] == "completed"
+    assert resumed["rows_this_run"] == len(ROWS) - 7
+    assert resumed["rows_done"] == len(ROWS)
+    # Three invalid rows and the status STU2 overrode
+    assert resumed["skipped_rows"] == 4
+    # What the interrupted write inserted is counted as updated when it is written again
+    assert resumed["records_inserted"] + resumed["records_updated"] == 5
+    assert resumed["records_updated"] == len(writes[1])
+    assert resumed["split_records"] == 0
+    assert resumed["rows_per_second"] > 0
+
+    assert again["rows_this_run"] == 0
+    assert stored == sorted(expected_records(), key=lambda record: (record["class_id"], record["subject_id"], record["date"]))
+
+
+def test_rows_of_a_record_after_it_was_written_are_reported(mongo, monkeypatch, tmp_path):
+    # Sorted by student rather than by record
+    rows = [
+        ("CLS001", "academic", "2025-03-03", "STU1", "present"),
+        ("CLS001", "academic", "2025-03-04", "STU1", "present"),
+        ("CLS001", "academic", "2025-03-03", "STU2", "absent"),
+        ("CLS001", "academic", "2025-03-04", "STU2", "absent"),
+    ]
+    path = tmp_path / "attendance.csv"
+    frame(rows).to_csv(path, index=False)
+    monkeypatch.setattr(importer, "IMPORT_CHUNK_SIZE", 2)
+
+    async def rebuild():
+        return {}
+
+    monkeypatch.setattr(importer, "rebuild_rollups", rebuild)
+    monkeypatch.setattr(importer, "rebuild_student_attendance", rebuild)
+
+    async def main():
+        await mongo["attendance_store"].create_index([("class_id", 1), ("subject_id", 1), ("date", 1)], unique=True)
+        result = await importer.import_attendance(str(path), import_id="import-1")
+        stored = await mongo["attendance_store"].find({}, RECORD_FIELDS).sort("date", 1).to_list(length=None)
+        return result, stored
+
+    result, stored = asyncio.run(main())
+
+    assert result["state"] == "completed"
+    assert result["split_records"] == 2
+    assert result["records_inserted"] == 2
+    # The students written first are kept rather than replaced by the later rows
+    assert [record["status"] for record in stored] == [{"STU1": "present"}, {"STU1": "present"}]
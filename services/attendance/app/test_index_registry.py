@@ -0,0 +1,46 @@
+import pytest
+
+from app.utils.index_registry import IndexSpec, apply_indexes, check_indexes
+
+mongomock = pytest.importorskip("mongomock")
+
+
+def test_unique_index_blocked_by_duplicates_is_reported():
+    db = mongomock.MongoClient().LMS
+    db.attendance_store.insert_many([
+        {"class_id": "CLS001", "subject_id": "academic", "date": "2025-03-03"},
+        {"class_id": "CLS001", "subject_id": "academic", "date": "2025-03-03"},
+        {"class_id": "CLS001", "subject_id": "academic", "date": "2025-03-04"},
+    ])
+    specs = [
+        IndexSpec("attendance_store", [("class_id", 1), ("subject_id", 1), ("date", 1)], "class_subject_date", {"unique": True}),
+        IndexSpec("attendance_store", [("subject_id", 1), ("date", 1)], "subject_date"),
+    ]
+
+    report = apply_indexes(db, specs)
+
+    assert report["created"] == ["attendance_store.subject_date"]
+    assert report["blocked"] == [{"index": "attendance_store.class_subject_date", "duplicate_keys": 1}]
+    assert check_indexes(db, specs, [])["blocked"] == report["blocked"]
+
+    db.attendance_store.delete_one({"date": "2025-03-03"})
+    report = apply_indexes(db, specs)
+
+    assert report["created"] == ["attendance_store.class_subject_date"]
+    assert report["blocked"] == []
+
+
+def test_non_unique_index_is_upgraded_once_duplicates_are_gone():
+    db = mongomock.MongoClient().LMS
+    db.attendance_store.insert_many([{"class_id": "CLS001"}, {"class_id": "CLS001"}])
+    db.attendance_store.create_index([("class_id", 1)], name="class")
+    specs = [IndexSpec("attendance_store", [("class_id", 1)], "class", {"unique": True})]
+
+    assert apply_indexes(db, specs)["blocked"] == [{"index": "attendance_store.class", "duplicate_keys": 1}]
+
+    db.attendance_store.delete_one({"class_id": "CLS001"})
+    report = apply_indexes(db, specs)
+
+    assert report["rebuilt"] == ["attendance_store.class"]
+    assert report["blocked"] == []
+    assert db.attendance_store.index_information()["class"]["unique"] is True
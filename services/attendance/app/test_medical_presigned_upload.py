@@ -0,0 +1,128 @@
+import asyncio
+import base64
+import json
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import medical_presigned_upload_router
+from app.services import medical_presigned_upload_service as uploads
+from app.services.background_services import document_storage
+from app.services.background_services.document_storage import LocalStorage, S3Storage
+
+UPLOAD = {
+    "student_id": "STU001",
+    "class_id": "CLS001",
+    "subject_id": "academic",
+    "date": "2025-03-03",
+    "file_name": "note.pdf",
+    "content_type": "application/pdf",
+}
+
+
+@pytest.fixture
+def storage(mongo, monkeypatch, tmp_path):
+    monkeypatch.setenv("DOCUMENT_STORAGE_LOCAL_ROOT", str(tmp_path))
+    monkeypatch.setenv("DOCUMENT_STORAGE_SIGNING_KEY", "signing-key")
+    local = LocalStorage()
+    monkeypatch.setattr(document_storage, "_storage", local)
+    monkeypatch.setattr(uploads, "DOCUMENT_UPLOAD_MAX_BYTES", 1024)
+    return local
+
+
+@pytest.fixture
+def client(storage):
+    app = FastAPI()
+    app.include_router(medical_presigned_upload_router.router)
+    return TestClient(app)
+
+
+def put(client, upload: dict, body: bytes):
+    url = urlsplit(upload["upload_url"])
+    return client.put(f"{url.path}?{url.query}", content=body, headers=upload["headers"])
+
+
+def test_presigned_upload_is_recorded_once_completed(client, storage):
+    upload = client.post("/attendance/document-upload/presign", json=UPLOAD).json()
+    assert upload["method"] == "PUT"
+    assert upload["max_bytes"] == 1024
+
+    assert client.post(f"/attendance/document-upload/{upload['upload_id']}/complete").status_code == 409
+    assert put(client, upload, b"%PDF" + b"x" * 100).status_code == 200
+
+    completed = client.post(f"/attendance/document-upload/{upload['upload_id']}/complete")
+    again = client.post(f"/attendance/document-upload/{upload['upload_id']}/complete")
+
+    assert completed.status_code == 201
+    assert again.json() == completed.json()
+    assert completed.json()["data"]["student_id"] == "STU001"
+
+
+def test_local_upload_stops_reading_past_the_limit(client, storage):
+    upload = client.post("/attendance/document-upload/presign", json=UPLOAD).json()
+
+    response = put(client, upload, b"x" * 2048)
+
+    assert response.status_code == 413
+    assert list(storage.root.iterdir()) == []
+
+
+def test_local_upload_needs_a_valid_signature(client, storage):
+    upload = client.post("/attendance/document-upload/presign", json=UPLOAD).json()
+    upload["upload_url"] = upload["upload_url"].replace("signature=", "signature=0")
+
+    assert put(client, upload, b"x").status_code == 403
+
+
+def test_local_storage_needs_a_shared_signing_key(monkeypatch):
+    monkeypatch.setenv("DOCUMENT_STORAGE_BACKEND", "local")
+    monkeypatch.delenv("DOCUMENT_STORAGE_SIGNING_KEY", raising=False)
+    monkeypatch.setattr(document_storage, "_storage", None)
+
+    with pytest.raises(EnvironmentError):
+        document_storage.get_storage()
+
+
+def test_s3_presigned_post_limits_the_size(monkeypatch):
+    pytest.importorskip("boto3")
+    for name, value in {"AWS_ACCESS_KEY_ID": "key", "AWS_SECRET_ACCESS_KEY": "secret", "AWS_REGION": "eu-west-1", "AWS_BUCKET_NAME": "documents"}.items():
+        monkeypatch.setenv(name, value)
+
+    upload = asyncio.run(S3Storage().presign_upload("a_note.pdf", "application/pdf", 1024, 900))
+    policy = json.loads(base64.b64decode(upload["fields"]["policy"]))
+
+    assert upload["method"] == "POST"
+    assert upload["fields"]["key"] == "a_note.pdf"
+    assert upload["fields"]["Content-Type"] == "application/pdf"
+    assert ["content-length-range", 1, 1024] in policy["conditions"]
+
+
+def test_expired_sessions_are_removed_with_their_files(mongo, storage):
+    async def session(key: str, age: timedelta, upload_id=None):
+        await mongo["document_upload_sessions"].insert_one({
+            **({"_id": upload_id} if upload_id else {}),
+            "key": key,
+            "created_at": datetime.utcnow() - age,
+        })
+
+    async def main():
+        expired = timedelta(seconds=uploads.PRESIGNED_UPLOAD_SESSION_SECONDS + 60)
+        for key in ("orphan.pdf", "completed.pdf", "recent.pdf"):
+            storage.path_for(key).write_bytes(b"x")
+
+        await session("orphan.pdf", expired)
+        await session("never-uploaded.pdf", expired)
+        completed = (await mongo["document_store"].insert_one({"file_name": "completed.pdf"})).inserted_id
+        await session("completed.pdf", expired, completed)
+        await session("recent.pdf", timedelta(minutes=5))
+
+        assert await uploads.cleanup_expired_uploads_service() == 1
+
+        remaining = await mongo["document_upload_sessions"].find({}).to_list(length=None)
+        assert [row["key"] for row in remaining] == ["recent.pdf"]
+        assert sorted(path.name for path in storage.root.iterdir()) == ["completed.pdf", "recent.pdf"]
+
+    asyncio.run(main())
@@ -0,0 +1,227 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from bson.objectid import ObjectId
+
+from app.services import rollup_service
+from app.services.mark_class_attendance_service import build_attendance_record, mark_class_attendance_service
+from app.services.update_class_attendance_service import update_class_attendance_service
+from app.services.rollup_service import record_contributions, retry_pending, write_many_with_rollups
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def rollups(mongo) -> dict:
+    found = {}
+    async for rollup in mongo["attendance_rollups"].find({"scope": {"$ne": "meta"}}):
+        fields = {field: round(rollup[field], 9) for field in rollup_service.ROLLUP_FIELDS if rollup.get(field)}
+        if fields:
+            found[(rollup["scope"], rollup["owner_id"], rollup["subject_id"], rollup["period"], rollup["key"])] = fields
+    return found
+
+
+async def expected_rollups(mongo) -> dict:
+    # What the rollups should hold for the records as they are now
+    expected = {}
+    async for record in mongo["attendance_store"].find({}):
+        for rollup_key, inc in record_contributions(record).items():
+            current = expected.setdefault(rollup_key, {})
+            for field, value in inc.items():
+                current[field] = current.get(field, 0) + value
+    return {
+        rollup_key: {field: round(value, 9) for field, value in fields.items() if value}
+        for rollup_key, fields in expected.items()
+        if any(fields.values())
+    }
+
+
+async def set_rebuilding(mongo, flag: bool):
+    if flag:
+        await mongo["attendance_rollups"].update_one({"scope": "meta"}, {"$set": {"rebuilding": True}}, upsert=True)
+    else:
+        await mongo["attendance_rollups"].update_one({"scope": "meta"}, {"$unset": {"rebuilding": ""}})
+
+
+async def outbox(mongo) -> list:
+    return await mongo["attendance_rollup_outbox"].find({}).sort("created_at", 1).to_list(length=None)
+
+
+async def backdate_outbox(mongo):
+    # created_at is kept to the millisecond, so an entry written just now may not be older
+    # than retry_pending's cutoff yet
+    for entry in await outbox(mongo):
+        await mongo["attendance_rollup_outbox"].update_one(
+            {"_id": entry["_id"]}, {"$set": {"created_at": entry["created_at"] - timedelta(seconds=1)}}
+        )
+
+
+def test_mark_and_update_keep_rollups_in_step(mongo):
+    async def main():
+        await mark_class_attendance_service("CLS001", "SUB1", "2025-03-03", {"STU1": "present", "STU2": "absent"})
+        record = await mongo["attendance_store"].find_one({})
+        await update_class_attendance_service(str(record["_id"]), "CLS001", "SUB1", "2025-03-03", {"STU1": "present", "STU2": "present"})
+
+        assert await rollups(mongo) == await expected_rollups(mongo)
+        assert await outbox(mongo) == []
+        updated = await mongo["attendance_store"].find_one({})
+        assert updated["rollup_version"] != record["rollup_version"]
+
+    run(main())
+
+
+def test_failed_apply_is_retried_from_the_outbox(mongo, monkeypatch):
+    apply_deltas = rollup_service.apply_deltas
+
+    async def failing(deltas):
+        raise RuntimeError("rollups unavailable")
+
+    async def main():
+        monkeypatch.setattr(rollup_service, "apply_deltas", failing)
+        await mark_class_attendance_service("CLS001", "SUB1", "2025-03-03", {"STU1": "present"})
+        pending = await outbox(mongo)
+        assert len(pending) == 1
+        assert await rollups(mongo) == {}
+
+        monkeypatch.setattr(rollup_service, "apply_deltas", apply_deltas)
+        await backdate_outbox(mongo)
+        assert await retry_pending(older_than=0) == 1
+        assert await outbox(mongo) == []
+        assert await rollups(mongo) == await expected_rollups(mongo)
+
+    run(main())
+
+
+def test_entry_of_a_write_that_never_happened_is_dropped(mongo):
+    async def main():
+        record = {"_id": ObjectId(), **build_attendance_record("CLS001", "SUB1", "2025-03-03", {"STU1": "present"})}
+        await mongo["attendance_rollup_outbox"].insert_one({
+            "_id": ObjectId(),
+            "action": "mark",
+            "attendance_id": record["_id"],
+            "previous_version": None,
+            "deltas": rollup_service.rollup_deltas(None, record),
+            "created_at": datetime.utcnow() - timedelta(seconds=1),
+            "attempts": 0,
+        })
+
+        assert await retry_pending(older_than=0) == 0
+        assert await outbox(mongo) == []
+        assert await rollups(mongo) == {}
+
+    run(main())
+
+
+def test_writes_pile_up_while_rebuilding_and_settle_in_order(mongo):
+    async def main():
+        await set_rebuilding(mongo, True)
+        await mark_class_attendance_service("CLS001", "SUB1", "2025-03-03", {"STU1": "absent", "STU2": "absent"})
+        record = await mongo["attendance_store"].find_one({})
+        for status in ({"STU1": "present", "STU2": "absent"}, {"STU1": "present", "STU2": "present"}):
+            await update_class_attendance_service(str(record["_id"]), "CLS001", "SUB1", "2025-03-03", status)
+
+        pending = await outbox(mongo)
+        assert [entry["action"] for entry in pending] == ["mark", "update", "update"]
+        assert await rollups(mongo) == {}
+        # The retry loop leaves them to the rebuild
+        await backdate_outbox(mongo)
+        assert await retry_pending(older_than=0) == 0
+
+        # Only the last write is stamped on the record; the earlier ones are found through
+        # the versions they were written on top of
+        await set_rebuilding(mongo, False)
+        assert await retry_pending(older_than=0) == 3
+        assert await rollups(mongo) == await expected_rollups(mongo)
+
+    run(main())
+
+
+def test_entries_written_in_the_same_millisecond_settle_in_write_order(mongo):
+    async def main():
+        await set_rebuilding(mongo, True)
+        await mark_class_attendance_service("CLS001", "SUB1", "2025-03-03", {"STU1": "absent"})
+        record = await mongo["attendance_store"].find_one({})
+        await update_class_attendance_service(str(record["_id"]), "CLS001", "SUB1", "2025-03-03", {"STU1": "present"})
+
+        # Same created_at, stored later entry first
+        entries = await outbox(mongo)
+        created_at = datetime.utcnow() - timedelta(seconds=1)
+        await mongo["attendance_rollup_outbox"].delete_many({})
+        for entry in reversed(entries):
+            await mongo["attendance_rollup_outbox"].insert_one({**entry, "created_at": created_at})
+
+        await set_rebuilding(mongo, False)
+        assert await retry_pending(older_than=0) == 2
+        assert await rollups(mongo) == await expected_rollups(mongo)
+
+    run(main())
+
+
+def test_write_many_reports_the_writes_that_happened(mongo):
+    async def main():
+        changes = [
+            ("mark", ObjectId(), None, {**build_attendance_record("CLS001", "SUB1", date, {"STU1": "present"})})
+            for date in ("2025-03-03", "2025-03-04", "2025-03-05")
+        ]
+        for _, attendance_id, _, record in changes:
+            record["_id"] = attendance_id
+        skipped = changes[1][1]
+
+        async def write(versions):
+            for _, attendance_id, _, record in changes:
+                if attendance_id != skipped:
+                    await mongo["attendance_store"].insert_one({**record, "rollup_version": versions[attendance_id]})
+
+        written = await write_many_with_rollups(changes, write)
+
+        assert written == {changes[0][1], changes[2][1]}
+        assert await outbox(mongo) == []
+        assert await rollups(mongo) == await expected_rollups(mongo)
+        assert await mongo["student_attendance"].count_documents({}) == 2
+
+    run(main())
+
+
+def test_rebuild_keeps_writes_made_while_it_runs(mongo, monkeypatch):
+    monkeypatch.setattr(rollup_service, "_ready", None)
+
+    async def main():
+        await mark_class_attendance_service("CLS001", "SUB1", "2025-03-03", {"STU1": "present", "STU2": "absent"})
+        await mark_class_attendance_service("CLS002", "SUB1", "2025-03-03", {"STU3": "absent"})
+        first = await mongo["attendance_store"].find_one({"class_id": "CLS001"})
+        second = await mongo["attendance_store"].find_one({"class_id": "CLS002"})
+
+        class Scan:
+            # Stands in for the rebuild aggregation: writes land both before and after it
+            # reads the records
+            async def to_list(self, length=None):
+                await update_class_attendance_service(str(first["_id"]), "CLS001", "SUB1", "2025-03-03", {"STU1": "absent", "STU2": "absent"})
+                staging = {}
+                async for record in mongo["attendance_store"].find({}):
+                    for rollup_key, inc in record_contributions(record).items():
+                        current = staging.setdefault(rollup_key, {})
+                        for field, value in inc.items():
+                            current[field] = current.get(field, 0) + value
+                await mongo[rollup_service.ROLLUP_STAGING_COLLECTION].insert_many([
+                    rollup_service._rollup_document(rollup_key, fields) for rollup_key, fields in staging.items()
+                ])
+                await update_class_attendance_service(str(second["_id"]), "CLS002", "SUB1", "2025-03-03", {"STU3": "present"})
+                await mark_class_attendance_service("CLS001", "SUB1", "2025-03-04", {"STU1": "present", "STU2": "present"})
+                return []
+
+        monkeypatch.setattr(rollup_service.attendance_store, "aggregate", lambda pipeline: Scan())
+        result = await rollup_service.rebuild_rollups()
+
+        assert result["settled_outbox_entries"] == 3
+        assert not await rollup_service.rebuilding()
+        assert await rollup_service.rollups_ready()
+        assert await outbox(mongo) == []
+        assert await rollups(mongo) == await expected_rollups(mongo)
+
+        # Writes after the rebuild apply their deltas again
+        await mark_class_attendance_service("CLS002", "SUB1", "2025-03-04", {"STU3": "present"})
+        assert await outbox(mongo) == []
+        assert await rollups(mongo) == await expected_rollups(mongo)
+
+    run(main())
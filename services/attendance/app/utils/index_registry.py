@@ -0,0 +1,275 @@
+"""
+Declarative MongoDB index registry.
+
+A service declares the indexes its queries rely on (IndexSpec) and the hot queries they serve
+(QuerySpec), then applies them idempotently at startup, in the background, or from its CLI.
+Besides creating missing indexes it reports:
+  - drifted indexes: same name or keys as a declared one but different keys or options,
+  - blocked indexes: declared unique, but documents already share a key, so the index cannot
+    be built until they are merged; logged as errors, and the CLI exits with status 1,
+  - unused indexes: no accesses in $indexStats since the server last started,
+  - hot queries that explain() shows running as a collection scan.
+
+Each service is built from its own directory, so services that own collections keep an
+identical copy of this module next to their database connection.
+"""
+import argparse
+import json
+import logging
+import sys
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from pymongo import IndexModel
+from pymongo.database import Database
+
+logger = logging.getLogger(__name__)
+
+# Options compared when deciding whether an existing index matches its declaration
+COMPARED_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression")
+
+
+class IndexSpec(NamedTuple):
+    collection: str
+    keys: List[Tuple[str, int]]
+    name: str
+    options: Optional[dict] = None
+
+
+class QuerySpec(NamedTuple):
+    collection: str
+    filter: dict
+    description: str
+    sort: Optional[List[Tuple[str, int]]] = None
+
+
+def _compared(options: dict) -> dict:
+    compared = {name: options[name] for name in COMPARED_OPTIONS if name in options}
+    if not compared.get("unique"):
+        compared.pop("unique", None)
+    if not compared.get("sparse"):
+        compared.pop("sparse", None)
+    return compared
+
+
+def _existing_by_collection(db: Database, specs: List[IndexSpec]) -> Dict[str, Dict[str, dict]]:
+    return {name: db[name].index_information() for name in {spec.collection for spec in specs}}
+
+
+def plan_indexes(db: Database, specs: List[IndexSpec]) -> dict:
+    """
+    Compares the declared indexes with the existing ones without changing anything.
+    Returns {"ok": [...], "missing": [...], "drifted": [...]} of "collection.name" strings,
+    with each drifted entry also giving what exists.
+    """
+    existing = _existing_by_collection(db, specs)
+    report = {"ok": [], "missing": [], "drifted": []}
+    for spec in specs:
+        declared = {"key": list(spec.keys), **_compared(spec.options or {})}
+        match = None
+        for name, info in existing[spec.collection].items():
+            if name == spec.name or list(info["key"]) == list(spec.keys):
+                match = (name, {"key": list(info["key"]), **_compared(info)})
+                break
+        label = f"{spec.collection}.{spec.name}"
+        if match is None:
+            report["missing"].append(label)
+        elif match[0] == spec.name and match[1] == declared:
+            report["ok"].append(label)
+        else:
+            report["drifted"].append({"index": label, "existing_name": match[0], "existing": match[1], "declared": declared})
+    return report
+
+
+def _duplicate_keys(db: Database, spec: IndexSpec) -> int:
+    rows = list(db[spec.collection].aggregate([
+        {"$group": {"_id": {field: f"${field}" for field, _ in spec.keys}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$count": "keys"},
+    ]))
+    return rows[0]["keys"] if rows else 0
+
+
+def _blocked(db: Database, spec: IndexSpec) -> Optional[dict]:
+    # A unique index can only be built if no key has more than one document
+    if not (spec.options or {}).get("unique"):
+        return None
+    duplicates = _duplicate_keys(db, spec)
+    if not duplicates:
+        return None
+    logger.error(
+        f"Index {spec.collection}.{spec.name} cannot be made unique: "
+        f"{duplicates} ({', '.join(field for field, _ in spec.keys)}) values have more than one document"
+    )
+    return {"index": f"{spec.collection}.{spec.name}", "duplicate_keys": duplicates}
+
+
+def _recreate(db: Database, spec: IndexSpec, existing_name: str):
+    db[spec.collection].drop_index(existing_name)
+    db[spec.collection].create_index(spec.keys, name=spec.name, background=True, **(spec.options or {}))
+
+
+def blocked_indexes(db: Database, specs: List[IndexSpec], report: dict) -> List[dict]:
+    """
+    The missing or drifted unique indexes of a plan_indexes report that duplicate keys keep
+    from being built, with how many keys are duplicated.
+    """
+    specs_by_label = {f"{spec.collection}.{spec.name}": spec for spec in specs}
+    labels = report["missing"] + [drift["index"] for drift in report["drifted"]]
+    return [blocked for blocked in (_blocked(db, specs_by_label[label]) for label in labels) if blocked]
+
+
+def apply_indexes(db: Database, specs: List[IndexSpec], fix_drift: bool = False) -> dict:
+    """
+    Creates missing indexes (one create_indexes call per collection, built in the background)
+    and logs drift. Drifted indexes are only rebuilt with fix_drift=True, except that a
+    non-unique index is always upgraded to a declared unique one when the data allows it.
+    Unique indexes that duplicate keys keep from being built are listed under "blocked".
+    Failures are logged rather than raised, so this is safe to run on every startup.
+    """
+    try:
+        report = plan_indexes(db, specs)
+    except Exception as e:
+        logger.warning(f"Could not read existing indexes: {e}")
+        return {"error": str(e)}
+
+    missing = set(report["missing"])
+    by_collection: Dict[str, List[IndexSpec]] = {}
+    for spec in specs:
+        if f"{spec.collection}.{spec.name}" in missing:
+            by_collection.setdefault(spec.collection, []).append(spec)
+    report["created"] = []
+    report["blocked"] = []
+    for collection, collection_specs in by_collection.items():
+        models = [IndexModel(spec.keys, name=spec.name, background=True, **(spec.options or {})) for spec in collection_specs]
+        try:
+            report["created"] += [f"{collection}.{name}" for name in db[collection].create_indexes(models)]
+            continue
+        except Exception as e:
+            logger.warning(f"Could not create indexes on {collection}: {e}")
+        # One index the data does not allow fails the whole call; create the others one by one
+        for spec, model in zip(collection_specs, models):
+            try:
+                report["created"] += [f"{collection}.{name}" for name in db[collection].create_indexes([model])]
+            except Exception as e:
+                blocked = _blocked(db, spec)
+                if blocked:
+                    report["blocked"].append(blocked)
+                else:
+                    logger.warning(f"Could not create index {collection}.{spec.name}: {e}")
+
+    specs_by_label = {f"{spec.collection}.{spec.name}": spec for spec in specs}
+    report["rebuilt"] = []
+    for drift in report["drifted"]:
+        spec = specs_by_label[drift["index"]]
+        upgrade_to_unique = (
+            drift["declared"].get("unique") and not drift["existing"].get("unique")
+            and {**drift["existing"], "unique": True} == drift["declared"]
+        )
+        if fix_drift or upgrade_to_unique:
+            try:
+                blocked = _blocked(db, spec)
+                if blocked:
+                    report["blocked"].append(blocked)
+                else:
+                    _recreate(db, spec, drift["existing_name"])
+                    report["rebuilt"].append(drift["index"])
+                    continue
+            except Exception as e:
+                logger.warning(f"Could not rebuild index {drift['index']}: {e}")
+        logger.warning(f"Index {drift['index']} differs from its declaration: exists as {drift['existing_name']} {drift['existing']}, declared {drift['declared']}")
+    return report
+
+
+def unused_indexes(db: Database, specs: List[IndexSpec]) -> List[dict]:
+    """
+    Indexes on the declared collections with no accesses since the server started, according
+    to $indexStats. Undeclared ones are candidates for removal; declared ones may only mean the
+    stats were reset recently.
+    """
+    declared = {(spec.collection, spec.name) for spec in specs}
+    unused = []
+    for collection in sorted({spec.collection for spec in specs}):
+        try:
+            stats = list(db[collection].aggregate([{"$indexStats": {}}]))
+        except Exception as e:
+            logger.warning(f"Could not read index stats of {collection}: {e}")
+            continue
+        for stat in stats:
+            if stat["name"] == "_id_" or stat.get("accesses", {}).get("ops", 0) > 0:
+                continue
+            since = stat.get("accesses", {}).get("since")
+            unused.append({
+                "index": f"{collection}.{stat['name']}",
+                "declared": (collection, stat["name"]) in declared,
+                "since": since.isoformat() if hasattr(since, "isoformat") else since,
+            })
+    return unused
+
+
+def _plan_stages(plan: dict) -> List[str]:
+    stages = [plan["stage"]] if "stage" in plan else []
+    for child in ("inputStage", "queryPlan"):
+        if isinstance(plan.get(child), dict):
+            stages += _plan_stages(plan[child])
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    return stages
+
+
+def explain_queries(db: Database, queries: List[QuerySpec]) -> List[dict]:
+    """
+    Runs explain() on the hot queries and logs a warning for each one whose winning plan
+    scans the whole collection.
+    """
+    results = []
+    for query in queries:
+        try:
+            cursor = db[query.collection].find(query.filter)
+            if query.sort:
+                cursor = cursor.sort(query.sort)
+            winning_plan = cursor.explain()["queryPlanner"]["winningPlan"]
+        except Exception as e:
+            logger.warning(f"Could not explain '{query.description}': {e}")
+            continue
+        stages = _plan_stages(winning_plan)
+        collscan = "COLLSCAN" in stages
+        if collscan:
+            logger.warning(f"Missing index: '{query.description}' on {query.collection} runs as a collection scan")
+        results.append({"query": query.description, "collection": query.collection, "stages": stages, "collscan": collscan})
+    return results
+
+
+def check_indexes(db: Database, specs: List[IndexSpec], queries: List[QuerySpec]) -> dict:
+    """
+    Reports index state without changing anything: missing/drifted declarations, unique
+    indexes blocked by duplicate keys, unused indexes and hot queries planned as collection scans.
+    """
+    report = plan_indexes(db, specs)
+    return {
+        **report,
+        "blocked": blocked_indexes(db, specs, report),
+        "unused": unused_indexes(db, specs),
+        "queries": explain_queries(db, queries),
+    }
+
+
+def run_cli(db: Database, specs: List[IndexSpec], queries: List[QuerySpec], description: str):
+    """
+    Command line entry point for a service's index declarations:
+        apply [--fix-drift]   create missing indexes (and rebuild drifted ones)
+        check                 report drift, unused indexes and collection scans
+    Both exit with status 1 when a unique index is blocked by duplicate keys.
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("command", choices=["apply", "check"])
+    parser.add_argument("--fix-drift", action="store_true", help="drop and recreate indexes that differ from their declaration")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "apply":
+        report = apply_indexes(db, specs, fix_drift=args.fix_drift)
+    else:
+        report = check_indexes(db, specs, queries)
+    print(json.dumps(report, indent=2, default=str))
+    if report.get("blocked"):
+        sys.exit(1)
@@ -0,0 +1,59 @@
+import asyncio
+import logging
+from pymongo import ASCENDING
+from app.utils.mongodb_connection import db, attendance_store, student_attendance, student_attendance_summery, attendance_rollups, attendance_rollup_outbox, calendar_events, attendance_forecasts, document_upload_sessions
+from app.utils.index_registry import IndexSpec, QuerySpec, apply_indexes, run_cli
+from app.services.ml_service.forecast_cache import FORECAST_RETENTION_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Indexes the attendance queries rely on
+ATTENDANCE_INDEXES = [
+    # Class-level ratios and summaries: equality on class and subject, range on date.
+    # Unique, so there is one record per class, subject and date (bulk marking upserts on it)
+    IndexSpec(attendance_store.name, [("class_id", ASCENDING), ("subject_id", ASCENDING), ("date", ASCENDING)], "class_subject_date", {"unique": True}),
+    # Student-level ratios span every class of a subject, bounded by date
+    IndexSpec(attendance_store.name, [("subject_id", ASCENDING), ("date", ASCENDING)], "subject_date"),
+    # Student summaries and ratios; one projection row per record and student
+    IndexSpec(student_attendance.name, [("student_id", ASCENDING), ("subject_id", ASCENDING), ("date", ASCENDING)], "student_subject_date"),
+    IndexSpec(student_attendance.name, [("attendance_id", ASCENDING), ("student_id", ASCENDING)], "attendance_student", {"unique": True}),
+    # Class roster: attendance ratios of many students of one class and year
+    IndexSpec(student_attendance_summery.name, [("class_id", ASCENDING), ("year", ASCENDING), ("student_id", ASCENDING)], "class_year_student"),
+    # One rollup document per class/student, subject and period
+    IndexSpec(attendance_rollups.name, [("scope", ASCENDING), ("owner_id", ASCENDING), ("subject_id", ASCENDING), ("period", ASCENDING), ("key", ASCENDING)], "rollup_key", {"unique": True}),
+    IndexSpec(attendance_rollup_outbox.name, [("created_at", ASCENDING)], "created_at"),
+    IndexSpec(attendance_rollup_outbox.name, [("attendance_id", ASCENDING)], "attendance_id"),
+    # Prediction context: one class and subject over a date range
+    IndexSpec(calendar_events.name, [("class_id", ASCENDING), ("subject_id", ASCENDING), ("date", ASCENDING)], "class_subject_date"),
+    # Forecast invalidation when a calendar event is stored, and expiry of old forecasts
+    IndexSpec(attendance_forecasts.name, [("class_id", ASCENDING), ("subject_id", ASCENDING), ("date", ASCENDING)], "class_subject_date"),
+    IndexSpec(attendance_forecasts.name, [("created_at", ASCENDING)], "created_at_ttl", {"expireAfterSeconds": FORECAST_RETENTION_SECONDS}),
+    # Expired presigned uploads, removed with their files by upload_cleanup_loop
+    IndexSpec(document_upload_sessions.name, [("created_at", ASCENDING)], "created_at"),
+]
+
+# The queries behind the busiest endpoints, checked with explain() by `check`
+ATTENDANCE_HOT_QUERIES = [
+    QuerySpec(attendance_store.name, {"class_id": "CLS001", "subject_id": "academic", "date": {"$gte": "2025-01-01", "$lt": "2025-02-01"}}, "class attendance for a period"),
+    QuerySpec(attendance_store.name, {"subject_id": "academic", "date": {"$gte": "2025-01-01", "$lt": "2025-02-01"}}, "subject attendance for a period"),
+    QuerySpec(student_attendance.name, {"student_id": "STU001", "subject_id": "academic"}, "student attendance history"),
+    QuerySpec(student_attendance_summery.name, {"class_id": "CLS001", "year": 2025, "student_id": {"$in": ["STU001", "STU002"]}}, "class roster attendance ratios"),
+    QuerySpec(calendar_events.name, {"class_id": "CLS001", "subject_id": "academic", "date": {"$gte": "2025-01-01", "$lte": "2025-01-31"}}, "prediction calendar window"),
+]
+
+
+async def ensure_indexes():
+    """
+    Creates the indexes above if they are missing. Applying them is idempotent, so this is
+    safe to run on every startup; it runs on a worker thread and failures are logged rather
+    than stopping the service.
+    """
+    try:
+        await asyncio.to_thread(apply_indexes, db.delegate, ATTENDANCE_INDEXES)
+    except Exception as e:
+        logger.warning(f"Could not apply attendance indexes: {e}")
+
+
+if __name__ == "__main__":
+    # python -m app.utils.indexes apply|check
+    run_cli(db.delegate, ATTENDANCE_INDEXES, ATTENDANCE_HOT_QUERIES, "Attendance service indexes")
@@ -20,7 +20,20 @@ class_attendance_summery = db["class_attendance_summery_test"]
 # class_attendance_summery = db["class_attendance_summery"]
 student_attendance_summery = db["student_attendance_summery_test"]
 # student_attendance_summery = db["student_attendance_summery"]
+# Write-time attendance rollups (present/total per day, month and year, per class and per
+# student) and the outbox of pending rollup deltas, see app/services/rollup_service.py
+attendance_rollups = db["attendance_rollups"]
+attendance_rollup_outbox = db["attendance_rollup_outbox"]
+# One row per student and attendance record, see app/services/student_attendance_service.py
+student_attendance = db["student_attendance"]
+# Memoized attendance forecasts, see app/services/ml_service/forecast_cache.py
+attendance_forecasts = db["attendance_forecasts"]
+# Checkpoints of bulk attendance imports, see app/services/import_attendance_service.py
+attendance_imports = db["attendance_imports"]
 document_store = db["document_store"]
+# Presigned medical uploads waiting for their completion callback, see
+# app/services/medical_presigned_upload_service.py
+document_upload_sessions = db["document_upload_sessions"]
 sports = db["sports"]
 clubs = db["clubs"]
 
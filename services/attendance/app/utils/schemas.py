@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Dict, Literal
+from typing import Dict, List, Literal
 from datetime import datetime
 
 class StudentsOfClassRequest(BaseModel):
@@ -20,6 +20,12 @@ class AttendanceEntry(BaseModel):
     date: str = Field(default_factory=lambda: datetime.now().strftime("%Y-%m-%d"))
     status: Dict[str, Literal["present", "absent"]]
 
+class BulkAttendanceRequest(BaseModel):
+    """
+    Schema for marking many class attendance records in one request.
+    """
+    entries: List[AttendanceEntry]
+
 class DocumentUpload(BaseModel):
     """
     Schema for storing or submitting class attendance data.
@@ -32,3 +38,14 @@ class DocumentUpload(BaseModel):
     file_name: str 
     file_type: Literal["pdf", "docx", "pptx", "xlsx"]
     is_checked: bool = False 
+
+class PresignedUploadRequest(BaseModel):
+    """
+    Schema for requesting a URL to upload a medical document to directly.
+    """
+    student_id: str
+    class_id: str
+    subject_id: str = "academic"
+    date: str = Field(default_factory=lambda: datetime.now().strftime("%Y-%m-%d"))
+    file_name: str
+    content_type: str
@@ -6,6 +6,8 @@ import pytz
 from pymongo.collection import Collection
 from typing import Dict
 from .services.database import db  
+from .services.indexes import ensure_indexes_in_background
+from contextlib import asynccontextmanager
 from .services.predict_active_time import router as predict_router
 import traceback
 import logging
@@ -14,7 +16,14 @@ from .models.Behavioral import UpdateResponse
 
 logger = logging.getLogger(__name__)
 SRI_LANKA_TZ = pytz.timezone('Asia/Colombo')
-app = FastAPI(title="Behavioral Analysis API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Index creation runs in the background so startup does not wait on Mongo
+    ensure_indexes_in_background()
+    yield
+
+
+app = FastAPI(title="Behavioral Analysis API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -0,0 +1,48 @@
+import logging
+import threading
+
+from pymongo import ASCENDING
+
+from .database import db
+from .index_registry import IndexSpec, QuerySpec, apply_indexes, run_cli
+
+logger = logging.getLogger(__name__)
+
+BEHAVIOURAL_INDEXES = [
+    # Time spent on resources: equality on subject and class, range on access time
+    IndexSpec("behavioral_analysis", [("subject_id", ASCENDING), ("class_id", ASCENDING), ("accessBeginTime", ASCENDING)], "subject_class_access_begin"),
+    # Closing an ongoing resource access
+    IndexSpec("behavioral_analysis", [("student_id", ASCENDING), ("content_id", ASCENDING)], "student_content"),
+    # Per-student activity within a class (dashboard performance predictions)
+    IndexSpec("behavioral_analysis", [("student_id", ASCENDING), ("class_id", ASCENDING)], "student_class"),
+    # Weekly active time rows of a subject and class
+    IndexSpec("active_time_prediction", [("subject_id", ASCENDING), ("class_id", ASCENDING), ("WeekStartDate", ASCENDING)], "subject_class_week"),
+]
+
+BEHAVIOURAL_HOT_QUERIES = [
+    QuerySpec(
+        "behavioral_analysis",
+        {"subject_id": "SUB001", "class_id": "CLS001", "accessBeginTime": {"$gte": "2025-01-06T00:00:00Z", "$lt": "2025-01-13T00:00:00Z"}},
+        "weekly time spent on resources"
+    ),
+    QuerySpec("behavioral_analysis", {"student_id": "STU001", "content_id": "CON001", "accessCount": 1, "closeTime": {"$exists": False}}, "ongoing access of a student"),
+    QuerySpec("behavioral_analysis", {"student_id": "STU001", "class_id": "CLS001"}, "activity of a student"),
+]
+
+
+def ensure_indexes_in_background():
+    """
+    Applies the indexes above on a daemon thread, so startup does not wait on Mongo.
+    """
+    def apply():
+        try:
+            apply_indexes(db, BEHAVIOURAL_INDEXES)
+        except Exception as e:
+            logger.warning(f"Could not apply behavioural indexes: {e}")
+
+    threading.Thread(target=apply, name="ensure-indexes", daemon=True).start()
+
+
+if __name__ == "__main__":
+    # python -m app.services.indexes apply|check
+    run_cli(db, BEHAVIOURAL_INDEXES, BEHAVIOURAL_HOT_QUERIES, "Behavioural service indexes")
@@ -0,0 +1,49 @@
+# app/db/indexes.py
+
+import asyncio
+import logging
+
+from pymongo import ASCENDING
+
+from app.db.database import db
+from app.db.index_registry import IndexSpec, QuerySpec, apply_indexes, run_cli
+
+logger = logging.getLogger(__name__)
+
+# Users are looked up by their role id (profiles, auth) and by email (login, password reset)
+USER_MANAGEMENT_INDEXES = [
+    IndexSpec("student", [("student_id", ASCENDING)], "student_id"),
+    IndexSpec("student", [("email", ASCENDING)], "email"),
+    IndexSpec("student", [("class_id", ASCENDING)], "class_id"),
+    IndexSpec("teacher", [("teacher_id", ASCENDING)], "teacher_id"),
+    IndexSpec("teacher", [("email", ASCENDING)], "email"),
+    IndexSpec("admin", [("admin_id", ASCENDING)], "admin_id"),
+    IndexSpec("admin", [("email", ASCENDING)], "email"),
+    # Login history, cleared by email when a user is deleted
+    IndexSpec("student_login_details", [("email", ASCENDING)], "email"),
+    IndexSpec("teacher_login_details", [("email", ASCENDING)], "email"),
+    IndexSpec("admin_login_details", [("email", ASCENDING)], "email"),
+]
+
+USER_MANAGEMENT_HOT_QUERIES = [
+    QuerySpec("student", {"email": "student@example.com"}, "login by email"),
+    QuerySpec("student", {"student_id": "STU001"}, "student by id"),
+    QuerySpec("student", {"class_id": "CLS001"}, "students of a class"),
+    QuerySpec("teacher", {"email": "teacher@example.com"}, "teacher login by email"),
+]
+
+
+async def ensure_indexes():
+    """
+    Applies the indexes above on a worker thread. Idempotent, and failures are only logged,
+    so it runs on every startup.
+    """
+    try:
+        await asyncio.to_thread(apply_indexes, db.delegate, USER_MANAGEMENT_INDEXES)
+    except Exception as e:
+        logger.warning(f"Could not apply user-management indexes: {e}")
+
+
+if __name__ == "__main__":
+    # python -m app.db.indexes apply|check
+    run_cli(db.delegate, USER_MANAGEMENT_INDEXES, USER_MANAGEMENT_HOT_QUERIES, "User management service indexes")
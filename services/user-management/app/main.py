@@ -14,6 +14,9 @@ from datetime import datetime
 from app.anomaly_detection.workers.anomaly_detector import LoginInput, detect_login_anomaly_logic, retrain_models
 # Assuming your user-management's database connection is in app/db/database.py
 from app.db.database import get_database # Import your MongoDB client
+from app.db.indexes import ensure_indexes
+from contextlib import asynccontextmanager
+import asyncio
 # --- END NEW IMPORTS ---
 from app.routers import anomaly,get_recent_users
 from app.routers import user as user_router 
@@ -23,7 +26,16 @@ from app.routers import update_student
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="User Management")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Index creation runs in the background so startup does not wait on Mongo; the task is
+    # kept so it is not garbage-collected before it finishes
+    index_task = asyncio.create_task(ensure_indexes())
+    yield
+    index_task.cancel()
+
+
+app = FastAPI(title="User Management", lifespan=lifespan)
 
 # CORS origins - specify your frontend URLs
 origins = [
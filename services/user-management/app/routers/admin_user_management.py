@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException
-from app.services.auth_service import get_current_user
+from app.services.auth_service import get_current_user, invalidate_user_cache
 from app.db.database import db
 
 router = APIRouter()
@@ -23,6 +23,7 @@ async def delete_user_by_admin(role: str, user_custom_id: str, current_user=Depe
     result = await db[role].delete_one({field_name: user_custom_id})
 
     if result.deleted_count == 1:
+        invalidate_user_cache(role, user_custom_id)
         return {"message": f"{role.capitalize()} deleted successfully"}
     else:
         raise HTTPException(status_code=404, detail=f"{role.capitalize()} not found with ID {user_custom_id}")
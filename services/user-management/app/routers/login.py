@@ -155,10 +155,14 @@ async def login(req: Request, username: str = Form(...), password: str = Form(..
         # user_id_value = str(user.get("_id")) if role != "student" else user.get("student_id")
         # token = create_access_token(data={"sub": user_id_value, "role": role})
         user_id_value = user.get(f"{role}_id")  # e.g., admin_id, teacher_id, student_id
-        token = create_access_token(data={
+        claims = {
             "sub": user_id_value,
             "role": role
-        })
+        }
+        if role == "student" and user.get("class_id"):
+            # Lets the gateway scope student requests without looking the user up
+            claims["class_id"] = user.get("class_id")
+        token = create_access_token(data=claims)
 
         
         # Save login details to the database
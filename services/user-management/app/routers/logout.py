@@ -2,11 +2,13 @@ from fastapi import APIRouter, Request, Depends
 from datetime import datetime
 import pytz
 from app.db.database import get_database
+from app.services.auth_service import invalidate_user_cache
 router = APIRouter()
 from fastapi import Form
 
 @router.post("/logout")
 async def logout(req: Request, user_id: str = Form(...), role: str = Form(...)):
+    invalidate_user_cache(role, user_id)
     db = get_database()
     collection = db[f"{role}_login_details"]
 
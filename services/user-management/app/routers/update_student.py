@@ -4,6 +4,7 @@ from typing import List
 from datetime import date
 from app.db.database import db 
 from bson import ObjectId
+from app.services.auth_service import invalidate_user_cache
 
 router = APIRouter()
 
@@ -40,6 +41,7 @@ async def update_student(student_data: UpdateStudentRequest):
         {"student_id": student_data.student_id},
         {"$set": update_data}
     )
+    invalidate_user_cache("student", student_data.student_id)
     return {"message": "Student updated successfully"}
 
 
@@ -1,6 +1,12 @@
-from fastapi import HTTPException,Depends
+import hmac
+import logging
+import os
+import time
+from collections import OrderedDict
+from fastapi import HTTPException,Depends,Request
 from fastapi.security import OAuth2PasswordBearer
 from bson import ObjectId
+from pydantic import BaseModel
 
 from passlib.context import CryptContext
 from app.db.database import db  # MongoDB client
@@ -10,14 +16,25 @@ from datetime import datetime, timedelta,date
 from app.models.admin_model import AdminModel
 from app.models.student_model import StudentRegistration
 from app.models.teacher_model import TeacherModel
-from typing import Optional,Union
+from typing import Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
 
 # Set up the password hashing context
 # pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # Secret key for encoding JWT
-SECRET_KEY = "mysecretkey"  # Use a secure secret key for production
-ALGORITHM = "HS256"
+SECRET_KEY = os.getenv("JWT_SECRET_KEY", "mysecretkey")  # Use a secure secret key for production
+ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+
+# Shared with the API gateway. Requests carrying this value in X-Gateway-Token had their
+# token verified at the gateway, so the X-User-* identity headers can be trusted as-is.
+# Identity headers are ignored while it is unset.
+GATEWAY_INTERNAL_TOKEN = os.getenv("GATEWAY_INTERNAL_TOKEN", "")
+
+# Resolved users are kept for a short while so authenticated requests skip the Mongo lookup
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "5000"))
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")  # matches your login endpoint
 
@@ -46,84 +63,149 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 # Function to create JWT tokens
 def create_access_token(data: dict, expires_delta: timedelta = timedelta(hours=1)) -> str:
     to_encode = data.copy()
-    expire = datetime.utcnow() + expires_delta
-    to_encode.update({"exp": expire})
+    now = datetime.utcnow()
+    expire = now + expires_delta
+    # iat lets the gateway tell tokens issued before a logout from newer ones
+    to_encode.update({"exp": expire, "iat": now})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")
-        role = payload.get("role")
+class Principal(BaseModel):
+    """Who is calling, without the rest of the user document."""
+    user_id: str
+    role: str
+    class_id: Optional[str] = None
 
-        print(f"DEBUG: token payload - user_id: {user_id}, role: {role}")
 
-        if user_id is None or role is None:
-            raise HTTPException(status_code=401, detail="Invalid token payload")
+# (role, user_id) -> (expiry, resolved user model), least recently used first
+_user_cache: "OrderedDict[Tuple[str, str], tuple]" = OrderedDict()
 
-        role = role.lower()
-        collection_map = {
-            "admin": "admin",
-            "teacher": "teacher",
-            "student": "student"
-        }
-        id_field_map = {
-            "admin": "admin_id",
-            "teacher": "teacher_id",
-            "student": "student_id"
-        }
 
-        collection_name = collection_map.get(role)
-        id_field = id_field_map.get(role)
-
-        if not collection_name or not id_field:
-            raise HTTPException(status_code=403, detail="Invalid user role")
-
-        # Query by custom ID field as string, no ObjectId conversion
-        user_doc = await db[collection_name].find_one({id_field: user_id})
-        print(f"DEBUG: user_doc fetched from DB: {user_doc}")
-        if not user_doc:
-            raise HTTPException(status_code=404, detail=f"{role.capitalize()} not found")
-
-        # Normalize user_doc for Pydantic model
-        user_doc[id_field] = user_id  # Ensure ID field is present
-        user_doc["role"] = role
-        
-        
-        if role == "student":
-            student_data = transform_student_doc_to_model(user_doc)
-            return StudentRegistration(**student_data)
-
-        elif role == "admin":
-            join_date_parsed = parse_date(user_doc.get("join_date"))
-            last_edit_parsed = parse_date(user_doc.get("last_edit_date"))
-
-            user_doc["join_date"] = join_date_parsed
-            user_doc["last_edit_date"] = last_edit_parsed
-
-            return AdminModel(**user_doc)
-
-        elif role == "teacher":
-            # Optionally transform teacher_doc if needed (e.g. rename phone_no to phone)
-            teacher_data = {
-                "teacher_id": user_doc.get("teacher_id"),
-                "email": user_doc.get("email"),
-                "full_name": user_doc.get("full_name"),
-                "first_name": user_doc.get("first_name"),
-                "last_name": user_doc.get("last_name"),
-                "gender": user_doc.get("gender"),
-                "phone_no": user_doc.get("Phone_no"),  # normalize key here
-                "join_date": user_doc.get("join_date"),
-                "last_edit_date": user_doc.get("last_edit_date"),
-                "subjects_classes": user_doc.get("subjects_classes", []),
-                "role": "teacher"
-
-            }
-            return TeacherModel(**teacher_data)
+def invalidate_user_cache(role: str, user_id: str):
+    """Forget a cached user after its profile changed, it was deleted or it logged out."""
+    _user_cache.pop((role.lower(), user_id), None)
+
 
+def _trusted_principal(request: Request) -> Optional[Principal]:
+    if not GATEWAY_INTERNAL_TOKEN:
+        return None
+    gateway_token = request.headers.get("X-Gateway-Token")
+    if not gateway_token or not hmac.compare_digest(gateway_token, GATEWAY_INTERNAL_TOKEN):
+        return None
+    user_id = request.headers.get("X-User-Id")
+    role = request.headers.get("X-User-Role")
+    if not user_id or not role:
+        return None
+    return Principal(user_id=user_id, role=role.lower(), class_id=request.headers.get("X-User-Class"))
+
+
+def _decode_principal(token: str) -> Principal:
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except jwt.JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    user_id = payload.get("sub")
+    role = payload.get("role")
+    if user_id is None or role is None:
+        raise HTTPException(status_code=401, detail="Invalid token payload")
+    return Principal(user_id=user_id, role=role.lower(), class_id=payload.get("class_id"))
+
+
+async def get_current_principal(request: Request, token: str = Depends(oauth2_scheme)) -> Principal:
+    """
+    Identify the caller without loading their user document: from the gateway's identity
+    headers when present, otherwise by decoding the token. It does not check that the user
+    still exists, so routes that act on other users depend on get_current_user instead.
+    """
+    principal = _trusted_principal(request)
+    if principal is None:
+        principal = _decode_principal(token)
+    if principal.role not in ("admin", "teacher", "student"):
+        raise HTTPException(status_code=403, detail="Invalid user role")
+    return principal
+
+
+async def get_current_user(request: Request, token: str = Depends(oauth2_scheme)):
+    principal = await get_current_principal(request, token)
+    user_id = principal.user_id
+    role = principal.role
+
+    cache_key = (role, user_id)
+    cached = _user_cache.get(cache_key)
+    if cached is not None:
+        expires_at, user = cached
+        if expires_at > time.monotonic():
+            _user_cache.move_to_end(cache_key)
+            return user.model_copy()
+        _user_cache.pop(cache_key, None)
+
+    user = await _load_user(role, user_id)
+    _user_cache[cache_key] = (time.monotonic() + USER_CACHE_TTL, user)
+    _user_cache.move_to_end(cache_key)
+    while len(_user_cache) > USER_CACHE_MAX_ENTRIES:
+        _user_cache.popitem(last=False)
+    return user.model_copy()
+
+
+async def _load_user(role: str, user_id: str):
+    collection_map = {
+        "admin": "admin",
+        "teacher": "teacher",
+        "student": "student"
+    }
+    id_field_map = {
+        "admin": "admin_id",
+        "teacher": "teacher_id",
+        "student": "student_id"
+    }
+
+    collection_name = collection_map.get(role)
+    id_field = id_field_map.get(role)
+
+    if not collection_name or not id_field:
+        raise HTTPException(status_code=403, detail="Invalid user role")
+
+    # Query by custom ID field as string, no ObjectId conversion
+    user_doc = await db[collection_name].find_one({id_field: user_id})
+    logger.debug(f"Loaded {role} {user_id} from the database")
+    if not user_doc:
+        raise HTTPException(status_code=404, detail=f"{role.capitalize()} not found")
+
+    # Normalize user_doc for Pydantic model
+    user_doc[id_field] = user_id  # Ensure ID field is present
+    user_doc["role"] = role
+    
+    
+    if role == "student":
+        student_data = transform_student_doc_to_model(user_doc)
+        return StudentRegistration(**student_data)
+
+    elif role == "admin":
+        join_date_parsed = parse_date(user_doc.get("join_date"))
+        last_edit_parsed = parse_date(user_doc.get("last_edit_date"))
+
+        user_doc["join_date"] = join_date_parsed
+        user_doc["last_edit_date"] = last_edit_parsed
+
+        return AdminModel(**user_doc)
+
+    elif role == "teacher":
+        # Optionally transform teacher_doc if needed (e.g. rename phone_no to phone)
+        teacher_data = {
+            "teacher_id": user_doc.get("teacher_id"),
+            "email": user_doc.get("email"),
+            "full_name": user_doc.get("full_name"),
+            "first_name": user_doc.get("first_name"),
+            "last_name": user_doc.get("last_name"),
+            "gender": user_doc.get("gender"),
+            "phone_no": user_doc.get("Phone_no"),  # normalize key here
+            "join_date": user_doc.get("join_date"),
+            "last_edit_date": user_doc.get("last_edit_date"),
+            "subjects_classes": user_doc.get("subjects_classes", []),
+            "role": "teacher"
+
+        }
+        return TeacherModel(**teacher_data)
 
 def transform_student_doc_to_model(doc: dict) -> dict:
     def parse_date(date_str):